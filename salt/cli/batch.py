@@ -5,12 +5,15 @@ Execute batch runs
 import copy
 import logging
 import math
+import os
 import time
 from datetime import datetime, timedelta
 
 import salt.client
 import salt.exceptions
 import salt.output
+import salt.utils.files
+import salt.utils.json
 import salt.utils.stringutils
 
 log = logging.getLogger(__name__)
@@ -39,6 +42,9 @@ class Batch:
         self.pub_kwargs = eauth if eauth else {}
         self.quiet = quiet
         self.options = _parser
+        self.minions = []
+        # the minions a resumed streaming batch run skipped
+        self.resumed = set()
         # Passing listen True to local client will prevent it from purging
         # cahced events while iterating over the batches.
         self.local = salt.client.get_local_client(opts["conf_file"], listen=True)
@@ -110,6 +116,67 @@ class Batch:
                     "form of %10, 10% or 3".format(self.opts["batch"])
                 )
 
+    def _process_return(self, minion, data, ret):
+        """
+        Yield and display the return of a minion. Returns True if the batch
+        run has to stop due to failhard.
+        """
+        failhard = False
+
+        # need to check if Minion failed to respond to job sent
+        failed_check = data.get("failed", False)
+        if failed_check:
+            log.debug(
+                "Minion '%s' failed to respond to job sent, data '%s'",
+                minion,
+                data,
+            )
+            if not self.quiet:
+                # We already know some minions didn't respond to the ping, so inform
+                # inform user attempt to run a job failed
+                salt.utils.stringutils.print_cli(
+                    "Minion '%s' failed to respond to job sent", minion
+                )
+
+            if self.opts.get("failhard"):
+                failhard = True
+        else:
+            # If we are executing multiple modules with the same cmd,
+            # We use the highest retcode.
+            retcode = 0
+            if "retcode" in data:
+                if isinstance(data["retcode"], dict):
+                    try:
+                        data["retcode"] = max(data["retcode"].values())
+                    except ValueError:
+                        data["retcode"] = 0
+                if self.opts.get("failhard") and data["retcode"] > 0:
+                    failhard = True
+                retcode = data["retcode"]
+
+            if self.opts.get("raw"):
+                ret[minion] = data
+                yield data, retcode
+            else:
+                ret[minion] = data["ret"]
+                yield {minion: data["ret"]}, retcode
+            if not self.quiet:
+                ret[minion] = data["ret"]
+                data[minion] = data.pop("ret")
+                if "out" in data:
+                    out = data.pop("out")
+                else:
+                    out = None
+                salt.output.display_output(data, out, self.opts)
+
+        if failhard:
+            log.error(
+                "Minion %s returned with non-zero exit code. "
+                "Batch run stopped due to failhard",
+                minion,
+            )
+        return failhard
+
     def __update_wait(self, wait):
         now = datetime.now()
         i = 0
@@ -122,6 +189,9 @@ class Batch:
         """
         Execute the batch run
         """
+        if self.opts.get("batch_stream"):
+            yield from self.run_stream()
+            return
         self.minions, self.ping_gen, self.down_minions = self.gather_minions()
         args = [
             [],
@@ -278,60 +348,8 @@ class Batch:
                     active.remove(minion)
                     if bwait:
                         wait.append(datetime.now() + timedelta(seconds=bwait))
-                failhard = False
-
-                # need to check if Minion failed to respond to job sent
-                failed_check = data.get("failed", False)
-                if failed_check:
-                    log.debug(
-                        "Minion '%s' failed to respond to job sent, data '%s'",
-                        minion,
-                        data,
-                    )
-                    if not self.quiet:
-                        # We already know some minions didn't respond to the ping, so inform
-                        # inform user attempt to run a job failed
-                        salt.utils.stringutils.print_cli(
-                            "Minion '%s' failed to respond to job sent", minion
-                        )
-
-                    if self.opts.get("failhard"):
-                        failhard = True
-                else:
-                    # If we are executing multiple modules with the same cmd,
-                    # We use the highest retcode.
-                    retcode = 0
-                    if "retcode" in data:
-                        if isinstance(data["retcode"], dict):
-                            try:
-                                data["retcode"] = max(data["retcode"].values())
-                            except ValueError:
-                                data["retcode"] = 0
-                        if self.opts.get("failhard") and data["retcode"] > 0:
-                            failhard = True
-                        retcode = data["retcode"]
-
-                    if self.opts.get("raw"):
-                        ret[minion] = data
-                        yield data, retcode
-                    else:
-                        ret[minion] = data["ret"]
-                        yield {minion: data["ret"]}, retcode
-                    if not self.quiet:
-                        ret[minion] = data["ret"]
-                        data[minion] = data.pop("ret")
-                        if "out" in data:
-                            out = data.pop("out")
-                        else:
-                            out = None
-                        salt.output.display_output(data, out, self.opts)
-
+                failhard = yield from self._process_return(minion, data, ret)
                 if failhard:
-                    log.error(
-                        "Minion %s returned with non-zero exit code. "
-                        "Batch run stopped due to failhard",
-                        minion,
-                    )
                     return
 
             # remove inactive iterators from the iters list
@@ -346,3 +364,242 @@ class Batch:
                             if bwait:
                                 wait.append(datetime.now() + timedelta(seconds=bwait))
         self.local.destroy()
+
+    def _open_state(self):
+        """
+        Open the batch state file, and return the minions an earlier run of
+        the same job already finished on
+        """
+        self._state_fp = None
+        path = self.opts.get("batch_state_file")
+        if not path:
+            return set()
+        header = salt.utils.json.dumps(
+            {
+                "tgt": self.opts["tgt"],
+                "fun": self.opts["fun"],
+                "arg": self.opts["arg"],
+            },
+            sort_keys=True,
+        )
+        done = set()
+        if os.path.isfile(path):
+            with salt.utils.files.fopen(path, "r") as fp_:
+                lines = fp_.read().splitlines()
+            if lines and lines[0] == header:
+                done.update(lines[1:])
+            else:
+                log.warning(
+                    "Batch state file %s is for a different job, starting over",
+                    path,
+                )
+        if done:
+            self._state_fp = salt.utils.files.fopen(path, "a")
+        else:
+            self._state_fp = salt.utils.files.fopen(path, "w")
+            self._state_fp.write(header + "\n")
+            self._state_fp.flush()
+        return done
+
+    def _record_state(self, minion):
+        if self._state_fp is not None:
+            self._state_fp.write(minion + "\n")
+            self._state_fp.flush()
+
+    def _close_state(self, finished):
+        if self._state_fp is None:
+            return
+        self._state_fp.close()
+        self._state_fp = None
+        if finished:
+            # Nothing left to resume
+            os.remove(self.opts["batch_state_file"])
+
+    def _publish(self, minions, fun, arg, timeout, **kwargs):
+        """
+        Publish a job to a list of minions, returning the pub data
+        """
+        return self.local.run_job(
+            minions,
+            fun,
+            arg,
+            tgt_type="list",
+            timeout=timeout,
+            listen=True,
+            **kwargs,
+        )
+
+    def run_stream(self):
+        """
+        Execute the batch run without pinging the targets first. The batches
+        are sent to the minions the master expects to match the target, and
+        a slot is refilled as soon as the return of a minion arrives on the
+        event bus. A minion which did not return within the timeout is asked
+        whether it is still running the job, and is considered failed if it
+        does not answer within gather_job_timeout.
+        """
+        tgt_type = self.opts.get("selected_target_option") or self.opts.get(
+            "tgt_type", "glob"
+        )
+        self.minions = sorted(self.local.gather_minions(self.opts["tgt"], tgt_type))
+        if not self.minions:
+            if not self.quiet:
+                salt.utils.stringutils.print_cli("No minions matched the target.")
+            return
+        bnum = self.get_bnum()
+        if not bnum:
+            return
+
+        done = self._open_state()
+        self.resumed = done & set(self.minions)
+        if done and not self.quiet:
+            salt.utils.stringutils.print_cli(
+                "Resuming batch run, skipping {} minions which already "
+                "returned".format(len(done & set(self.minions)))
+            )
+        to_run = [minion for minion in self.minions if minion not in done]
+        to_run.reverse()
+
+        timeout = self.opts["timeout"]
+        gather_job_timeout = self.opts["gather_job_timeout"]
+        bwait = self.opts.get("batch_wait", 0)
+        show_jid = self.options.show_jid if self.options else False
+        return_value = self.opts.get("return", self.opts.get("ret", ""))
+        event = self.local.event
+
+        # minion -> {"jid": job id, "deadline": time, "checking": find_job jid}
+        running = {}
+        # the times at which slots held by batch_wait are freed
+        wait = []
+        jids = set()
+        ret = {}
+        finished = False
+
+        def _finish(minion):
+            del running[minion]
+            if bwait:
+                wait.append(time.time() + bwait)
+
+        try:
+            while to_run or running:
+                now = time.time()
+                wait[:] = [free_at for free_at in wait if free_at > now]
+                slots = bnum - len(running) - len(wait)
+                if slots > 0 and to_run:
+                    next_ = [to_run.pop() for _ in range(min(slots, len(to_run)))]
+                    if not self.quiet:
+                        salt.utils.stringutils.print_cli(
+                            f"\nExecuting run on {sorted(next_)}\n"
+                        )
+                    pub_data = self._publish(
+                        next_,
+                        self.opts["fun"],
+                        self.opts["arg"],
+                        timeout,
+                        ret=return_value,
+                        **self.eauth,
+                    )
+                    jid = pub_data.get("jid")
+                    if jid:
+                        jids.add(jid)
+                        if show_jid:
+                            salt.utils.stringutils.print_cli(f"jid: {jid}")
+                    expected = set(pub_data.get("minions", ()))
+                    for minion in next_:
+                        running[minion] = {
+                            "jid": jid,
+                            "deadline": now + timeout,
+                            "checking": None,
+                        }
+                        if minion not in expected:
+                            # The master did not send the job to this minion
+                            _finish(minion)
+                            if (
+                                yield from self._process_return(
+                                    minion, {"failed": True}, ret
+                                )
+                            ):
+                                return
+                    continue
+
+                # Sleep until a return arrives or the next deadline is due
+                due = [info["deadline"] for info in running.values()]
+                if to_run and wait:
+                    due.append(min(wait))
+                evt = event.get_event(
+                    wait=max(min(due, default=now + 1) - now, 0.01),
+                    tag="salt/job/",
+                    full=True,
+                    match_type="startswith",
+                )
+                now = time.time()
+                if evt and "/heartbeat/" in evt["tag"]:
+                    # The minion is still running the job, do not ask it
+                    info = running.get(evt["data"].get("id"))
+                    if info is not None and evt["tag"].startswith(
+                        "salt/job/{}/".format(info["jid"])
+                    ):
+                        info["deadline"] = now + salt.client.heartbeat_ttl(
+                            evt["data"], timeout
+                        )
+                        info["checking"] = None
+                elif evt and "/ret/" in evt["tag"]:
+                    data = evt["data"]
+                    minion = data.get("id")
+                    info = running.get(minion)
+                    if info is None:
+                        pass
+                    elif data.get("jid") == info["jid"]:
+                        _finish(minion)
+                        self._record_state(minion)
+                        if self.opts.get("raw"):
+                            minion_ret = evt
+                        else:
+                            minion_ret = {
+                                "ret": data.get("return", {}),
+                                "retcode": data.get("retcode", 0),
+                            }
+                            if "out" in data:
+                                minion_ret["out"] = data["out"]
+                        if (yield from self._process_return(minion, minion_ret, ret)):
+                            return
+                    elif data.get("jid") == info["checking"]:
+                        if data.get("return"):
+                            # Still running, wait for another timeout
+                            info["deadline"] = now + timeout
+                            info["checking"] = None
+                        else:
+                            info["deadline"] = now
+
+                # Ask the minions which did not return in time whether they
+                # are still running the job, and give up on those which did
+                # not answer either
+                checks = {}
+                for minion, info in list(running.items()):
+                    if info["deadline"] > now:
+                        continue
+                    if info["checking"] is None and info["jid"]:
+                        checks.setdefault(info["jid"], []).append(minion)
+                        continue
+                    _finish(minion)
+                    if (yield from self._process_return(minion, {"failed": True}, ret)):
+                        return
+                for jid, minions in checks.items():
+                    pub_data = self._publish(
+                        minions,
+                        "saltutil.find_job",
+                        [jid],
+                        gather_job_timeout,
+                        **self.eauth,
+                    )
+                    for minion in minions:
+                        running[minion]["checking"] = pub_data.get("jid")
+                        running[minion]["deadline"] = now + gather_job_timeout
+                    if pub_data.get("jid"):
+                        jids.add(pub_data["jid"])
+            finished = True
+        finally:
+            for jid in jids:
+                event.unsubscribe(f"salt/job/{jid}")
+            self._close_state(finished)
+            self.local.destroy()
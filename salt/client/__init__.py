@@ -130,6 +130,17 @@ def get_local_client(
     )
 
 
+def heartbeat_ttl(data, timeout):
+    """
+    Return for how many seconds a job heartbeat event, whose data is
+    ``data``, shows that the minion which fired it still runs the job.
+
+    .. versionadded:: 3008.0
+    """
+    interval = data.get("data", {}).get("interval", 0)
+    return max(timeout, 2 * interval)
+
+
 class LocalClient:
     """
     The interface used by the :command:`salt` CLI tool on the Salt Master
@@ -1145,6 +1156,8 @@ class LocalClient:
 
         # timeouts per minion, id_ -> timeout time
         minion_timeouts = {}
+        # minions known to run the job from their heartbeats, id_ -> until
+        alive_until = {}
 
         found = set()
         missing = set()
@@ -1201,6 +1214,13 @@ class LocalClient:
                         missing.update(raw["data"]["missing"])
                     continue
 
+                if raw["tag"].startswith(f"salt/job/{jid}/heartbeat/"):
+                    # The minion is still running the job, there is no need
+                    # to ask it with saltutil.find_job for a while
+                    alive_until[raw["data"]["id"]] = time.time() + heartbeat_ttl(
+                        raw["data"], timeout
+                    )
+                    continue
                 # Anything below this point is expected to be a job return event.
                 if not raw["tag"].startswith(f"salt/job/{jid}/ret/"):
                     log.debug("Skipping non return event: %s", raw["tag"])
@@ -1258,13 +1278,22 @@ class LocalClient:
                 if id_ not in minion_timeouts:
                     minion_timeouts[id_] = time.time() + timeout
 
+            # a minion which sent a heartbeat is still running the job
+            now = time.time()
+            pending = minions - found
+            for id_ in pending:
+                if alive_until.get(id_, 0) > minion_timeouts[id_]:
+                    minion_timeouts[id_] = alive_until[id_]
+
             # if the jinfo has timed out and some minions are still running the job
-            # re-do the ping
-            if time.time() > timeout_at and minions_running:
+            # re-do the ping, to the minions which did not send a heartbeat
+            silent = [id_ for id_ in pending if alive_until.get(id_, 0) <= now]
+            if now > timeout_at and minions_running and pending and not silent:
+                # nobody to ask, wait until the first heartbeat runs out
+                timeout_at = min(alive_until[id_] for id_ in pending)
+            elif now > timeout_at and minions_running:
                 # since this is a new ping, no one has responded yet
-                jinfo = self.gather_job_info(
-                    jid, list(minions - found), "list", **kwargs
-                )
+                jinfo = self.gather_job_info(jid, silent, "list", **kwargs)
                 minions_running = False
                 # if we weren't assigned any jid that means the master thinks
                 # we have nothing to send
@@ -0,0 +1,378 @@
+"""
+An asyncio native client to publish jobs from the Salt Master
+
+.. versionadded:: 3008.0
+
+:py:class:`~salt.client.LocalClient` waits for the returns of each job in a
+blocking loop with its own event subscriptions, so driving many jobs at once
+takes a thread or a process per job. ``AsyncLocalClient`` reads the master
+event bus over a single connection and hands each job return to the job it
+belongs to, so a single event loop can wait on thousands of jobs:
+
+.. code-block:: python
+
+    import asyncio
+
+    import salt.client.asynchronous
+
+
+    async def main():
+        async with salt.client.asynchronous.AsyncLocalClient() as client:
+            rets = await asyncio.gather(
+                client.cmd("web*", "state.apply", ["nginx"]),
+                client.cmd("db*", "state.apply", ["postgres"]),
+            )
+            async for ret in client.cmd_iter("*", "test.ping"):
+                print(ret)
+
+
+    asyncio.run(main())
+
+The client must be created while the asyncio event loop is running.
+"""
+
+import asyncio
+import logging
+import os
+
+import tornado.ioloop
+
+import salt.client
+import salt.syspaths as syspaths
+import salt.transport
+import salt.utils.event
+import salt.utils.jid
+
+log = logging.getLogger(__name__)
+
+# Put on the queue of every job when the client is closed
+_CLOSED = object()
+
+
+class AsyncLocalClient:
+    """
+    Publish jobs and wait for their returns from asyncio code
+
+    :param str c_path: Path of the master config file to use.
+
+    :param dict mopts: When provided, use this dictionary of options instead
+                       of loading the config file from ``c_path``.
+    """
+
+    def __init__(
+        self,
+        c_path=os.path.join(syspaths.CONFIG_DIR, "master"),
+        mopts=None,
+    ):
+        self.io_loop = tornado.ioloop.IOLoop.current()
+        self.local = salt.client.LocalClient(c_path, mopts=mopts)
+        self.opts = self.local.opts
+        # jid -> queue of the (tag, data) events of the job
+        self._jobs = {}
+        self._subscriber = None
+
+    async def connect(self, timeout=None):
+        """
+        Connect to the master event bus. Jobs can only be published once the
+        client is connected, so that no return is missed.
+        """
+        if self._subscriber is not None:
+            return
+        self._subscriber = salt.transport.ipc_publish_client(
+            "master", self.opts, io_loop=self.io_loop
+        )
+        await self._subscriber.connect(timeout=timeout)
+        self._subscriber.on_recv(self._handle_event)
+
+    async def _handle_event(self, raw):
+        tag, data = salt.utils.event.SaltEvent.unpack(raw)
+        # The events of a job are tagged salt/job/<jid>/..., so routing them
+        # is a dictionary lookup however many jobs are waiting
+        if not tag.startswith("salt/job/"):
+            return
+        queue = self._jobs.get(tag.split("/", 3)[2])
+        if queue is not None:
+            queue.put_nowait((tag, data))
+
+    def close(self):
+        """
+        Disconnect from the master event bus, the pending iterators over job
+        returns stop
+        """
+        if self._subscriber is not None:
+            self._subscriber.close()
+            self._subscriber = None
+        for queue in self._jobs.values():
+            queue.put_nowait(_CLOSED)
+        self._jobs.clear()
+        self.local.destroy()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    async def run_job(
+        self,
+        tgt,
+        fun,
+        arg=(),
+        tgt_type="glob",
+        ret="",
+        timeout=None,
+        jid="",
+        kwarg=None,
+        **kwargs,
+    ):
+        """
+        Publish a job, and start collecting its returns
+
+        :return: The ``pub_data`` of the job, a dictionary with the job id and
+            the list of the minions which are expected to return, or an empty
+            dictionary if nothing was published. The returns of the job must
+            then be read with :py:meth:`get_returns`, or dropped with
+            :py:meth:`forget`.
+        """
+        await self.connect()
+        # The job id is chosen here, so the returns of the job are routed to
+        # it even if they arrive before the publish call returned
+        jid = jid or salt.utils.jid.gen_jid(self.opts)
+        self._jobs[jid] = asyncio.Queue()
+        try:
+            pub_data = await self.local.run_job_async(
+                tgt,
+                fun,
+                arg,
+                tgt_type=tgt_type,
+                ret=ret,
+                timeout=timeout,
+                jid=jid,
+                kwarg=kwarg,
+                listen=False,
+                io_loop=self.io_loop,
+                **kwargs,
+            )
+        except BaseException:
+            self.forget(jid)
+            raise
+        if not pub_data or not pub_data.get("minions"):
+            self.forget(jid)
+        return pub_data
+
+    def forget(self, jid):
+        """
+        Stop collecting the returns of a job
+        """
+        self._jobs.pop(jid, None)
+
+    async def _find_job(self, jid, minions, gather_job_timeout):
+        """
+        Return the minions which are still running a job
+        """
+        pub_data = await self.run_job(
+            sorted(minions),
+            "saltutil.find_job",
+            [jid],
+            tgt_type="list",
+            timeout=gather_job_timeout,
+        )
+        if not pub_data:
+            return set()
+        running = set()
+        try:
+            async for ret in self._iter_events(
+                pub_data["jid"], set(pub_data["minions"]), set(), gather_job_timeout
+            ):
+                minion, data = next(iter(ret.items()))
+                # saltutil.find_job returns an empty dict if the job is not
+                # running anymore
+                if isinstance(data["ret"], dict) and data["ret"]:
+                    running.add(minion)
+        finally:
+            self.forget(pub_data["jid"])
+        return running
+
+    async def _iter_events(self, jid, minions, found, timeout, alive=None):
+        """
+        Yield the returns of a job until all of ``minions`` are in ``found``
+        or the timeout expired. The returns already queued are always read.
+        The heartbeats of the minions are recorded in ``alive``.
+        """
+        queue = self._jobs.get(jid)
+        if queue is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if not queue.empty():
+                event = queue.get_nowait()
+            elif not minions - found:
+                return
+            else:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), max(deadline - loop.time(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    return
+            if event is _CLOSED:
+                return
+            tag, data = event
+            if "minions" in data:
+                # The new job event, or a syndic reporting the minions it
+                # sent the job to
+                minions.update(data["minions"])
+                continue
+            if tag.startswith(f"salt/job/{jid}/heartbeat/"):
+                if alive is not None:
+                    alive[data["id"]] = loop.time() + salt.client.heartbeat_ttl(data, 0)
+                continue
+            if not tag.startswith(f"salt/job/{jid}/ret/"):
+                continue
+            if "return" not in data:
+                log.warning("Malformed event return: %s", tag)
+                continue
+            found.add(data["id"])
+            ret = {"ret": data["return"]}
+            for key in ("out", "retcode", "jid"):
+                if key in data:
+                    ret[key] = data[key]
+            yield {data["id"]: ret}
+
+    async def get_returns(
+        self,
+        jid,
+        minions,
+        timeout=None,
+        gather_job_timeout=None,
+        expect_minions=False,
+    ):
+        """
+        Yield the returns of a job published with :py:meth:`run_job` as they
+        arrive
+
+        When ``timeout`` passed, the minions which did not return yet are
+        asked whether they are still running the job. The minions which still
+        run it are waited on for another ``timeout``, the others are given up
+        on, and yielded as ``{minion: {"failed": True}}`` if
+        ``expect_minions`` is True. Cancelling the task reading the returns,
+        or closing the iterator, stops collecting the returns of the job.
+        """
+        if timeout is None:
+            timeout = self.opts["timeout"]
+        if gather_job_timeout is None:
+            gather_job_timeout = self.opts["gather_job_timeout"]
+        loop = asyncio.get_running_loop()
+        waiting = set(minions)
+        found = set()
+        # minion -> until when its heartbeats show it runs the job
+        alive = {}
+        wait = timeout
+        try:
+            while True:
+                async for ret in self._iter_events(jid, waiting, found, wait, alive):
+                    yield ret
+                pending = waiting - found
+                if not pending or jid not in self._jobs:
+                    break
+                # Only ask the minions which did not send a heartbeat lately
+                now = loop.time()
+                silent = {minion for minion in pending if alive.get(minion, 0) <= now}
+                wait = timeout
+                if not silent:
+                    wait = min(alive[minion] for minion in pending) - now
+                    continue
+                running = await self._find_job(jid, silent, gather_job_timeout)
+                # The returns which arrived in the meantime are read by the
+                # next pass, whether or not the minion was given up on
+                waiting -= silent - running
+                if running:
+                    log.debug("Minions %s are still running job %s", running, jid)
+        finally:
+            self.forget(jid)
+        if expect_minions:
+            for minion in sorted(set(minions) | waiting):
+                if minion not in found:
+                    yield {minion: {"failed": True}}
+
+    async def cmd_iter(
+        self,
+        tgt,
+        fun,
+        arg=(),
+        timeout=None,
+        tgt_type="glob",
+        ret="",
+        kwarg=None,
+        expect_minions=False,
+        **kwargs,
+    ):
+        """
+        Publish a job and yield the returns of the minions as they arrive,
+        like :py:meth:`LocalClient.cmd_iter <salt.client.LocalClient.cmd_iter>`
+
+        .. code-block:: python
+
+            >>> async for ret in client.cmd_iter('*', 'test.ping'):
+            ...     print(ret)
+            {'jerry': {'ret': True, 'retcode': 0, 'jid': '20131219215650131543'}}
+        """
+        gather_job_timeout = kwargs.pop("gather_job_timeout", None)
+        pub_data = await self.run_job(
+            tgt,
+            fun,
+            arg,
+            tgt_type=tgt_type,
+            ret=ret,
+            timeout=timeout,
+            kwarg=kwarg,
+            **kwargs,
+        )
+        if not pub_data:
+            return
+        async for minion_ret in self.get_returns(
+            pub_data["jid"],
+            pub_data["minions"],
+            timeout=timeout,
+            gather_job_timeout=gather_job_timeout,
+            expect_minions=expect_minions,
+        ):
+            yield minion_ret
+
+    async def cmd(
+        self,
+        tgt,
+        fun,
+        arg=(),
+        timeout=None,
+        tgt_type="glob",
+        ret="",
+        kwarg=None,
+        full_return=False,
+        **kwargs,
+    ):
+        """
+        Publish a job and return the returns of all the minions, like
+        :py:meth:`LocalClient.cmd <salt.client.LocalClient.cmd>`
+
+        .. code-block:: python
+
+            >>> await client.cmd('*', 'cmd.run', ['whoami'])
+            {'jerry': 'root'}
+        """
+        rets = {}
+        async for minion_ret in self.cmd_iter(
+            tgt,
+            fun,
+            arg,
+            timeout=timeout,
+            tgt_type=tgt_type,
+            ret=ret,
+            kwarg=kwarg,
+            **kwargs,
+        ):
+            minion, data = next(iter(minion_ret.items()))
+            rets[minion] = data if full_return else data["ret"]
+        return rets
@@ -3,6 +3,7 @@ Create ssh executor system
 """
 
 import base64
+import concurrent.futures
 import copy
 import datetime
 import getpass
@@ -376,7 +377,19 @@ class SSH(MultiprocessingStateMixin):
                 saltext_allowlist=self.opts.get("thin_saltext_allowlist"),
                 saltext_blocklist=self.opts.get("thin_saltext_blocklist"),
             )
+            if self.opts.get("thin_layers"):
+                # Split the thin once, before the targets are handled
+                salt.utils.thin.gen_thin_layers(self.opts["cachedir"])
         self.mods = mod_data(self.fsclient)
+        if (
+            self.opts.get("ssh_state_cache")
+            and "_ssh_state_cache_fileserver" not in self.opts
+        ):
+            # Hash the files of the fileserver once for all the targets,
+            # rather than for each of them
+            self.opts["_ssh_state_cache_fileserver"] = fileserver_fingerprint(
+                self.fsclient
+            )
 
     # __setstate__ and __getstate__ are only used on spawning platforms.
     def __setstate__(self, state):
@@ -630,6 +643,12 @@ class SSH(MultiprocessingStateMixin):
         """
         Run the routine in a "Thread", put a dict on the queue
         """
+        que.put(self._run_routine(opts, host, target, mine))
+
+    def _run_routine(self, opts, host, target, mine=False):
+        """
+        Run the routine against a target, and return its return and retcode
+        """
         opts = copy.deepcopy(opts)
         single = Single(
             opts,
@@ -680,13 +699,86 @@ class SSH(MultiprocessingStateMixin):
                 "data": None,
             }
             retcode = max(retcode, 1)
-        que.put((ret, retcode))
+        return ret, retcode
+
+    def _prep_target(self, host):
+        """
+        Fill in the defaults of a target, return the return of the target
+        if it cannot be run
+        """
+        for default in self.defaults:
+            if default not in self.targets[host]:
+                self.targets[host][default] = self.defaults[default]
+        if "host" not in self.targets[host]:
+            self.targets[host]["host"] = host
+        if self.targets[host].get("winrm") and not HAS_WINSHELL:
+            log_msg = (
+                "Please contact sales@saltstack.com for access to the"
+                " enterprise saltwinshell module."
+            )
+            log.debug(log_msg)
+            return {
+                "fun_args": [],
+                "jid": None,
+                "return": log_msg,
+                "retcode": 1,
+                "fun": "",
+                "id": host,
+            }
+        return None
+
+    def _handle_ssh_threads(self, mine=False):
+        """
+        Run the routines of the targets in a pool of ssh_max_procs threads of
+        this process, and yield their returns as they complete
+        """
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.opts.get("ssh_max_procs", 25),
+            thread_name_prefix="salt-ssh",
+        )
+        running = {}
+        try:
+            for host in self.targets:
+                no_ret = self._prep_target(host)
+                if no_ret is not None:
+                    yield {host: no_ret}, 1
+                    continue
+                future = pool.submit(
+                    self._run_routine, self.opts, host, self.targets[host], mine
+                )
+                running[future] = host
+            for future in concurrent.futures.as_completed(running):
+                host = running[future]
+                try:
+                    ret, retcode = future.result()
+                except Exception as err:  # pylint: disable=broad-except
+                    error = (
+                        "Target '{}' did not return any data, "
+                        "probably due to an error: {}".format(host, err)
+                    )
+                    log.error(error, exc_info_on_loglevel=logging.DEBUG)
+                    yield {host: error}, 1
+                    continue
+                yield {ret["id"]: ret["ret"]}, retcode
+        finally:
+            # Do not start the routines which did not start yet when the
+            # caller stops reading the returns. shutdown() only takes
+            # cancel_futures from Python 3.9 on.
+            for future in running:
+                future.cancel()
+            pool.shutdown(wait=False)
 
     def handle_ssh(self, mine=False):
         """
         Spin up the needed threads or processes and execute the subsequent
         routines
         """
+        if not self.targets:
+            log.error("No matching targets found in roster.")
+            return
+        if self.opts.get("ssh_fanout", "process") == "thread":
+            yield from self._handle_ssh_threads(mine=mine)
+            return
         que = multiprocessing.Queue()
         running = {}
         target_iter = iter(self.targets)
@@ -694,36 +786,16 @@ class SSH(MultiprocessingStateMixin):
         rets = set()
         init = False
         while True:
-            if not self.targets:
-                log.error("No matching targets found in roster.")
-                break
             if len(running) < self.opts.get("ssh_max_procs", 25) and not init:
                 try:
                     host = next(target_iter)
                 except StopIteration:
                     init = True
                     continue
-                for default in self.defaults:
-                    if default not in self.targets[host]:
-                        self.targets[host][default] = self.defaults[default]
-                if "host" not in self.targets[host]:
-                    self.targets[host]["host"] = host
-                if self.targets[host].get("winrm") and not HAS_WINSHELL:
+                no_ret = self._prep_target(host)
+                if no_ret is not None:
                     returned.add(host)
                     rets.add(host)
-                    log_msg = (
-                        "Please contact sales@saltstack.com for access to the"
-                        " enterprise saltwinshell module."
-                    )
-                    log.debug(log_msg)
-                    no_ret = {
-                        "fun_args": [],
-                        "jid": None,
-                        "return": log_msg,
-                        "retcode": 1,
-                        "fun": "",
-                        "id": host,
-                    }
                     yield {host: no_ret}, 1
                     continue
                 args = (
@@ -1136,6 +1208,8 @@ class Single:
             )
         else:
             self.thin = thin if thin else salt.utils.thin.thin_path(opts["cachedir"])
+        # checksum -> path of the layers of the thin, with thin_layers
+        self.layers = {}
 
     def detect_os_arch(self):
         """
@@ -1273,6 +1347,8 @@ class Single:
                 self.thin,
                 os.path.join(self.thin_dir, "salt-relenv.tar.xz"),
             )
+        elif self.layers:
+            self.deploy_layers(self.layers)
         else:
             self.shell.send(
                 self.thin,
@@ -1281,6 +1357,20 @@ class Single:
         self.deploy_ext()
         return True
 
+    def deploy_layers(self, checksums):
+        """
+        Deploy the layers of salt-thin with the given checksums
+        """
+        for checksum in checksums:
+            if checksum not in self.layers:
+                log.error("Unknown salt-thin layer requested: %s", checksum)
+                continue
+            self.shell.send(
+                self.layers[checksum],
+                os.path.join(self.thin_dir, f"salt-layer-{checksum}.tgz"),
+            )
+        return True
+
     def deploy_ext(self):
         """
         Deploy the ext_mods tarball
@@ -1399,6 +1489,11 @@ class Single:
             opts_pkg["thin_dir"] = self.opts["thin_dir"]
             opts_pkg["master_tops"] = self.opts["master_tops"]
             opts_pkg["extra_filerefs"] = self.opts.get("extra_filerefs", "")
+            opts_pkg["ssh_state_cache"] = self.opts.get("ssh_state_cache", 0)
+            opts_pkg["ssh_state_cache_grains"] = self.opts.get("ssh_state_cache_grains")
+            opts_pkg["_ssh_state_cache_fileserver"] = self.opts.get(
+                "_ssh_state_cache_fileserver"
+            )
             opts_pkg["__master_opts__"] = self.context["master_opts"]
             if "known_hosts_file" in self.opts:
                 opts_pkg["known_hosts_file"] = self.opts["known_hosts_file"]
@@ -1590,6 +1685,10 @@ class Single:
             )
 
         thin_code_digest, thin_sum = salt.utils.thin.thin_sum(cachedir, "sha1")
+        layers = []
+        if self.opts.get("thin_layers"):
+            layers = salt.utils.thin.gen_thin_layers(cachedir, thin_sum)
+            self.layers = {checksum: path for _, checksum, path in layers}
         arg_str = '''
 OPTIONS.config = \
 """
@@ -1605,6 +1704,7 @@ OPTIONS.wipe = {wipe}
 OPTIONS.tty = {tty}
 OPTIONS.cmd_umask = {cmd_umask}
 OPTIONS.code_checksum = {code_checksum}
+OPTIONS.layers = {layers}
 ARGS = {arguments}\n'''.format(
             config=self.minion_config,
             delimeter=RSTR,
@@ -1617,6 +1717,7 @@ ARGS = {arguments}\n'''.format(
             tty=self.tty,
             cmd_umask=self.cmd_umask,
             code_checksum=thin_code_digest,
+            layers=[(layer, checksum) for layer, checksum, _ in layers],
             arguments=self.argv,
         )
         py_code = SSH_PY_SHIM.replace("#%%OPTS", arg_str)
@@ -1764,11 +1865,16 @@ ARGS = {arguments}\n'''.format(
             # is a SHIM command for the master.
             shim_command = re.split(r"\r?\n", stdout, 1)[0].strip()
             log.debug("SHIM retcode(%s) and command: %s", retcode, shim_command)
+            shim_command, _, missing_layers = shim_command.partition(" ")
             if (
-                "deploy" == shim_command
+                shim_command in ("deploy", "layers")
                 and retcode == salt.defaults.exitcodes.EX_THIN_DEPLOY
             ):
-                self.deploy()
+                if shim_command == "layers":
+                    # Only the layers of the thin the target does not have
+                    self.deploy_layers(missing_layers.split())
+                else:
+                    self.deploy()
                 stdout, stderr, retcode = self.shim_cmd(cmd_str)
                 if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
                     if not self.tty:
@@ -1954,6 +2060,22 @@ def salt_refs(data):
     return ret
 
 
+def fileserver_fingerprint(fsclient):
+    """
+    Return a digest of the files of the fileserver, which changes when a file
+    is added, removed or modified
+    """
+    fileserver = {}
+    for saltenv in sorted(fsclient.envs()):
+        fileserver[saltenv] = {
+            path: (fsclient.hash_file(f"salt://{path}", saltenv) or {}).get("hsum")
+            for path in fsclient.file_list(saltenv)
+        }
+    return salt.utils.hashutils.sha256_digest(
+        salt.utils.json.dumps(fileserver, sort_keys=True)
+    )
+
+
 def mod_data(fsclient):
     """
     Generate the module arguments for the shim data
@@ -160,9 +160,8 @@ class Shell:
         """
         Return options to pass to ssh
         """
-        # TODO ControlMaster does not work without ControlPath
-        # user could take advantage of it if they set ControlPath in their
-        # ssh config.  Also, ControlPersist not widely available.
+        # ControlMaster does not work without ControlPath, which is set when
+        # ssh_control_persist is, or by the user in their ssh config.
         options = [
             "ControlMaster=auto",
             "StrictHostKeyChecking=no",
@@ -202,6 +201,31 @@ class Shell:
     def _ssh_opts(self):
         return " ".join([f"-o {opt}" for opt in self.ssh_options])
 
+    def _control_opts(self):
+        """
+        Return the options sharing one persistent master connection to the
+        host between the ssh and scp commands, of this and of the later
+        salt-ssh runs, when ssh_control_persist is set
+        """
+        persist = self.opts.get("ssh_control_persist")
+        if not persist:
+            return ""
+        control_dir = os.path.join(self.opts["cachedir"], "ssh_control")
+        if not os.path.isdir(control_dir):
+            os.makedirs(control_dir, mode=0o700, exist_ok=True)
+        if self.opts.get("_ssh_version", (0,)) >= (6, 7):
+            # A hash of the connection parameters, which keeps the socket
+            # path within the length limit of unix sockets
+            control_path = os.path.join(control_dir, "%C")
+        else:
+            control_path = os.path.join(control_dir, "%r@%h:%p")
+        options = [
+            "ControlMaster=auto",
+            f"ControlPath={control_path}",
+            f"ControlPersist={persist}",
+        ]
+        return " ".join([f"-o {opt}" for opt in options])
+
     def _copy_id_str_old(self):
         """
         Return the string to execute ssh-copy-id
@@ -263,6 +287,9 @@ class Shell:
             command.append("-t -t")
         if self.passwd or self.priv:
             command.append(self.priv and self._key_opts() or self._passwd_opts())
+        control_opts = self._control_opts()
+        if control_opts:
+            command.append(control_opts)
         if ssh != SCP_PATH and self.remote_port_forwards:
             command.append(
                 " ".join(
@@ -20,6 +20,8 @@ import time
 
 THIN_ARCHIVE = "salt-thin.tgz"
 EXT_ARCHIVE = "salt-ext_mods.tgz"
+LAYER_ARCHIVE = "salt-layer-{0}.tgz"
+LAYERS_DIR = ".layers"
 
 # Keep these in sync with salt/defaults/exitcodes.py
 EX_THIN_PYTHON_INVALID = 10
@@ -179,6 +181,77 @@ def unpack_thin(thin_path):
     reset_time(OPTIONS.saltdir)
 
 
+def need_layers(missing):
+    """
+    Signal that layers of the Salt thin need to be deployed.
+    """
+    sys.stdout.write("{0}\nlayers {1}\n".format(OPTIONS.delimiter, " ".join(missing)))
+    sys.exit(EX_THIN_DEPLOY)
+
+
+def installed_layer(layer):
+    """
+    Return the checksum of the version of a layer of the Salt thin which is
+    unpacked in the thin directory.
+    """
+    manifest = os.path.join(OPTIONS.saltdir, LAYERS_DIR, layer)
+    if not os.path.isfile(manifest):
+        return None
+    with open(manifest, "r", encoding="utf-8") as fp_:
+        return fp_.readline().strip()
+
+
+def unpack_layer(layer, checksum, layer_path):
+    """
+    Unpack a layer of the Salt thin, in place of the files of the version of
+    the layer which was unpacked before.
+    """
+    manifest = os.path.join(OPTIONS.saltdir, LAYERS_DIR, layer)
+    if os.path.isfile(manifest):
+        with open(manifest, "r", encoding="utf-8") as fp_:
+            fp_.readline()
+            for name in fp_:
+                try:
+                    os.unlink(os.path.join(OPTIONS.saltdir, name.rstrip("\n")))
+                except OSError:
+                    pass
+    tfile = tarfile.TarFile.gzopen(layer_path)
+    old_umask = os.umask(0o077)  # pylint: disable=blacklisted-function
+    try:
+        tfile.extractall(path=OPTIONS.saltdir)  # nosec
+        names = tfile.getnames()
+        if not os.path.isdir(os.path.dirname(manifest)):
+            os.makedirs(os.path.dirname(manifest))
+        with open(manifest, "w", encoding="utf-8") as fp_:
+            fp_.write(checksum + "\n")
+            for name in names:
+                fp_.write(name + "\n")
+    finally:
+        tfile.close()
+        os.umask(old_umask)  # pylint: disable=blacklisted-function
+    os.unlink(layer_path)
+    reset_time(OPTIONS.saltdir)
+
+
+def check_layers():
+    """
+    Unpack the layers of the Salt thin which were deployed, and return the
+    checksums of the layers which are still missing.
+    """
+    missing = []
+    for layer, checksum in OPTIONS.layers:
+        layer_path = os.path.join(OPTIONS.saltdir, LAYER_ARCHIVE.format(checksum))
+        if os.path.isfile(layer_path):
+            if get_hash(layer_path, OPTIONS.hashfunc) == checksum:
+                unpack_layer(layer, checksum, layer_path)
+                continue
+            os.unlink(layer_path)
+            missing.append(checksum)
+        elif installed_layer(layer) != checksum:
+            missing.append(checksum)
+    return missing
+
+
 def need_ext():
     """
     Signal that external modules need to be deployed.
@@ -281,7 +354,7 @@ def main(argv):  # pylint: disable=W0613
     Main program body
     """
     thin_path = os.path.join(OPTIONS.saltdir, THIN_ARCHIVE)
-    if os.path.isfile(thin_path):
+    if os.path.isfile(thin_path) and not OPTIONS.layers:
         if OPTIONS.checksum != get_hash(thin_path, OPTIONS.hashfunc):
             need_deployment()
         unpack_thin(thin_path)
@@ -303,6 +376,12 @@ def main(argv):  # pylint: disable=W0613
         if not os.path.exists(OPTIONS.saltdir):
             need_deployment()
 
+        if OPTIONS.layers:
+            # Only the layers which changed since the last deployment are sent
+            missing = check_layers()
+            if missing:
+                need_layers(missing)
+
         code_checksum_path = os.path.normpath(
             os.path.join(OPTIONS.saltdir, "code-checksum")
         )
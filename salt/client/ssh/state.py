@@ -7,6 +7,7 @@ import os
 import shutil
 import tarfile
 import tempfile
+import time
 from contextlib import closing
 
 import salt.client.ssh
@@ -16,6 +17,7 @@ import salt.minion
 import salt.roster
 import salt.state
 import salt.utils.files
+import salt.utils.hashutils
 import salt.utils.json
 import salt.utils.path
 import salt.utils.stringutils
@@ -285,3 +287,129 @@ def prep_trans_tar(
         os.chdir(cwd)
     shutil.rmtree(gendir)
     return trans_tar
+
+
+def _state_cache_dir(opts):
+    # The cachedir of the wrapper opts is the one of the target
+    cachedir = opts.get("_caller_cachedir", opts["cachedir"])
+    return os.path.join(cachedir, "salt-ssh", "state_cache")
+
+
+def state_cache_key(opts, file_client, pillar, roster_grains, fun, *args, **kwargs):
+    """
+    Return the key the state tarball of a state run is cached under, or None
+    if ``ssh_state_cache`` is disabled
+
+    The key is a digest of what the compilation of the states depends on: the
+    state function and its arguments, the files of the fileserver, the pillar
+    and the grains of the target. Only the grains listed in
+    ``ssh_state_cache_grains`` are part of the key when it is set, so that the
+    targets which only differ by other grains share the state tarball. The
+    highstate and top functions compile the states the top file matches for
+    the target, so their key always includes the minion id. The digest of the files of the fileserver is computed once per salt-ssh run,
+    and passed in the ``_ssh_state_cache_fileserver`` option.
+    """
+    if not opts.get("ssh_state_cache"):
+        return None
+    grains = opts.get("grains") or {}
+    if opts.get("ssh_state_cache_grains") is not None:
+        grains = {name: grains.get(name) for name in opts["ssh_state_cache_grains"]}
+    fileserver = opts.get("_ssh_state_cache_fileserver")
+    if fileserver is None:
+        fileserver = salt.client.ssh.fileserver_fingerprint(file_client)
+    data = {
+        "fun": fun,
+        "args": args,
+        "kwargs": {key: val for key, val in kwargs.items() if not key.startswith("__")},
+        "opts": {
+            key: opts.get(key)
+            for key in (
+                "saltenv",
+                "pillarenv",
+                "state_top",
+                "state_top_saltenv",
+                "top_file_merging_strategy",
+                "env_order",
+                "default_top",
+                "renderer",
+                "extra_filerefs",
+                "test",
+            )
+        },
+        "fileserver": fileserver,
+        "pillar": pillar,
+        "roster_grains": roster_grains,
+        "grains": grains,
+        "id": opts.get("id") if fun in ("highstate", "top") else None,
+    }
+    return salt.utils.hashutils.sha256_digest(
+        salt.utils.json.dumps(data, sort_keys=True, default=repr)
+    )
+
+
+def cached_trans_tar(opts, key):
+    """
+    Return the path of the state tarball cached under ``key``, or None if
+    there is none younger than ``ssh_state_cache`` seconds
+    """
+    if key is None:
+        return None
+    path = os.path.join(_state_cache_dir(opts), f"{key}.tgz")
+    try:
+        if time.time() - os.path.getmtime(path) < opts["ssh_state_cache"]:
+            log.debug("Using the cached state tarball %s", path)
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def cache_trans_tar(opts, key, trans_tar):
+    """
+    Move a state tarball built by :py:func:`prep_trans_tar` to the cache under
+    ``key``, and return its new path. The expired tarballs are removed.
+    """
+    if key is None:
+        return trans_tar
+    cachedir = _state_cache_dir(opts)
+    os.makedirs(cachedir, exist_ok=True)
+    now = time.time()
+    for fname in os.listdir(cachedir):
+        path = os.path.join(cachedir, fname)
+        try:
+            if now - os.path.getmtime(path) >= opts["ssh_state_cache"]:
+                os.remove(path)
+        except OSError:
+            pass
+    path = os.path.join(cachedir, f"{key}.tgz")
+    shutil.move(trans_tar, path)
+    return path
+
+
+def trans_tar_path(opts, trans_tar_sum):
+    """
+    Return where a state tarball is sent on the target. With
+    ``ssh_state_cache``, it is named after its checksum, so that it is only
+    sent to the targets which do not hold it yet.
+    """
+    if opts.get("ssh_state_cache"):
+        return "{}/salt_state_{}.tgz".format(opts["thin_dir"], trans_tar_sum)
+    return "{}/salt_state.tgz".format(opts["thin_dir"])
+
+
+def send_trans_tar(single, trans_tar, path):
+    """
+    Send a state tarball to the target at the ``path`` returned by
+    :py:func:`trans_tar_path`, unless the target already holds it
+    """
+    thin_dir = single.opts["thin_dir"]
+    if path != f"{thin_dir}/salt_state.tgz" and not single.winrm:
+        # The state tarballs of the other state runs are removed when this
+        # one is missing
+        _, _, retcode = single.shell.exec_cmd(
+            f"test -f {path} || (rm -f {thin_dir}/salt_state_*.tgz; false)"
+        )
+        if retcode == 0:
+            log.debug("%s already holds %s", single.id, path)
+            return
+    single.shell.send(trans_tar, path)
@@ -870,6 +870,9 @@ class SSHCpClient(salt.fileclient.FSClient):
         # This client is used for a single execution, thus we can easily save
         # all affected file paths for a lookup later.
         self.target_map = {}
+        # The bulk file requests write to the local cache directly, without
+        # going through get_file, which sends each file to the target
+        self._serve_files_supported = False
 
     def _local_path_exists(self, path):
         file = self.convert_path(path, master=True)
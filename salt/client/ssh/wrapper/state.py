@@ -71,6 +71,36 @@ def _ssh_state(chunks, st_kwargs, kwargs, pillar, test=False):
     return {"local": salt.client.ssh.wrapper.parse_ret(stdout, stderr, retcode)}
 
 
+def _exec_state_pkg(opts, st_kwargs, trans_tar, test, cached=False):
+    """
+    Send a state tarball to the target and run it with state.pkg. The tarball
+    is removed afterwards, unless it is cached for the next state runs.
+    """
+    trans_tar_sum = salt.utils.hashutils.get_hash(trans_tar, opts["hash_type"])
+    pkg_path = salt.client.ssh.state.trans_tar_path(opts, trans_tar_sum)
+    cmd = "state.pkg {} test={} pkg_sum={} hash_type={}".format(
+        pkg_path, test, trans_tar_sum, opts["hash_type"]
+    )
+    single = salt.client.ssh.Single(
+        opts,
+        cmd,
+        fsclient=__context__["fileclient"],
+        minion_opts=__salt__.minion_opts,
+        **st_kwargs,
+    )
+    salt.client.ssh.state.send_trans_tar(single, trans_tar, pkg_path)
+    stdout, stderr, retcode = single.cmd_block()
+
+    if not cached:
+        # Clean up our tar
+        try:
+            os.remove(trans_tar)
+        except OSError:
+            pass
+
+    return {"local": salt.client.ssh.wrapper.parse_ret(stdout, stderr, retcode)}
+
+
 def _check_pillar(kwargs, pillar=None):
     """
     Check the pillar for errors, refuse to run the state if there are errors
@@ -175,6 +205,22 @@ def sls(mods, saltenv="base", test=None, exclude=None, **kwargs):
             __pillar__.update(pillar)
         st_.push_active()
         mods = _parse_mods(mods)
+        roster = salt.roster.Roster(opts, opts.get("roster", "flat"))
+        roster_grains = roster.opts["grains"]
+        cache_key = salt.client.ssh.state.state_cache_key(
+            opts,
+            __context__["fileclient"],
+            pillar,
+            roster_grains,
+            "sls",
+            mods,
+            saltenv,
+            exclude,
+            **kwargs,
+        )
+        trans_tar = salt.client.ssh.state.cached_trans_tar(opts, cache_key)
+        if trans_tar is not None:
+            return _exec_state_pkg(opts, st_kwargs, trans_tar, test, cached=True)
         high_data, errors = st_.render_highstate(
             {saltenv: mods}, context=__context__.value()
         )
@@ -212,9 +258,6 @@ def sls(mods, saltenv="base", test=None, exclude=None, **kwargs):
             ),
         )
 
-        roster = salt.roster.Roster(opts, opts.get("roster", "flat"))
-        roster_grains = roster.opts["grains"]
-
         # Create the tar containing the state pkg and relevant files.
         _cleanup_slsmod_low_data(chunks)
         trans_tar = salt.client.ssh.state.prep_trans_tar(
@@ -225,27 +268,10 @@ def sls(mods, saltenv="base", test=None, exclude=None, **kwargs):
             st_kwargs["id_"],
             roster_grains,
         )
-        trans_tar_sum = salt.utils.hashutils.get_hash(trans_tar, opts["hash_type"])
-        cmd = "state.pkg {}/salt_state.tgz test={} pkg_sum={} hash_type={}".format(
-            opts["thin_dir"], test, trans_tar_sum, opts["hash_type"]
-        )
-        single = salt.client.ssh.Single(
-            opts,
-            cmd,
-            fsclient=__context__["fileclient"],
-            minion_opts=__salt__.minion_opts,
-            **st_kwargs,
+        trans_tar = salt.client.ssh.state.cache_trans_tar(opts, cache_key, trans_tar)
+        return _exec_state_pkg(
+            opts, st_kwargs, trans_tar, test, cached=cache_key is not None
         )
-        single.shell.send(trans_tar, "{}/salt_state.tgz".format(opts["thin_dir"]))
-        stdout, stderr, retcode = single.cmd_block()
-
-        # Clean up our tar
-        try:
-            os.remove(trans_tar)
-        except OSError:
-            pass
-
-        return {"local": salt.client.ssh.wrapper.parse_ret(stdout, stderr, retcode)}
 
 
 def running(concurrent=False):
@@ -682,6 +708,19 @@ def highstate(test=None, **kwargs):
             # Ensure other wrappers use the correct pillar
             __pillar__.update(pillar)
         st_.push_active()
+        roster = salt.roster.Roster(opts, opts.get("roster", "flat"))
+        roster_grains = roster.opts["grains"]
+        cache_key = salt.client.ssh.state.state_cache_key(
+            opts,
+            __context__["fileclient"],
+            pillar,
+            roster_grains,
+            "highstate",
+            **kwargs,
+        )
+        trans_tar = salt.client.ssh.state.cached_trans_tar(opts, cache_key)
+        if trans_tar is not None:
+            return _exec_state_pkg(opts, st_kwargs, trans_tar, test, cached=True)
         chunks_or_errors = st_.compile_low_chunks(context=__context__.value())
         file_refs = salt.client.ssh.state.lowstate_file_refs(
             chunks_or_errors,
@@ -697,9 +736,6 @@ def highstate(test=None, **kwargs):
                 __context__["retcode"] = salt.defaults.exitcodes.EX_STATE_COMPILER_ERROR
                 return chunks_or_errors
 
-        roster = salt.roster.Roster(opts, opts.get("roster", "flat"))
-        roster_grains = roster.opts["grains"]
-
         # Create the tar containing the state pkg and relevant files.
         _cleanup_slsmod_low_data(chunks_or_errors)
         trans_tar = salt.client.ssh.state.prep_trans_tar(
@@ -710,27 +746,10 @@ def highstate(test=None, **kwargs):
             st_kwargs["id_"],
             roster_grains,
         )
-        trans_tar_sum = salt.utils.hashutils.get_hash(trans_tar, opts["hash_type"])
-        cmd = "state.pkg {}/salt_state.tgz test={} pkg_sum={} hash_type={}".format(
-            opts["thin_dir"], test, trans_tar_sum, opts["hash_type"]
+        trans_tar = salt.client.ssh.state.cache_trans_tar(opts, cache_key, trans_tar)
+        return _exec_state_pkg(
+            opts, st_kwargs, trans_tar, test, cached=cache_key is not None
         )
-        single = salt.client.ssh.Single(
-            opts,
-            cmd,
-            fsclient=__context__["fileclient"],
-            minion_opts=__salt__.minion_opts,
-            **st_kwargs,
-        )
-        single.shell.send(trans_tar, "{}/salt_state.tgz".format(opts["thin_dir"]))
-        stdout, stderr, retcode = single.cmd_block()
-
-        # Clean up our tar
-        try:
-            os.remove(trans_tar)
-        except OSError:
-            pass
-
-        return {"local": salt.client.ssh.wrapper.parse_ret(stdout, stderr, retcode)}
 
 
 def top(topfn, test=None, **kwargs):
@@ -773,6 +792,20 @@ def top(topfn, test=None, **kwargs):
             __pillar__.update(pillar)
         st_.opts["state_top"] = os.path.join("salt://", topfn)
         st_.push_active()
+        roster = salt.roster.Roster(opts, opts.get("roster", "flat"))
+        roster_grains = roster.opts["grains"]
+        cache_key = salt.client.ssh.state.state_cache_key(
+            opts,
+            __context__["fileclient"],
+            pillar,
+            roster_grains,
+            "top",
+            topfn,
+            **kwargs,
+        )
+        trans_tar = salt.client.ssh.state.cached_trans_tar(opts, cache_key)
+        if trans_tar is not None:
+            return _exec_state_pkg(opts, st_kwargs, trans_tar, test, cached=True)
         chunks_or_errors = st_.compile_low_chunks(context=__context__.value())
         # Check for errors
         for chunk in chunks_or_errors:
@@ -788,9 +821,6 @@ def top(topfn, test=None, **kwargs):
             ),
         )
 
-        roster = salt.roster.Roster(opts, opts.get("roster", "flat"))
-        roster_grains = roster.opts["grains"]
-
         # Create the tar containing the state pkg and relevant files.
         _cleanup_slsmod_low_data(chunks_or_errors)
         trans_tar = salt.client.ssh.state.prep_trans_tar(
@@ -801,27 +831,10 @@ def top(topfn, test=None, **kwargs):
             st_kwargs["id_"],
             roster_grains,
         )
-        trans_tar_sum = salt.utils.hashutils.get_hash(trans_tar, opts["hash_type"])
-        cmd = "state.pkg {}/salt_state.tgz test={} pkg_sum={} hash_type={}".format(
-            opts["thin_dir"], test, trans_tar_sum, opts["hash_type"]
-        )
-        single = salt.client.ssh.Single(
-            opts,
-            cmd,
-            fsclient=__context__["fileclient"],
-            minion_opts=__salt__.minion_opts,
-            **st_kwargs,
+        trans_tar = salt.client.ssh.state.cache_trans_tar(opts, cache_key, trans_tar)
+        return _exec_state_pkg(
+            opts, st_kwargs, trans_tar, test, cached=cache_key is not None
         )
-        single.shell.send(trans_tar, "{}/salt_state.tgz".format(opts["thin_dir"]))
-        stdout, stderr, retcode = single.cmd_block()
-
-        # Clean up our tar
-        try:
-            os.remove(trans_tar)
-        except OSError:
-            pass
-
-        return {"local": salt.client.ssh.wrapper.parse_ret(stdout, stderr, retcode)}
 
 
 def show_highstate(**kwargs):
@@ -309,6 +309,9 @@ VALID_OPTS = immutabletypes.freeze(
         "multiprocessing": bool,
         # Maximum number of concurrently active processes at any given point in time
         "process_count_max": int,
+        # The number of seconds between the heartbeat events a minion fires
+        # on the master for each job it runs, 0 disables them
+        "job_heartbeat_interval": int,
         # Whether or not the salt minion should run scheduled mine updates
         "mine_enabled": bool,
         # Whether or not scheduled mine updates should be accompanied by a job return for the job cache
@@ -321,6 +324,22 @@ VALID_OPTS = immutabletypes.freeze(
         "ipv6": (type(None), bool),
         # The chunk size to use when streaming files with the file server
         "file_buffer_size": int,
+        # The number of file chunk requests a minion keeps in flight
+        "file_client_window": int,
+        # Store files in the minion file cache once per content hash
+        "file_client_object_store": bool,
+        # Stream large files from the master's file transfer server
+        "file_client_transfer": bool,
+        # Keep the file lists received from the master and only fetch the
+        # changes to them
+        "file_client_list_cache": bool,
+        # Serve large files to minions from a dedicated file transfer process
+        "fileserver_transfer": bool,
+        # The TCP port of the master's file transfer process
+        "fileserver_transfer_port": int,
+        # Have the fileserver update process index which backend each file is
+        # in, so that find_file asks that backend first
+        "fileserver_routing_index": bool,
         # The TCP port on which minion events should be published if ipc_mode is TCP
         "tcp_pub_port": int,
         # The TCP port on which minion events should be pulled if ipc_mode is TCP
@@ -402,6 +421,9 @@ VALID_OPTS = immutabletypes.freeze(
         "state_auto_order": bool,
         # Fire events as state chunks are processed by the state compiler
         "state_events": bool,
+        # Reuse the rendered highstate when none of the SLS files, the pillar
+        # or the grains it was rendered from have changed
+        "state_compile_cache": bool,
         # The number of seconds a minion should wait before retry when attempting authentication
         "acceptance_wait_time": float,
         # The number of seconds a minion should wait before giving up during authentication
@@ -551,6 +573,9 @@ VALID_OPTS = immutabletypes.freeze(
         "proxy_keep_alive_interval": int,
         # Update intervals
         "roots_update_interval": int,
+        # Keep a persistent hash index of the files in file_roots, updated by
+        # the fileserver update process, instead of hashing them per request
+        "roots_hash_index": bool,
         "gitfs_update_interval": int,
         "git_pillar_update_interval": int,
         "hgfs_update_interval": int,
@@ -571,6 +596,14 @@ VALID_OPTS = immutabletypes.freeze(
         "git_pillar_pubkey": str,
         "git_pillar_passphrase": str,
         "git_pillar_refspecs": list,
+        # The number of git_pillar remotes to fetch at the same time, and how
+        # long to wait for any one of them
+        "git_pillar_fetch_concurrency": int,
+        "git_pillar_fetch_timeout": (type(None), int, float),
+        # Limit the history fetched for git_pillar remotes to the given number
+        # of commits, and leave out objects matching the partial clone filter
+        "git_pillar_fetch_depth": int,
+        "git_pillar_fetch_filter": str,
         "git_pillar_includes": bool,
         "git_pillar_verify_config": bool,
         # NOTE: gitfs_base, gitfs_fallback, gitfs_mountpoint, and gitfs_root omitted
@@ -590,6 +623,17 @@ VALID_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": list,
         "gitfs_refspecs": list,
         "gitfs_disable_saltenv_mapping": bool,
+        # Have the fileserver update process write per-saltenv manifests of the
+        # files in gitfs for the master workers to look files up in
+        "gitfs_manifests": bool,
+        # The number of gitfs remotes to fetch at the same time, and how long to
+        # wait for any one of them
+        "gitfs_fetch_concurrency": int,
+        "gitfs_fetch_timeout": (type(None), int, float),
+        # Limit the history fetched for gitfs remotes to the given number of
+        # commits, and leave out objects matching the partial clone filter
+        "gitfs_fetch_depth": int,
+        "gitfs_fetch_filter": str,
         "hgfs_remotes": list,
         "hgfs_mountpoint": str,
         "hgfs_root": str,
@@ -611,6 +655,11 @@ VALID_OPTS = immutabletypes.freeze(
         "minionfs_blacklist": list,
         # Specify a list of external pillar systems to use
         "ext_pillar": list,
+        # The number of ext_pillar sources to run concurrently. With the
+        # default of 1 they are run one after the other
+        "ext_pillar_concurrency": int,
+        # Seconds to wait for each concurrently run ext_pillar source
+        "ext_pillar_timeout": (type(None), int, float),
         # Reserved for future use to version the pillar structure
         "pillar_version": int,
         # Whether or not a copy of the master opts dict should be rendered into minion pillars
@@ -621,6 +670,9 @@ VALID_OPTS = immutabletypes.freeze(
         "pillar_cache_ttl": int,
         # Pillar cache backend. Defaults to `disk` which stores caches in the master cache
         "pillar_cache_backend": str,
+        # Track the files, grains and ext_pillar sources each cached pillar
+        # depends on, and recompile it as soon as one of them changes
+        "pillar_cache_dependencies": bool,
         # Cache the GPG data to avoid having to pass through the gpg renderer
         "gpg_cache": bool,
         # GPG data cache TTL, in seconds. Has no effect unless `gpg_cache` is True
@@ -720,6 +772,12 @@ VALID_OPTS = immutabletypes.freeze(
         "reactor_worker_threads": int,
         # The queue size for workers in the reactor
         "reactor_worker_hwm": int,
+        # What to do with a reaction when the queue of the reactor workers is full:
+        # drop, drop_oldest, block or coalesce
+        "reactor_worker_overflow": str,
+        # Globs of the reactor SLS files which only interpolate the event data,
+        # and are rendered once instead of for every event
+        "reactor_data_only": list,
         # Defines engines. See https://docs.saltproject.io/en/latest/topics/engines/
         "engines": list,
         # Whether or not to store runner returns in the job cache
@@ -788,6 +846,8 @@ VALID_OPTS = immutabletypes.freeze(
         "jinja_lstrip_blocks": bool,
         # If this is set to True the first newline after a Jinja block is removed
         "jinja_trim_blocks": bool,
+        # Cache compiled Jinja templates in memory and under the cachedir
+        "jinja_bytecode_cache": bool,
         # Cache minion ID to file
         "minion_id_caching": bool,
         # Always generate minion id in lowercase.
@@ -830,6 +890,18 @@ VALID_OPTS = immutabletypes.freeze(
         "ssh_sudo": bool,
         "ssh_sudo_user": str,
         "ssh_timeout": float,
+        # Keep a master connection to each host open for this many seconds
+        # and multiplex the ssh and scp commands over it, 0 disables it
+        "ssh_control_persist": int,
+        # Run the salt-ssh targets in a process each, or in threads of the
+        # salt-ssh process
+        "ssh_fanout": str,
+        # Reuse the state tarballs compiled by salt-ssh for this many seconds,
+        # 0 disables it
+        "ssh_state_cache": int,
+        # The grains the state tarballs cached by salt-ssh depend on, None
+        # for all of them
+        "ssh_state_cache_grains": (type(None), list),
         "ssh_user": str,
         "ssh_scan_ports": str,
         "ssh_scan_timeout": float,
@@ -911,6 +983,8 @@ VALID_OPTS = immutabletypes.freeze(
         "thin_exclude_saltexts": bool,
         "thin_saltext_allowlist": (type(None), list),
         "thin_saltext_blocklist": list,
+        # Deploy the thin in layers, only sending the layers a target lacks
+        "thin_layers": bool,
         # Default returners minion should use. List or comma-delimited string
         "return": (str, list),
         # TLS/SSL connection options. This could be set to a dictionary containing arguments
@@ -1075,6 +1149,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "pillar_cache": False,
         "pillar_cache_ttl": 3600,
         "pillar_cache_backend": "disk",
+        "pillar_cache_dependencies": False,
         "request_channel_timeout": 60,
         "request_channel_tries": 3,
         "gpg_cache": False,
@@ -1138,6 +1213,10 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "git_pillar_pubkey": "",
         "git_pillar_passphrase": "",
         "git_pillar_refspecs": _DFLT_REFSPECS,
+        "git_pillar_fetch_concurrency": 1,
+        "git_pillar_fetch_timeout": None,
+        "git_pillar_fetch_depth": 0,
+        "git_pillar_fetch_filter": "",
         "git_pillar_includes": True,
         "gitfs_remotes": [],
         "gitfs_mountpoint": "",
@@ -1158,6 +1237,11 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": ["branch", "tag", "sha"],
         "gitfs_refspecs": _DFLT_REFSPECS,
         "gitfs_disable_saltenv_mapping": False,
+        "gitfs_manifests": False,
+        "gitfs_fetch_concurrency": 1,
+        "gitfs_fetch_timeout": None,
+        "gitfs_fetch_depth": 0,
+        "gitfs_fetch_filter": "",
         "unique_jid": False,
         "hash_type": DEFAULT_HASH_TYPE,
         "optimization_order": [0, 1, 2],
@@ -1180,6 +1264,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "autosign_timeout": 120,
         "multiprocessing": True,
         "process_count_max": -1,
+        "job_heartbeat_interval": 30,
         "mine_enabled": True,
         "mine_return_job": False,
         "mine_interval": 60,
@@ -1187,6 +1272,10 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "ipc_write_buffer": _DFLT_IPC_WBUFFER,
         "ipv6": None,
         "file_buffer_size": 262144,
+        "file_client_window": 1,
+        "file_client_object_store": False,
+        "file_client_transfer": False,
+        "file_client_list_cache": True,
         "tcp_pub_port": 4510,
         "tcp_pull_port": 4511,
         "tcp_authentication_retries": 5,
@@ -1216,6 +1305,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "state_output_profile": True,
         "state_auto_order": True,
         "state_events": False,
+        "state_compile_cache": False,
+        "jinja_bytecode_cache": False,
         "state_aggregate": False,
         "state_queue": False,
         "snapper_states": False,
@@ -1265,6 +1356,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "reactor_refresh_interval": 60,
         "reactor_worker_threads": 10,
         "reactor_worker_hwm": 10000,
+        "reactor_worker_overflow": "drop",
+        "reactor_data_only": [],
         "engines": [],
         "tcp_keepalive": True,
         "tcp_keepalive_idle": 300,
@@ -1373,6 +1466,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "local": True,
         # Update intervals
         "roots_update_interval": DEFAULT_INTERVAL,
+        "roots_hash_index": False,
+        "fileserver_transfer": False,
+        "fileserver_transfer_port": 4507,
+        "fileserver_routing_index": False,
         "gitfs_update_interval": DEFAULT_INTERVAL,
         "git_pillar_update_interval": DEFAULT_INTERVAL,
         "hgfs_update_interval": DEFAULT_INTERVAL,
@@ -1393,6 +1490,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "git_pillar_pubkey": "",
         "git_pillar_passphrase": "",
         "git_pillar_refspecs": _DFLT_REFSPECS,
+        "git_pillar_fetch_concurrency": 1,
+        "git_pillar_fetch_timeout": None,
+        "git_pillar_fetch_depth": 0,
+        "git_pillar_fetch_filter": "",
         "git_pillar_includes": True,
         "git_pillar_verify_config": True,
         "gitfs_remotes": [],
@@ -1414,6 +1515,11 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": ["branch", "tag", "sha"],
         "gitfs_refspecs": _DFLT_REFSPECS,
         "gitfs_disable_saltenv_mapping": False,
+        "gitfs_manifests": False,
+        "gitfs_fetch_concurrency": 1,
+        "gitfs_fetch_timeout": None,
+        "gitfs_fetch_depth": 0,
+        "gitfs_fetch_filter": "",
         "hgfs_remotes": [],
         "hgfs_mountpoint": "",
         "hgfs_root": "",
@@ -1440,6 +1546,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "minionfs_whitelist": [],
         "minionfs_blacklist": [],
         "ext_pillar": [],
+        "ext_pillar_concurrency": 1,
+        "ext_pillar_timeout": None,
         "pillar_version": 2,
         "pillar_opts": False,
         "pillar_safe_render_error": True,
@@ -1449,6 +1557,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "pillar_cache": False,
         "pillar_cache_ttl": 3600,
         "pillar_cache_backend": "disk",
+        "pillar_cache_dependencies": False,
         "gpg_cache": False,
         "gpg_cache_ttl": 86400,
         "gpg_cache_backend": "disk",
@@ -1541,6 +1650,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "reactor_refresh_interval": 60,
         "reactor_worker_threads": 10,
         "reactor_worker_hwm": 10000,
+        "reactor_worker_overflow": "drop",
+        "reactor_data_only": [],
         "engines": [],
         "event_return": "",
         "event_return_queue": 0,
@@ -1556,6 +1667,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "state_output_profile": True,
         "state_auto_order": True,
         "state_events": False,
+        "state_compile_cache": False,
         "state_aggregate": False,
         "search": "",
         "loop_interval": 60,
@@ -1594,6 +1706,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "jinja_sls_env": {},
         "jinja_lstrip_blocks": False,
         "jinja_trim_blocks": False,
+        "jinja_bytecode_cache": False,
         "tcp_keepalive": True,
         "tcp_keepalive_idle": 300,
         "tcp_keepalive_cnt": -1,
@@ -1611,6 +1724,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "ssh_sudo": False,
         "ssh_sudo_user": "",
         "ssh_timeout": 60,
+        "ssh_control_persist": 0,
+        "ssh_fanout": "process",
+        "ssh_state_cache": 0,
+        "ssh_state_cache_grains": None,
         "ssh_user": "root",
         "ssh_scan_ports": "22",
         "ssh_scan_timeout": 0.01,
@@ -1645,6 +1762,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "thin_exclude_saltexts": False,
         "thin_saltext_allowlist": None,
         "thin_saltext_blocklist": [],
+        "thin_layers": False,
         "ssl": None,
         "extmod_whitelist": {},
         "extmod_blacklist": {},
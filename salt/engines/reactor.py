@@ -10,6 +10,7 @@ Example Config in Master or Minion config
           refresh_interval: 60
           worker_threads: 10
           worker_hwm: 10000
+          worker_overflow: drop
 
     reactor:
       - 'salt/cloud/*/destroyed':
@@ -20,12 +21,16 @@ Example Config in Master or Minion config
 import salt.utils.reactor
 
 
-def start(refresh_interval=None, worker_threads=None, worker_hwm=None):
+def start(
+    refresh_interval=None, worker_threads=None, worker_hwm=None, worker_overflow=None
+):
     if refresh_interval is not None:
         __opts__["reactor_refresh_interval"] = refresh_interval
     if worker_threads is not None:
         __opts__["reactor_worker_threads"] = worker_threads
     if worker_hwm is not None:
         __opts__["reactor_worker_hwm"] = worker_hwm
+    if worker_overflow is not None:
+        __opts__["reactor_worker_overflow"] = worker_overflow
 
     salt.utils.reactor.Reactor(__opts__).run()
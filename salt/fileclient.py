@@ -2,12 +2,16 @@
 Classes that manage file clients
 """
 
+import concurrent.futures
 import contextlib
+import contextvars
 import errno
 import ftplib  # nosec
+import hashlib
 import http.server
 import logging
 import os
+import queue
 import shutil
 import string
 import time
@@ -25,6 +29,7 @@ import salt.payload
 import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
+import salt.utils.filetransfer
 import salt.utils.gzip_util
 import salt.utils.hashutils
 import salt.utils.http
@@ -42,6 +47,8 @@ from salt.utils.openstack.swift import SaltSwift
 log = logging.getLogger(__name__)
 MAX_FILENAME_LENGTH = 255
 
+_FETCH_TRACKERS = contextvars.ContextVar("fetch_trackers", default=())
+
 
 def get_file_client(opts, pillar=False):
     """
@@ -57,6 +64,38 @@ def get_file_client(opts, pillar=False):
     )(opts)
 
 
+@contextlib.contextmanager
+def track_fetches():
+    """
+    Record every ``salt://`` file requested through a file client while the
+    context is active.
+
+    Yields a dict mapping ``(saltenv, path)`` to the hash of the file on the
+    master at the time it was requested. Files which were requested but do not
+    exist on the master are recorded with an empty hash, since their later
+    appearance can change the outcome of a render just as much as a modified
+    file can.
+    """
+    fetched = {}
+    token = _FETCH_TRACKERS.set(_FETCH_TRACKERS.get() + (fetched,))
+    try:
+        yield fetched
+    finally:
+        _FETCH_TRACKERS.reset(token)
+
+
+def _record_fetch(path, saltenv, hash_server):
+    """
+    Add a file request to any active :py:func:`track_fetches` contexts
+    """
+    trackers = _FETCH_TRACKERS.get()
+    if not trackers:
+        return
+    hsum = hash_server.get("hsum", "") if isinstance(hash_server, dict) else ""
+    for fetched in trackers:
+        fetched[(saltenv, path)] = hsum
+
+
 def decode_dict_keys_to_str(src):
     """
     Convert top level keys from bytes to strings if possible.
@@ -149,6 +188,84 @@ class Client:
 
             yield dest
 
+    def _object_path(self, hash_server):
+        """
+        Return the location of a file in the content addressed object store,
+        or None if the object store is disabled or the hash is unknown
+        """
+        if not self.opts.get("file_client_object_store"):
+            return None
+        if not isinstance(hash_server, dict) or not hash_server.get("hsum"):
+            return None
+        hash_type = salt.utils.stringutils.to_str(
+            hash_server.get("hash_type", DEFAULT_HASH_TYPE)
+        )
+        hsum = salt.utils.stringutils.to_str(hash_server["hsum"])
+        return salt.utils.path.join(
+            self.opts["cachedir"], "objects", hash_type, hsum[:2], hsum
+        )
+
+    def _link_object(self, hash_server, dest):
+        """
+        Populate ``dest`` from the object store, if it holds a file with the
+        passed hash. Returns True if it did.
+        """
+        obj = self._object_path(hash_server)
+        if obj is None or not os.path.isfile(obj):
+            return False
+        hash_type = salt.utils.stringutils.to_str(
+            hash_server.get("hash_type", DEFAULT_HASH_TYPE)
+        )
+        if salt.utils.hashutils.get_hash(obj, hash_type) != hash_server["hsum"]:
+            # A path entry linked to the object was modified in place
+            log.warning("Removing corrupt object %s from the file cache", obj)
+            os.remove(obj)
+            return False
+        if os.path.isdir(dest):
+            salt.utils.files.rm_rf(dest)
+        tmp = f"{dest}.{os.getpid()}.link"
+        try:
+            os.link(obj, tmp)
+        except OSError:
+            # Hard links are not supported, or cross a filesystem boundary
+            shutil.copyfile(obj, tmp)
+        os.replace(tmp, dest)
+        log.debug("Cached %s from object %s", dest, obj)
+        return True
+
+    def _store_object(self, path, hash_server):
+        """
+        Add a cached file to the object store, unless the store already holds
+        a file with the same hash
+        """
+        obj = self._object_path(hash_server)
+        if obj is None or os.path.isfile(obj):
+            return
+        hash_type = salt.utils.stringutils.to_str(
+            hash_server.get("hash_type", DEFAULT_HASH_TYPE)
+        )
+        if salt.utils.hashutils.get_hash(path, hash_type) != hash_server["hsum"]:
+            return
+        with salt.utils.files.set_umask(0o077):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            tmp = f"{obj}.{os.getpid()}.tmp"
+            try:
+                os.link(path, tmp)
+            except OSError:
+                shutil.copyfile(path, tmp)
+            os.replace(tmp, obj)
+
+    def _release_object(self, hash_local):
+        """
+        Remove an object from the store once no cached path refers to it
+        """
+        obj = self._object_path(hash_local)
+        try:
+            if obj is not None and os.stat(obj).st_nlink == 1:
+                os.remove(obj)
+        except OSError:
+            pass
+
     def get_cachedir(self, cachedir=None):
         if cachedir is None:
             cachedir = self.opts["cachedir"]
@@ -200,23 +317,26 @@ class Client:
         Download a list of files stored on the master and put them in the
         minion file cache
         """
-        ret = []
         if isinstance(paths, str):
             paths = paths.split(",")
-        for path in paths:
-            ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
-        return ret
+        return self._cache_files(paths, saltenv, cachedir=cachedir)
+
+    def _cache_files(self, paths, saltenv="base", cachedir=None):
+        """
+        Cache each of the passed files, returning the cached locations in the
+        same order
+        """
+        return [self.cache_file(path, saltenv, cachedir=cachedir) for path in paths]
 
     def cache_master(self, saltenv="base", cachedir=None):
         """
         Download and cache all files on a master in a specified environment
         """
-        ret = []
-        for path in self.file_list(saltenv):
-            ret.append(
-                self.cache_file(salt.utils.url.create(path), saltenv, cachedir=cachedir)
-            )
-        return ret
+        return self._cache_files(
+            [salt.utils.url.create(path) for path in self.file_list(saltenv)],
+            saltenv,
+            cachedir=cachedir,
+        )
 
     def cache_dir(
         self,
@@ -242,17 +362,17 @@ class Client:
         log.info("Caching directory '%s' for environment '%s'", path, saltenv)
         # go through the list of all files finding ones that are in
         # the target directory and caching them
+        urls = []
         for fn_ in self.file_list(saltenv):
             fn_ = salt.utils.data.decode(fn_)
             if fn_.strip() and fn_.startswith(path):
                 if salt.utils.stringutils.check_include_exclude(
                     fn_, include_pat, exclude_pat
                 ):
-                    fn_ = self.cache_file(
-                        salt.utils.url.create(fn_), saltenv, cachedir=cachedir
-                    )
-                    if fn_:
-                        ret.append(fn_)
+                    urls.append(salt.utils.url.create(fn_))
+        ret.extend(
+            fn_ for fn_ in self._cache_files(urls, saltenv, cachedir=cachedir) if fn_
+        )
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -949,6 +1069,8 @@ class PillarClient(Client):
         Copies a file from the local files directory into :param:`dest`
         gzip compression settings are ignored for local files
         """
+        if _FETCH_TRACKERS.get():
+            _record_fetch(path, saltenv, self.hash_file(path, saltenv))
         path = self._check_proto(path)
         fnd = self._find_file(path, saltenv)
         fnd_path = fnd.get("path")
@@ -1044,6 +1166,8 @@ class PillarClient(Client):
         except TypeError:
             # Local file path
             fnd_path = fnd
+        if not fnd_path:
+            return ret
 
         hash_type = self.opts.get("hash_type", DEFAULT_HASH_TYPE)
         ret["hsum"] = salt.utils.hashutils.get_hash(fnd_path, form=hash_type)
@@ -1131,6 +1255,17 @@ class RemoteClient(Client):
             self.auth = self.channel.auth
         else:
             self.auth = ""
+        # Extra channels used to keep several file chunk requests in flight
+        self._window_channels = []
+        # Older masters do not know the _serve_files request
+        self._serve_files_supported = True
+        # Where the file lists received from the master are kept, to only ask
+        # for the changes to them
+        self._file_list_cachedir = None
+        if self.opts.get("file_client_list_cache", True):
+            self._file_list_cachedir = os.path.join(
+                self.opts["cachedir"], "file_lists", "remote"
+            )
 
     def _refresh_channel(self):
         """
@@ -1142,10 +1277,12 @@ class RemoteClient(Client):
         self.channel = salt.channel.client.ReqChannel.factory(self.opts)
         return self.channel
 
-    def _channel_send(self, load, raw=False):
+    def _channel_send(self, load, raw=False, channel=None):
         start = time.monotonic()
+        if channel is None:
+            channel = self.channel
         try:
-            return self.channel.send(
+            return channel.send(
                 load,
                 raw=raw,
             )
@@ -1166,6 +1303,285 @@ class RemoteClient(Client):
             pass
         if channel is not None:
             channel.close()
+        for channel in self._window_channels:
+            channel.close()
+        self._window_channels = []
+
+    def _cache_files(self, paths, saltenv="base", cachedir=None):
+        """
+        Cache several files from the master, sending the hashes of the copies
+        already in the minion cache and receiving only the files which
+        changed, many files to a request
+        """
+        if not self._serve_files_supported:
+            return super()._cache_files(paths, saltenv, cachedir=cachedir)
+
+        hash_type = self.opts.get("hash_type", DEFAULT_HASH_TYPE)
+        ret = {}
+        urls = {}
+        pending = {}
+        for path in paths:
+            if (
+                not isinstance(path, str)
+                or not path.startswith("salt://")
+                or salt.utils.url.is_escaped(path)
+                or salt.utils.url.split_env(path)[1]
+            ):
+                continue
+            rel_path = self._check_proto(path)
+            with self._cache_loc(rel_path, saltenv, cachedir=cachedir) as dest:
+                known = ""
+                if os.path.isfile(dest):
+                    known = salt.utils.hashutils.get_hash(dest, form=hash_type)
+            pending[rel_path] = known
+            urls[rel_path] = path
+            ret[path] = dest
+
+        if pending and self.opts.get("file_client_object_store"):
+            pending = self._link_objects(pending, urls, ret, saltenv, cachedir)
+
+        while pending:
+            load = {"cmd": "_serve_files", "saltenv": saltenv, "paths": pending}
+            data = self._channel_send(load)
+            if not isinstance(data, dict) or "files" not in data:
+                log.debug("The master does not serve several files per request")
+                self._serve_files_supported = False
+                break
+            for rel_path, entry in data["files"].items():
+                path = urls[rel_path]
+                _record_fetch(path, saltenv, entry)
+                if "data" not in entry:
+                    continue
+                with self._cache_loc(rel_path, saltenv, cachedir=cachedir) as dest:
+                    if os.path.isdir(dest):
+                        salt.utils.files.rm_rf(dest)
+                    with salt.utils.atomicfile.atomic_open(dest, "wb+") as fp_:
+                        fp_.write(salt.utils.stringutils.to_bytes(entry["data"]))
+                self._store_object(dest, entry)
+                if pending[rel_path]:
+                    self._release_object(
+                        {"hsum": pending[rel_path], "hash_type": hash_type}
+                    )
+            for rel_path in data["missing"]:
+                path = urls[rel_path]
+                _record_fetch(path, saltenv, {})
+                ret[path] = False
+            for rel_path in data["large"]:
+                path = urls[rel_path]
+                ret[path] = self.cache_file(path, saltenv, cachedir=cachedir)
+            if not data["files"] and not data["missing"] and not data["large"]:
+                # Nothing fit in the response, fetch the rest one at a time
+                break
+            pending = {rel_path: pending[rel_path] for rel_path in data["deferred"]}
+
+        remaining = {urls[rel_path] for rel_path in pending}
+        return [
+            (
+                ret[path]
+                if path in ret and path not in remaining
+                else self.cache_file(path, saltenv, cachedir=cachedir)
+            )
+            for path in paths
+        ]
+
+    def _link_objects(self, pending, urls, ret, saltenv, cachedir):
+        """
+        Ask the master for the hashes of the pending files, and populate the
+        files the object store holds from it. Returns the files whose
+        contents still need to be sent by the master.
+        """
+        load = {
+            "cmd": "_serve_files",
+            "saltenv": saltenv,
+            "paths": pending,
+            "hash_only": True,
+        }
+        data = self._channel_send(load)
+        if not isinstance(data, dict) or "files" not in data:
+            return pending
+        hash_type = self.opts.get("hash_type", DEFAULT_HASH_TYPE)
+        remaining = {}
+        for rel_path, entry in data["files"].items():
+            path = urls[rel_path]
+            if entry["hsum"] == pending[rel_path]:
+                # The cached copy is current
+                _record_fetch(path, saltenv, entry)
+                continue
+            with self._cache_loc(rel_path, saltenv, cachedir=cachedir) as dest:
+                linked = self._link_object(entry, dest)
+            if not linked:
+                remaining[rel_path] = pending[rel_path]
+                continue
+            _record_fetch(path, saltenv, entry)
+            if pending[rel_path]:
+                self._release_object(
+                    {"hsum": pending[rel_path], "hash_type": hash_type}
+                )
+        for rel_path in data["missing"]:
+            path = urls[rel_path]
+            _record_fetch(path, saltenv, {})
+            ret[path] = False
+        return remaining
+
+    def _send_chunk_requests(self, load, locs, window):
+        """
+        Request the chunks of a file at the passed offsets, with up to
+        ``window`` requests in flight at once, and yield ``(loc, data)``
+        tuples as the chunks arrive
+        """
+        while len(self._window_channels) < window - 1:
+            self._window_channels.append(
+                salt.channel.client.ReqChannel.factory(self.opts)
+            )
+        channels = queue.Queue()
+        for channel in [self.channel] + self._window_channels[: window - 1]:
+            channels.put(channel)
+
+        def _request(loc):
+            channel = channels.get()
+            try:
+                data = self._channel_send(
+                    dict(load, loc=loc), raw=True, channel=channel
+                )
+            finally:
+                channels.put(channel)
+            data = decode_dict_keys_to_str(data)
+            if data.get("gzip", None):
+                return loc, salt.utils.gzip_util.uncompress(data["data"])
+            return loc, salt.utils.stringutils.to_bytes(data["data"])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=window) as pool:
+            futures = [pool.submit(_request, loc) for loc in locs]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _fetch_transfer(self, data, fn_):
+        """
+        Stream the rest of a file into ``fn_`` from the master's file transfer
+        server, using the ticket the master sent with the first chunk.
+
+        Returns False if the transfer failed, in which case ``fn_`` holds the
+        part of the file received so far and the rest must be fetched chunk
+        by chunk.
+        """
+        try:
+            salt.utils.filetransfer.fetch(
+                self.opts["master_ip"],
+                data["transfer_port"],
+                data["transfer"],
+                fn_,
+                key=data.get("transfer_key"),
+                ssl_options=self.opts.get("ssl"),
+                server_hostname=self.opts["master"],
+                timeout=self.opts["auth_timeout"],
+            )
+        except (OSError, SaltClientError) as exc:
+            log.warning(
+                "Streaming file from the master failed, fetching the rest of "
+                "it chunk by chunk: %s",
+                exc,
+            )
+            return False
+        return True
+
+    def _transferred_file_ok(self, fn_, hash_server):
+        """
+        Check a file which was streamed from the master's file transfer
+        server against the hash of the file on the master. ``fn_`` is left at
+        the end of the file.
+        """
+        if not isinstance(hash_server, dict) or not hash_server.get("hsum"):
+            return True
+        hash_type = salt.utils.stringutils.to_str(
+            hash_server.get("hash_type", DEFAULT_HASH_TYPE)
+        )
+        hash_obj = getattr(hashlib, hash_type)()
+        fn_.flush()
+        fn_.seek(0)
+        for chunk in iter(lambda: fn_.read(65536), b""):
+            hash_obj.update(chunk)
+        return hash_obj.hexdigest() == hash_server["hsum"]
+
+    def _get_file_windowed(self, load, dest, hash_server, window):
+        """
+        Fetch a file from the master with several chunk requests in flight.
+
+        Chunks are written to a partial file named after the hash of the file
+        on the master, so an interrupted transfer of the same file resumes
+        where it left off. The complete file is checked against that hash
+        before it is moved into place.
+
+        Returns the destination, or None if the file should be fetched one
+        chunk at a time, which is the case for masters which do not report
+        the size of the file they serve.
+        """
+        if not isinstance(hash_server, dict) or not hash_server.get("hsum"):
+            return None
+        hsum = hash_server["hsum"]
+        partial = f"{dest}.{hsum[:16]}.partial"
+        try:
+            offset = os.path.getsize(partial)
+        except OSError:
+            offset = 0
+
+        data = decode_dict_keys_to_str(
+            self._channel_send(dict(load, loc=offset), raw=True)
+        )
+        if not isinstance(data, dict) or "size" not in data or not data["data"]:
+            # Older master, or nothing left to fetch at this offset
+            if offset:
+                os.remove(partial)
+            return None
+        if data.get("gzip", None):
+            chunk = salt.utils.gzip_util.uncompress(data["data"])
+        else:
+            chunk = salt.utils.stringutils.to_bytes(data["data"])
+
+        size = data["size"]
+        written = {offset: len(chunk)}
+        with salt.utils.files.fopen(partial, "r+b" if offset else "wb+") as fn_:
+            fn_.seek(offset)
+            fn_.write(chunk)
+            if data.get("transfer"):
+                self._fetch_transfer(data, fn_)
+                written[offset + len(chunk)] = fn_.tell() - offset - len(chunk)
+            locs = range(fn_.tell(), size, len(chunk))
+            try:
+                chunk_load = {
+                    key: val for key, val in load.items() if key != "transfer"
+                }
+                for loc, chunk in self._send_chunk_requests(chunk_load, locs, window):
+                    fn_.seek(loc)
+                    fn_.write(chunk)
+                    written[loc] = len(chunk)
+            except BaseException:
+                # Only keep what was received without gaps, for resuming
+                end = offset
+                while end in written and written[end]:
+                    end += written[end]
+                fn_.truncate(end)
+                raise
+
+        hash_type = salt.utils.stringutils.to_str(
+            hash_server.get("hash_type", DEFAULT_HASH_TYPE)
+        )
+        if salt.utils.hashutils.get_hash(partial, hash_type) != hsum:
+            log.warning(
+                "Bad download of file %s, fetching it one chunk at a time",
+                load["path"],
+            )
+            os.remove(partial)
+            # Fetch it over the request channel only
+            load.pop("transfer", None)
+            return None
+        if os.path.isdir(dest):
+            salt.utils.files.rm_rf(dest)
+        os.replace(partial, dest)
+        return dest
 
     def get_file(
         self, path, dest="", makedirs=False, saltenv="base", gzip=None, cachedir=None
@@ -1181,6 +1597,7 @@ class RemoteClient(Client):
             saltenv = senv
 
         hash_server = self.hash_file(path, saltenv)
+        _record_fetch(path, saltenv, hash_server)
 
         # Check if file exists on server, before creating files and
         # directories
@@ -1220,12 +1637,20 @@ class RemoteClient(Client):
             path,
         )
 
+        hash_local = None
         if dest2check and os.path.isfile(dest2check):
             hash_local = self.hash_file(dest2check, saltenv)
 
             if hash_local == hash_server:
                 return dest2check
 
+        # Files cached with the same contents under another path or saltenv
+        # are reused from the object store without fetching them again
+        cache_fetch = not dest
+        if cache_fetch and self._link_object(hash_server, dest2check):
+            self._release_object(hash_local)
+            return dest2check
+
         log.debug(
             "Fetching file from saltenv '%s', ** attempting ** '%s'", saltenv, path
         )
@@ -1236,7 +1661,14 @@ class RemoteClient(Client):
         if gzip:
             gzip = int(gzip)
             load["gzip"] = gzip
-
+        elif self.opts.get("file_client_transfer", False):
+            # Ask for a ticket to stream the file from the master's file
+            # transfer server if it does not fit in the first chunk. The
+            # ticket is issued to this minion.
+            load["transfer"] = True
+            load["id"] = self.opts["id"]
+
+        window = self.opts.get("file_client_window", 1)
         fn_ = None
         if dest:
             destdir = os.path.dirname(dest)
@@ -1249,6 +1681,8 @@ class RemoteClient(Client):
                             raise
                 else:
                     return False
+            if window > 1 and self._get_file_windowed(load, dest, hash_server, window):
+                return dest
             # We need an open filehandle here, that's why we're not using a
             # with clause:
             # pylint: disable=resource-leakage
@@ -1256,7 +1690,23 @@ class RemoteClient(Client):
             # pylint: enable=resource-leakage
         else:
             log.debug("No dest file found")
+            if window > 1:
+                with self._cache_loc(
+                    rel_path, saltenv, cachedir=cachedir
+                ) as cache_dest:
+                    if self._get_file_windowed(load, cache_dest, hash_server, window):
+                        log.info(
+                            "Fetching file from saltenv '%s', ** done ** '%s'",
+                            saltenv,
+                            path,
+                        )
+                        self._store_object(cache_dest, hash_server)
+                        self._release_object(hash_local)
+                        return cache_dest
 
+        # Set once part of the file was streamed from the file transfer server,
+        # the whole file is then checked against its hash on the master
+        verify_transfer = False
         while True:
             if not fn_:
                 load["loc"] = 0
@@ -1272,6 +1722,10 @@ class RemoteClient(Client):
             # case the keys are bytes due to raw mode. Standardize on
             # strings for the top-level keys to simplify things.
             data = decode_dict_keys_to_str(data)
+            # Only the first chunk may carry a transfer ticket
+            transfer = None
+            if load.pop("transfer", None) and isinstance(data, dict):
+                transfer = data if data.get("transfer") else None
             try:
                 if not data["data"]:
                     if not fn_ and data["dest"]:
@@ -1282,6 +1736,17 @@ class RemoteClient(Client):
                             dest = cache_dest
                             with salt.utils.files.fopen(cache_dest, "wb+") as ofile:
                                 ofile.write(data["data"])
+                    if verify_transfer:
+                        verify_transfer = False
+                        if not self._transferred_file_ok(fn_, hash_server):
+                            log.warning(
+                                "Bad download of file %s, fetching it one chunk "
+                                "at a time",
+                                path,
+                            )
+                            fn_.seek(0)
+                            fn_.truncate()
+                            continue
                     if "hsum" in data and d_tries < 3:
                         # Master has prompted a file verification, if the
                         # verification fails, re-download the file. Try 3 times
@@ -1317,6 +1782,9 @@ class RemoteClient(Client):
                 if isinstance(data, str):
                     data = data.encode()
                 fn_.write(data)
+                if transfer:
+                    self._fetch_transfer(transfer, fn_)
+                    verify_transfer = True
             except (TypeError, KeyError) as exc:
                 try:
                     data_type = type(data).__name__
@@ -1346,6 +1814,9 @@ class RemoteClient(Client):
         if fn_:
             fn_.close()
             log.info("Fetching file from saltenv '%s', ** done ** '%s'", saltenv, path)
+            if cache_fetch:
+                self._store_object(dest, hash_server)
+                self._release_object(hash_local)
         else:
             log.debug(
                 "In saltenv '%s', we are ** missing ** the file '%s'", saltenv, path
@@ -1358,9 +1829,60 @@ class RemoteClient(Client):
         List the files on the master
         """
         load = {"saltenv": saltenv, "prefix": prefix, "cmd": "_file_list"}
-        return self._channel_send(
+        if not self._file_list_cachedir:
+            return self._channel_send(
+                load,
+            )
+        cache_path = os.path.join(
+            self._file_list_cachedir,
+            salt.utils.hashutils.sha256_digest(f"{saltenv}\0{prefix}") + ".p",
+        )
+        generation, files = None, []
+        try:
+            with salt.utils.files.fopen(cache_path, "rb") as fp_:
+                cached = salt.payload.load(fp_)
+            if cached["saltenv"] == saltenv and cached["prefix"] == prefix:
+                generation, files = cached["generation"], cached["files"]
+        except (OSError, KeyError, TypeError, ValueError):
+            pass
+
+        load["generation"] = generation
+        ret = self._channel_send(
             load,
         )
+        if not isinstance(ret, dict):
+            # Older masters always return the full list
+            return ret
+        if "files" in ret:
+            files = ret["files"]
+        elif ret["generation"] != generation:
+            files = sorted(set(files).difference(ret["removed"]).union(ret["added"]))
+            if salt.fileserver.file_list_generation(files) != ret["generation"]:
+                log.debug(
+                    "File list for saltenv '%s' does not match its generation "
+                    "after applying the changes, fetching the full list",
+                    saltenv,
+                )
+                load["generation"] = None
+                files = self._channel_send(
+                    load,
+                )["files"]
+        if ret["generation"] != generation:
+            try:
+                os.makedirs(self._file_list_cachedir, exist_ok=True)
+                with salt.utils.atomicfile.atomic_open(cache_path, "wb") as fp_:
+                    salt.payload.dump(
+                        {
+                            "saltenv": saltenv,
+                            "prefix": prefix,
+                            "generation": ret["generation"],
+                            "files": files,
+                        },
+                        fp_,
+                    )
+            except OSError as exc:
+                log.debug("Failed to cache file list in %s: %s", cache_path, exc)
+        return files
 
     def file_list_emptydirs(self, saltenv="base", prefix=""):
         """
@@ -1502,6 +2024,9 @@ class FSClient(RemoteClient):
         self._closing = False
         self.channel = salt.fileserver.FSChan(opts)
         self.auth = DumbAuth()
+        self._window_channels = []
+        self._serve_files_supported = True
+        self._file_list_cachedir = None
 
 
 # Provide backward compatibility for anyone directly using LocalClient (but no
@@ -4,6 +4,7 @@ File server pluggable modules and generic backend functions
 
 import errno
 import fnmatch
+import hashlib
 import logging
 import os
 import re
@@ -11,8 +12,11 @@ import time
 from collections.abc import Sequence
 
 import salt.loader
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
+import salt.utils.filetransfer
 import salt.utils.path
 import salt.utils.url
 import salt.utils.versions
@@ -21,6 +25,18 @@ from salt.utils.decorators import ensure_unicode_args
 
 log = logging.getLogger(__name__)
 
+# The number of generations of each file list kept to send minions the changes
+# since the generation they last saw
+FILE_LIST_GENERATIONS = 4
+
+# The number of file list generations kept in total. The prefix of a file list
+# comes from the client, so the least recently requested lists are dropped
+FILE_LIST_GENERATIONS_TOTAL = 32
+
+# The number of file_buffer_size chunks of file data serve_files may return
+# in a single response
+SERVE_FILES_MAX_BUFFERS = 16
+
 
 def _unlock_cache(w_lock):
     """
@@ -180,6 +196,14 @@ def write_file_list_cache(opts, data, list_cache, w_lock):
         log.trace("Lockfile %s removed", w_lock)
 
 
+def file_list_generation(files):
+    """
+    Return the generation of a sorted file list, used by minions to ask for
+    the changes to a file list since they last saw it
+    """
+    return hashlib.sha256("\0".join(files).encode("utf-8")).hexdigest()
+
+
 def check_env_cache(opts, env_cache):
     """
     Returns cached env names, if present. Otherwise returns None.
@@ -337,6 +361,16 @@ class Fileserver:
     def __init__(self, opts):
         self.opts = opts
         self.servers = salt.loader.fileserver(opts, opts["fileserver_backend"])
+        # Callable returning the key to sign file transfer tickets with, set
+        # by the master when fileserver_transfer is enabled
+        self.transfer_key = None
+        # Recent generations of each file list, keyed by saltenv, prefix and
+        # backends, the most recently requested list last
+        self._file_list_generations = {}
+        # The routing index written by the update process, and the
+        # (inode, mtime) of the file it was loaded from
+        self._routes = None
+        self._routes_stat = None
 
     def backends(self, back=None):
         """
@@ -480,6 +514,94 @@ class Fileserver:
                 log.debug("Updating %s fileserver cache", fsb)
                 self.servers[fstr](**kwargs)
 
+    def _routes_path(self):
+        return os.path.join(self.opts["cachedir"], "file_lists", "routes.p")
+
+    def update_routes(self, ttl=None):
+        """
+        Build the routing index, which maps each file in each saltenv to the
+        backend find_file would find it in, and write it for the master
+        workers when it changed. Returns True if the index was written.
+
+        ttl
+            How many seconds the index is considered current for, unless it
+            is rebuilt. The update process passes the longest interval it
+            updates the backends at. When not passed, the index stays current
+            until it is rebuilt.
+        """
+        back = self.backends()
+        routes = {}
+        for fsb, envs in self.envs(sources=True).items():
+            fstr = f"{fsb}.file_list"
+            if fstr not in self.servers:
+                continue
+            for saltenv in envs:
+                env_routes = routes.setdefault(saltenv, {})
+                for path in self.servers[fstr]({"saltenv": saltenv, "prefix": ""}):
+                    env_routes.setdefault(path, back.index(fsb))
+        data = salt.payload.dumps({"backends": back, "ttl": ttl, "routes": routes})
+        path = self._routes_path()
+        try:
+            with salt.utils.files.fopen(path, "rb") as fp_:
+                if fp_.read() == data:
+                    # The mtime of the index tells the master workers when it
+                    # was last known to be current
+                    os.utime(path)
+                    return False
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+            fp_.write(data)
+        log.debug("Wrote the fileserver routing index to %s", path)
+        return True
+
+    def _current_routes(self):
+        """
+        Return the routing index, reloading it when the update process
+        replaced it, or None if there is no index for the configured backends
+        or it was not rebuilt within its ttl
+        """
+        routes_path = self._routes_path()
+        try:
+            stat = os.stat(routes_path)
+        except OSError:
+            self._routes = self._routes_stat = None
+            return None
+        # The index is replaced atomically when it changes, its mtime is
+        # also refreshed when it is rebuilt unchanged
+        if stat.st_ino != self._routes_stat:
+            try:
+                with salt.utils.files.fopen(routes_path, "rb") as fp_:
+                    routes = salt.payload.load(fp_)
+            except (OSError, ValueError) as exc:
+                log.debug("Failed to load the fileserver routing index: %s", exc)
+                return None
+            self._routes_stat = stat.st_ino
+            # An index built for other backends is ignored until the update
+            # process replaces it
+            self._routes = routes if routes["backends"] == self.backends() else None
+        if self._routes is None:
+            return None
+        ttl = self._routes.get("ttl")
+        if ttl is not None and time.time() - stat.st_mtime > ttl:
+            # The update process stopped rebuilding the index
+            return None
+        return self._routes
+
+    def route(self, path, saltenv):
+        """
+        Return the backend the routing index says a file is in, or None if the
+        file is not in the index or the index is not current
+        """
+        routes = self._current_routes()
+        if routes is None:
+            return None
+        idx = routes["routes"].get(saltenv, {}).get(path)
+        if idx is None:
+            return None
+        return routes["backends"][idx]
+
     def update_intervals(self, back=None):
         """
         Return the update intervals for all of the enabled fileserver backends
@@ -593,6 +715,25 @@ class Fileserver:
         if not isinstance(saltenv, str):
             saltenv = str(saltenv)
 
+        routes = None
+        if self.opts.get("fileserver_routing_index"):
+            routes = self._current_routes()
+        if routes is not None and routes["backends"] == back:
+            # The index is current, so it is authoritative for the files
+            # which are not in it
+            idx = routes["routes"].get(saltenv, {}).get(path)
+            if idx is None:
+                return fnd
+            fsb = routes["backends"][idx]
+            fstr = f"{fsb}.find_file"
+            if fstr in self.servers:
+                fnd = self.servers[fstr](path, saltenv, **kwargs)
+                if fnd.get("path"):
+                    fnd["back"] = fsb
+                    return fnd
+            # The file was removed from the indexed backend since the index
+            # was built, ask each backend in turn
+
         for fsb in back:
             fstr = f"{fsb}.find_file"
             if fstr in self.servers:
@@ -622,7 +763,113 @@ class Fileserver:
             return ret
         fstr = "{}.serve_file".format(fnd["back"])
         if fstr in self.servers:
-            return self.servers[fstr](load, fnd)
+            ret = self.servers[fstr](load, fnd)
+            if ret.get("data") and fnd.get("path"):
+                # Tell the client the size of the file, so that it can request
+                # the remaining chunks concurrently
+                try:
+                    ret["size"] = os.path.getsize(fnd["path"])
+                except OSError:
+                    pass
+                else:
+                    self._add_transfer_ticket(load, fnd, ret)
+            return ret
+        return ret
+
+    def _add_transfer_ticket(self, load, fnd, ret):
+        """
+        If the client asked for it and the rest of the file does not fit in
+        this chunk, add a ticket to fetch the rest from the file transfer
+        server instead of chunk by chunk
+        """
+        if (
+            self.transfer_key is None
+            or not load.get("transfer")
+            or load.get("gzip")
+            or ret["size"] <= load["loc"] + len(ret["data"])
+        ):
+            return
+        key = self.transfer_key()
+        ret["transfer"] = salt.utils.filetransfer.make_ticket(
+            key, str(load.get("id", "")), load["saltenv"], load["path"]
+        )
+        ret["transfer_port"] = self.opts["fileserver_transfer_port"]
+        if not self.opts.get("ssl"):
+            # The key the file data is encrypted with, this response is
+            # encrypted by the request channel
+            ret["transfer_key"] = salt.utils.filetransfer.stream_key(
+                key, ret["transfer"]
+            )
+
+    def serve_files(self, load):
+        """
+        Serve up several whole files in one response.
+
+        ``load["paths"]`` maps each requested path to the hash of the copy
+        the client already has, or an empty string. The response maps paths
+        to their hash and, if the client's copy differs, their contents.
+        Files larger than ``file_buffer_size`` are listed under ``large`` so
+        the client fetches them chunk by chunk, and files which did not fit
+        in this response are listed under ``deferred`` for the client to
+        request again. With ``hash_only``, only the hashes are returned, so
+        the client can first look the files up in its object store.
+        """
+        ret = {"files": {}, "missing": [], "large": [], "deferred": []}
+
+        if "env" in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop("env")
+
+        if "paths" not in load or "saltenv" not in load:
+            return ret
+        if not isinstance(load["saltenv"], str):
+            load["saltenv"] = str(load["saltenv"])
+        if not isinstance(load["paths"], dict) or not all(
+            isinstance(path, str) and isinstance(known, str)
+            for path, known in load["paths"].items()
+        ):
+            log.error("Malformed _serve_files request: %s", load["paths"])
+            return {"error": "paths must map paths to hashes"}
+
+        buffer_size = self.opts["file_buffer_size"]
+        budget = buffer_size * SERVE_FILES_MAX_BUFFERS
+        for path, known in load["paths"].items():
+            fnd = self.find_file(path, load["saltenv"])
+            if not fnd.get("back"):
+                ret["missing"].append(path)
+                continue
+            fstr = "{}.file_hash".format(fnd["back"])
+            if fstr not in self.servers:
+                ret["missing"].append(path)
+                continue
+            hash_load = {"path": path, "saltenv": load["saltenv"]}
+            hash_ret = self.servers[fstr](hash_load, fnd)
+            if not hash_ret:
+                ret["missing"].append(path)
+                continue
+            entry = {"hsum": hash_ret["hsum"], "hash_type": hash_ret["hash_type"]}
+            if entry["hsum"] != known and not load.get("hash_only"):
+                try:
+                    size = os.path.getsize(fnd["path"])
+                except OSError:
+                    ret["missing"].append(path)
+                    continue
+                if size > buffer_size:
+                    ret["large"].append(path)
+                    continue
+                if size > budget:
+                    ret["deferred"].append(path)
+                    continue
+                data = self.servers["{}.serve_file".format(fnd["back"])](
+                    {"path": path, "saltenv": load["saltenv"], "loc": 0}, fnd
+                ).get("data", "")
+                if size and not data:
+                    # The backend refused to serve the file
+                    ret["missing"].append(path)
+                    continue
+                budget -= size
+                entry["data"] = data
+            ret["files"][path] = entry
         return ret
 
     def __file_hash_and_stat(self, load):
@@ -763,7 +1010,8 @@ class Fileserver:
         if not isinstance(load["saltenv"], str):
             load["saltenv"] = str(load["saltenv"])
 
-        for fsb in self.backends(load.pop("fsbackend", None)):
+        fsbackend = load.pop("fsbackend", None)
+        for fsb in self.backends(fsbackend):
             fstr = f"{fsb}.file_list"
             if fstr in self.servers:
                 ret.update(self.servers[fstr](load))
@@ -771,7 +1019,42 @@ class Fileserver:
         prefix = load.get("prefix", "").strip("/")
         if prefix != "":
             ret = [f for f in ret if f.startswith(prefix)]
-        return sorted(ret)
+        ret = sorted(ret)
+        if "generation" in load:
+            return self._file_list_delta(
+                (load["saltenv"], prefix, str(fsbackend)), ret, load["generation"]
+            )
+        return ret
+
+    def _file_list_delta(self, key, files, generation):
+        """
+        Return a file list along with its generation. If this process still
+        knows the generation the client last saw, only the files added and
+        removed since then are returned, otherwise the full list is.
+        """
+        current = file_list_generation(files)
+        generations = self._file_list_generations.pop(key, {})
+        self._file_list_generations[key] = generations
+        generations.pop(current, None)
+        generations[current] = files
+        while len(generations) > FILE_LIST_GENERATIONS:
+            generations.pop(next(iter(generations)))
+        total = sum(len(gens) for gens in self._file_list_generations.values())
+        while total > FILE_LIST_GENERATIONS_TOTAL:
+            oldest = next(iter(self._file_list_generations))
+            total -= len(self._file_list_generations.pop(oldest))
+
+        ret = {"generation": current}
+        if generation == current:
+            ret["added"] = ret["removed"] = []
+        elif generation in generations:
+            old = set(generations[generation])
+            new = set(files)
+            ret["added"] = sorted(new - old)
+            ret["removed"] = sorted(old - new)
+        else:
+            ret["files"] = files
+        return ret
 
     @ensure_unicode_args
     def file_list_emptydirs(self, load):
@@ -64,6 +64,8 @@ PER_REMOTE_OVERRIDES = (
     "disable_saltenv_mapping",
     "ref_types",
     "update_interval",
+    "fetch_depth",
+    "fetch_filter",
 )
 PER_REMOTE_ONLY = ("all_saltenvs", "name", "saltenv")
 
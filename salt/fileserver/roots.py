@@ -18,8 +18,12 @@ configuration option.
 import errno
 import logging
 import os
+import stat
+import threading
 
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.event
 import salt.utils.files
 import salt.utils.gzip_util
@@ -32,6 +36,11 @@ import salt.utils.versions
 
 log = logging.getLogger(__name__)
 
+# In-memory copy of the hash index, reloaded when the index file changes
+_HASH_INDEX = {"mtime": None, "files": {}}
+# Serializes the updates of the hash index by the threads of this process
+_HASH_INDEX_LOCK = threading.Lock()
+
 
 def find_file(path, saltenv="base", **kwargs):
     """
@@ -217,6 +226,9 @@ def update():
     data["files"]["removed"] = list(old_files - new_files)
     data["files"]["added"] = list(new_files - old_files)
 
+    if __opts__.get("roots_hash_index", False):
+        update_index(mtime_map=new_mtime_map)
+
     # write out the new map
     mtime_map_path_dir = os.path.dirname(mtime_map_path)
     if not os.path.exists(mtime_map_path_dir):
@@ -241,6 +253,123 @@ def update():
     return data
 
 
+def _hash_index_path():
+    return os.path.join(__opts__["cachedir"], "roots", "hash_index.p")
+
+
+def _read_hash_index():
+    """
+    Return the file entries of the on-disk hash index, or an empty dict if
+    there is no usable index for the configured hash_type
+    """
+    try:
+        with salt.utils.files.fopen(_hash_index_path(), "rb") as fp_:
+            index = salt.payload.load(fp_)
+    except (OSError, ValueError) as exc:
+        if getattr(exc, "errno", None) != errno.ENOENT:
+            log.debug("Unable to read the roots hash index: %s", exc)
+        return {}
+    if not isinstance(index, dict) or index.get("hash_type") != __opts__["hash_type"]:
+        return {}
+    return index.get("files") or {}
+
+
+def update_index(paths=None, mtime_map=None):
+    """
+    Update the persistent hash index of the files in file_roots. Only files
+    whose size or mtime changed since they were last indexed are rehashed.
+
+    paths
+        Only refresh the index entries for these paths, as reported by a
+        filesystem watcher.
+
+    mtime_map
+        A full mtime map as generated by
+        :py:func:`salt.fileserver.generate_mtime_map`, files missing from the
+        map are dropped from the index. If neither ``paths`` nor
+        ``mtime_map`` is passed, the file_roots are walked to build one.
+    """
+    index_path = _hash_index_path()
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    # The index is read, updated and written back by the update loop and the
+    # watcher thread of FileserverUpdate, and by fileserver.update runs, an
+    # update must not be lost to a concurrent one
+    with _HASH_INDEX_LOCK, salt.utils.files.flopen(f"{index_path}.lock", "w"):
+        return _update_index(index_path, paths, mtime_map)
+
+
+def _update_index(index_path, paths, mtime_map):
+    hash_type = __opts__["hash_type"]
+    files = _read_hash_index()
+    changed = False
+    if paths is None:
+        if mtime_map is None:
+            mtime_map = salt.fileserver.generate_mtime_map(
+                __opts__, __opts__["file_roots"]
+            )
+        for path in set(files).difference(mtime_map):
+            files.pop(path)
+            changed = True
+        paths = mtime_map
+    for path in paths:
+        if salt.fileserver.is_file_ignored(__opts__, path):
+            continue
+        try:
+            st_ = os.stat(path)
+        except OSError:
+            st_ = None
+        if st_ is None or not stat.S_ISREG(st_.st_mode):
+            if files.pop(path, None) is not None:
+                changed = True
+            continue
+        entry = files.get(path)
+        if entry and entry[0] == st_.st_size and entry[1] == st_.st_mtime:
+            continue
+        try:
+            hsum = salt.utils.hashutils.get_hash(path, hash_type)
+        except OSError as exc:
+            log.debug("Unable to hash %s for the roots hash index: %s", path, exc)
+            files.pop(path, None)
+            changed = True
+            continue
+        files[path] = [st_.st_size, st_.st_mtime, hsum]
+        changed = True
+
+    if not changed and os.path.exists(index_path):
+        return False
+    with salt.utils.atomicfile.atomic_open(index_path, "wb") as fp_:
+        fp_.write(salt.payload.dumps({"hash_type": hash_type, "files": files}))
+    return True
+
+
+def _indexed_hash(path):
+    """
+    Look up a file in the hash index, reloading it if FileserverUpdate has
+    written a new one. The entry is only used if the size and mtime of the
+    file still match it, since the index can trail changes by up to
+    roots_update_interval when no watcher keeps it current.
+    """
+    try:
+        st_ = os.stat(_hash_index_path())
+    except OSError:
+        return None
+    # The index is replaced atomically, so a new inode means a new index
+    mtime = (st_.st_ino, st_.st_mtime_ns)
+    if mtime != _HASH_INDEX["mtime"]:
+        _HASH_INDEX["files"] = _read_hash_index()
+        _HASH_INDEX["mtime"] = mtime
+    entry = _HASH_INDEX["files"].get(path)
+    if not entry:
+        return None
+    try:
+        st_ = os.stat(path)
+    except OSError:
+        return None
+    if entry[0] != st_.st_size or entry[1] != st_.st_mtime:
+        return None
+    return entry[2]
+
+
 def file_hash(load, fnd):
     """
     Return a file hash, the hash type is set in the master config file
@@ -257,6 +386,11 @@ def file_hash(load, fnd):
         saltenv = "__env__"
     ret = {}
 
+    if path and __opts__.get("roots_hash_index", False):
+        hsum = _indexed_hash(path)
+        if hsum is not None:
+            return {"hash_type": __opts__["hash_type"], "hsum": hsum}
+
     # if the file doesn't exist, we can't get a hash
     if not path or not os.path.isfile(path):
         return ret
@@ -41,6 +41,7 @@ import salt.utils.atomicfile
 import salt.utils.ctx
 import salt.utils.event
 import salt.utils.files
+import salt.utils.filetransfer
 import salt.utils.gitfs
 import salt.utils.gzip_util
 import salt.utils.jid
@@ -77,6 +78,13 @@ except ImportError:
     # resource is not available on windows
     HAS_RESOURCE = False
 
+try:
+    import pyinotify
+
+    HAS_PYINOTIFY = True
+except ImportError:
+    HAS_PYINOTIFY = False
+
 log = logging.getLogger(__name__)
 
 
@@ -451,6 +459,7 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
         super().__init__(**kwargs)
         self.opts = opts
         self.update_threads = {}
+        self.routes_lock = threading.Lock()
         # Avoid circular import
         import salt.fileserver
 
@@ -537,7 +546,7 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
                 )
 
     @classmethod
-    def update(cls, interval, backends, timeout):
+    def update(cls, interval, backends, timeout, on_update=None):
         """
         Threading target which handles all updates for a given wait interval
         """
@@ -549,6 +558,8 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
                 interval,
             )
             cls._do_update(backends)
+            if on_update is not None:
+                on_update()
             log.debug(
                 "Completed fileserver updates for items with an update "
                 "interval of %d, waiting %d seconds",
@@ -558,6 +569,67 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
             with condition:
                 condition.wait(interval)
 
+    def update_routes(self):
+        """
+        Rebuild the fileserver routing index once the backends in a bucket
+        were updated
+        """
+        with self.routes_lock:
+            try:
+                # The index is rebuilt after every update, past twice the
+                # longest update interval the workers stop relying on it
+                self.fileserver.update_routes(ttl=2 * max(self.buckets))
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Failed to update the fileserver routing index")
+
+    def watch_roots(self):
+        """
+        Threading target which keeps the roots hash index current between
+        updates by refreshing the entries for the files inotify reports as
+        changed
+        """
+        update_index = self.fileserver.servers["roots.update_index"]
+        pending = set()
+        rescan = []
+
+        def _enqueue(event):
+            if event.mask & pyinotify.IN_Q_OVERFLOW or event.dir:
+                # A whole tree moved or events were lost, walk the roots
+                rescan.append(True)
+            else:
+                pending.add(event.pathname)
+
+        mask = (
+            pyinotify.IN_CLOSE_WRITE
+            | pyinotify.IN_CREATE
+            | pyinotify.IN_DELETE
+            | pyinotify.IN_MOVED_FROM
+            | pyinotify.IN_MOVED_TO
+            | pyinotify.IN_ATTRIB
+        )
+        wm = pyinotify.WatchManager()
+        notifier = pyinotify.Notifier(wm, _enqueue, timeout=1000)
+        for roots in self.opts["file_roots"].values():
+            for root in roots:
+                if os.path.isdir(root):
+                    wm.add_watch(root, mask, rec=True, auto_add=True, quiet=True)
+        try:
+            while self.update_threads:
+                if notifier.check_events():
+                    notifier.read_events()
+                    notifier.process_events()
+                if not (pending or rescan):
+                    continue
+                paths = None if rescan else sorted(pending)
+                pending.clear()
+                del rescan[:]
+                try:
+                    update_index(paths=paths)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Failed to update the roots hash index")
+        finally:
+            notifier.stop()
+
     def run(self):
         """
         Start the update threads
@@ -575,6 +647,10 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
         # Clean out the fileserver backend cache
         salt.daemons.masterapi.clean_fsbackend(self.opts)
 
+        on_update = None
+        if self.opts.get("fileserver_routing_index", False):
+            on_update = self.update_routes
+
         for interval in self.buckets:
             self.update_threads[interval] = threading.Thread(
                 target=self.update,
@@ -582,10 +658,23 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
                     interval,
                     self.buckets[interval],
                     self.opts["fileserver_interval"],
+                    on_update,
                 ),
             )
             self.update_threads[interval].start()
 
+        if (
+            self.opts.get("roots_hash_index", False)
+            and "roots.update_index" in self.fileserver.servers
+        ):
+            if HAS_PYINOTIFY:
+                threading.Thread(target=self.watch_roots, daemon=True).start()
+            else:
+                log.debug(
+                    "pyinotify is not available, the roots hash index will be "
+                    "refreshed every roots_update_interval seconds"
+                )
+
         while self.update_threads:
             for name, thread in list(self.update_threads.items()):
                 thread.join(1)
@@ -593,6 +682,39 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
                     self.update_threads.pop(name)
 
 
+def _file_transfer_key():
+    """
+    Return the key file transfer tickets are signed with. It is derived from
+    a secret which, unlike the AES key, is never sent to the minions.
+    """
+    return salt.utils.filetransfer.derive_key(
+        SMaster.secrets["file_transfer"]["secret"].value
+    )
+
+
+class FileTransfer(salt.utils.process.SignalHandlingProcess):
+    """
+    Stream large files to minions from a side channel, so that the file data
+    does not have to be read and packed by the MWorkers
+    """
+
+    def __init__(self, opts, **kwargs):
+        self.master_secrets = kwargs.pop("master_secrets", None)
+        super().__init__(**kwargs)
+        self.opts = opts
+
+    def run(self):
+        import salt.fileserver
+
+        if self.master_secrets is not None:
+            SMaster.secrets = self.master_secrets
+        fileserver = salt.fileserver.Fileserver(self.opts)
+        server = salt.utils.filetransfer.FileTransferServer(
+            self.opts, _file_transfer_key, fileserver.find_file
+        )
+        asyncio.run(server.serve_forever())
+
+
 class Master(SMaster):
     """
     The salt master server
@@ -806,6 +928,19 @@ class Master(SMaster):
                 "reload": salt.crypt.Crypticle.generate_key_string,
             }
 
+            if self.opts["fileserver_transfer"]:
+                # Signs the file transfer tickets, it is rotated along with
+                # the AES key
+                SMaster.secrets["file_transfer"] = {
+                    "secret": multiprocessing.Array(
+                        ctypes.c_char,
+                        salt.utils.stringutils.to_bytes(
+                            salt.crypt.Crypticle.generate_key_string()
+                        ),
+                    ),
+                    "reload": salt.crypt.Crypticle.generate_key_string,
+                }
+
             log.info("Creating master process manager")
             # Since there are children having their own ProcessManager we should wait for kill more time.
             self.process_manager = salt.utils.process.ProcessManager(wait_for_kill=5)
@@ -904,6 +1039,15 @@ class Master(SMaster):
                 FileserverUpdate, args=(self.opts,), name="FileServerUpdate"
             )
 
+            if self.opts["fileserver_transfer"]:
+                log.info("Creating master file transfer process")
+                self.process_manager.add_process(
+                    FileTransfer,
+                    args=(self.opts,),
+                    kwargs={"master_secrets": SMaster.secrets},
+                    name="FileTransfer",
+                )
+
             # Fire up SSDP discovery publisher
             if self.opts["discovery"]:
                 if salt.utils.ssdp.SSDPDiscoveryServer.is_available():
@@ -1361,6 +1505,7 @@ class AESFuncs(TransportMethods):
         "minion_publish",
         "revoke_auth",
         "_serve_file",
+        "_serve_files",
         "_file_find",
         "_file_hash",
         "_file_hash_and_stat",
@@ -1406,7 +1551,10 @@ class AESFuncs(TransportMethods):
         import salt.fileserver
 
         self.fs_ = salt.fileserver.Fileserver(self.opts)
+        if self.opts.get("fileserver_transfer"):
+            self.fs_.transfer_key = _file_transfer_key
         self._serve_file = self.fs_.serve_file
+        self._serve_files = self.fs_.serve_files
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
         self._file_hash_and_stat = self.fs_.file_hash_and_stat
@@ -1913,16 +1913,47 @@ class Minion(MinionBase):
             executors[-1] = "sudo"  # replace the last one with sudo
         log.trace("Executors list %s", executors)  # pylint: disable=no-member
 
-        for name in executors:
-            fname = f"{name}.execute"
-            if fname not in self.executors:
-                raise SaltInvocationError(f"Executor '{name}' is not available")
-            return_data = self.executors[fname](opts, data, func, args, kwargs)
-            if return_data is not None:
-                return return_data
+        with self._job_heartbeat(data):
+            for name in executors:
+                fname = f"{name}.execute"
+                if fname not in self.executors:
+                    raise SaltInvocationError(f"Executor '{name}' is not available")
+                return_data = self.executors[fname](opts, data, func, args, kwargs)
+                if return_data is not None:
+                    return return_data
 
         return None
 
+    @contextlib.contextmanager
+    def _job_heartbeat(self, data):
+        """
+        Fire a heartbeat event for the job on the master every
+        job_heartbeat_interval seconds while it runs, so that the clients
+        waiting on the job know the minion is still running it without
+        asking with saltutil.find_job
+        """
+        interval = self.opts.get("job_heartbeat_interval", 0)
+        if not interval or data.get("jid", "req") == "req":
+            yield
+            return
+        stop = threading.Event()
+        tag = tagify([data["jid"], "heartbeat", self.opts["id"]], "job")
+
+        def _beat():
+            while not stop.wait(interval):
+                self._fire_master(
+                    {"jid": data["jid"], "interval": interval}, tag, timeout=interval
+                )
+
+        thread = threading.Thread(
+            target=_beat, name="JobHeartbeat({})".format(data["jid"]), daemon=True
+        )
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+
     @classmethod
     def _thread_return(cls, minion_instance, opts, data):
         """
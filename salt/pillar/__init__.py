@@ -3,8 +3,11 @@ Render the pillar data
 """
 
 import collections
+import concurrent.futures
+import contextvars
 import copy
 import fnmatch
+import hashlib
 import logging
 import os
 import sys
@@ -22,7 +25,11 @@ import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.dictupdate
+import salt.utils.files
+import salt.utils.hashutils
+import salt.utils.json
 import salt.utils.url
+from salt.config import DEFAULT_HASH_TYPE
 from salt.exceptions import SaltClientError
 from salt.template import compile_template
 
@@ -35,6 +42,16 @@ from salt.version import __version__
 
 log = logging.getLogger(__name__)
 
+# Renders of pillar SLS files which contain no template syntax do not depend
+# on the minion they are compiled for, and are shared across minions.
+_STATIC_SLS_RENDERS = {}
+_STATIC_SLS_RENDERS_MAX = 1000
+_STATIC_SLS_RENDERERS = {"jinja", "yaml", "json"}
+_TEMPLATE_MARKERS = (b"{{", b"{%", b"{#")
+
+# Key under which PillarCache stores the dependencies of a minion's pillars
+DEPENDENCIES_KEY = "__dependencies__"
+
 
 def get_pillar(
     opts,
@@ -452,6 +469,8 @@ class PillarCache:
             self.opts["pillar_cache_ttl"],
             minion_cache_path=self._minion_cache_path(minion_id),
         )
+        # The dependencies of the last pillar fetched, when tracked
+        self.dependencies = None
 
     def _minion_cache_path(self, minion_id):
         """
@@ -461,6 +480,82 @@ class PillarCache:
         """
         return os.path.join(self.opts["cachedir"], "pillar_cache", minion_id)
 
+    def _environment_digest(self):
+        """
+        Return a digest of everything besides pillar files which goes into a
+        compiled pillar: the grains, the ext_pillar sources and the extra
+        minion data. Any change to the grains invalidates the pillar, since
+        the grains a render reads cannot be told apart from the grains it
+        merely passes around.
+        """
+        data = [
+            self.saltenv,
+            self.grains,
+            self.opts.get("ext_pillar"),
+            self.ext,
+            self.extra_minion_data,
+        ]
+        return hashlib.sha256(
+            salt.utils.json.dumps(data, sort_keys=True, default=repr).encode()
+        ).hexdigest()
+
+    def _pillar_roots(self, saltenvs):
+        """
+        Return the pillar_roots the pillar compiler uses for the passed
+        environments, including those served from ``__env__``
+        """
+        pillar_roots = dict(self.opts["pillar_roots"])
+        env_roots = pillar_roots.pop("__env__", None)
+        if env_roots:
+            for saltenv in saltenvs:
+                if saltenv not in pillar_roots:
+                    pillar_roots[saltenv] = [
+                        root.replace("__env__", saltenv) for root in env_roots
+                    ]
+        return pillar_roots
+
+    def _hash_dependency(self, pillar_roots, saltenv, path):
+        """
+        Return the hash of a ``salt://`` pillar file, or an empty string if
+        it does not exist, resolving it as the pillar file client does
+        """
+        rel = salt.utils.url.parse(path)[0]
+        if salt.utils.url.is_escaped(rel):
+            rel = salt.utils.url.unescape(rel)
+        for root in pillar_roots.get(saltenv, []):
+            full = os.path.join(root, rel)
+            if os.path.isfile(full):
+                return salt.utils.hashutils.get_hash(
+                    full, form=self.opts.get("hash_type", DEFAULT_HASH_TYPE)
+                )
+        return ""
+
+    def dependencies_changed(self, dependencies):
+        """
+        Return True if any of the recorded dependencies of a cached pillar
+        has changed since the pillar was compiled
+        """
+        if not dependencies:
+            return True
+        if dependencies.get("environment") != self._environment_digest():
+            log.debug(
+                "Pillar cache grains or ext_pillar changed for minion %s",
+                self.minion_id,
+            )
+            return True
+        files = dependencies.get("files", [])
+        pillar_roots = self._pillar_roots({saltenv for saltenv, _, _ in files})
+        for saltenv, path, hsum in files:
+            if self._hash_dependency(pillar_roots, saltenv, path) != hsum:
+                log.debug(
+                    "Pillar cache dependency %s in %s changed for minion %s",
+                    path,
+                    saltenv,
+                    self.minion_id,
+                )
+                return True
+        return False
+
     def fetch_pillar(self):
         """
         In the event of a cache miss, we need to incur the overhead of caching
@@ -478,7 +573,28 @@ class PillarCache:
             pillarenv=self.pillarenv,
             extra_minion_data=self.extra_minion_data,
         )
-        return fresh_pillar.compile_pillar()
+        if not self.opts.get("pillar_cache_dependencies"):
+            return fresh_pillar.compile_pillar()
+        with salt.fileclient.track_fetches() as fetched:
+            ret = fresh_pillar.compile_pillar()
+        self.dependencies = {
+            "environment": self._environment_digest(),
+            "files": [
+                [saltenv, path, hsum] for (saltenv, path), hsum in fetched.items()
+            ],
+        }
+        return ret
+
+    def _store(self, minion_cache, fresh_pillar):
+        """
+        Store a freshly compiled pillar, and its dependencies when they were
+        tracked, in the cache for this minion
+        """
+        minion_cache[self.pillarenv] = fresh_pillar
+        if self.dependencies is not None:
+            deps = minion_cache.setdefault(DEPENDENCIES_KEY, {})
+            deps[self.pillarenv] = self.dependencies
+        self.cache[self.minion_id] = minion_cache
 
     def clear_pillar(self):
         """
@@ -488,6 +604,16 @@ class PillarCache:
 
         return True
 
+    def _stale(self, minion_cache):
+        """
+        Return True if the dependencies of the cached pillar for this
+        pillarenv are tracked and one of them has changed
+        """
+        if not self.opts.get("pillar_cache_dependencies"):
+            return False
+        deps = minion_cache.get(DEPENDENCIES_KEY, {})
+        return self.dependencies_changed(deps.get(self.pillarenv))
+
     def compile_pillar(self, *args, **kwargs):  # Will likely just be pillar_dirs
         if self.clean_cache:
             self.clear_pillar()
@@ -504,8 +630,9 @@ class PillarCache:
         log.debug("Scanning cache: %s", cache_dict)
         # Check the cache!
         if self.minion_id in self.cache:  # Keyed by minion_id
-            # TODO Compare grains, etc?
-            if self.pillarenv in self.cache[self.minion_id]:
+            if self.pillarenv in self.cache[self.minion_id] and not self._stale(
+                self.cache[self.minion_id]
+            ):
                 # We have a cache hit! Send it back.
                 log.debug(
                     "Pillar cache hit for minion %s and pillarenv %s",
@@ -514,12 +641,10 @@ class PillarCache:
                 )
                 return self.cache[self.minion_id][self.pillarenv]
             else:
-                # We found the minion but not the env. Store it.
+                # We found the minion but not the env, or its dependencies
+                # changed. Store it.
                 fresh_pillar = self.fetch_pillar()
-
-                minion_cache = self.cache[self.minion_id]
-                minion_cache[self.pillarenv] = fresh_pillar
-                self.cache[self.minion_id] = minion_cache
+                self._store(self.cache[self.minion_id], fresh_pillar)
 
                 log.debug(
                     "Pillar cache miss for pillarenv %s for minion %s",
@@ -530,7 +655,7 @@ class PillarCache:
         else:
             # We haven't seen this minion yet in the cache. Store it.
             fresh_pillar = self.fetch_pillar()
-            self.cache[self.minion_id] = {self.pillarenv: fresh_pillar}
+            self._store({}, fresh_pillar)
             log.debug("Pillar cache miss for minion %s", self.minion_id)
             log.debug("Current pillar cache: %s", cache_dict)  # FIXME hack!
             return fresh_pillar
@@ -896,6 +1021,31 @@ class Pillar:
                             env_matches.append(item)
         return matches
 
+    def _static_sls_key(self, fn_):
+        """
+        Return the key under which the render of a pillar SLS file is shared
+        across minions, or None if the render may depend on the minion.
+
+        Only files without a renderer shebang or any Jinja syntax, rendered
+        by the default Jinja/YAML/JSON pipeline, are shared.
+        """
+        if not self.opts.get("pillar_cache_dependencies"):
+            return None
+        renderer = self.opts["renderer"]
+        if not set(renderer.split("|")) <= _STATIC_SLS_RENDERERS:
+            return None
+        if self.opts.get("jinja_env") or self.opts.get("jinja_sls_env"):
+            # Custom delimiters or line statements defeat the marker check
+            return None
+        try:
+            with salt.utils.files.fopen(fn_, "rb") as fp_:
+                data = fp_.read()
+        except OSError:
+            return None
+        if data.startswith(b"#!") or any(mark in data for mark in _TEMPLATE_MARKERS):
+            return None
+        return (renderer, hashlib.sha256(data).hexdigest())
+
     def render_pstate(self, sls, saltenv, mods, defaults=None):
         """
         Collect a single pillar sls file and render it
@@ -945,17 +1095,26 @@ class Pillar:
                 return None, mods, errors
         state = None
         try:
-            state = compile_template(
-                fn_,
-                self.rend,
-                self.opts["renderer"],
-                self.opts["renderer_blacklist"],
-                self.opts["renderer_whitelist"],
-                saltenv,
-                sls,
-                _pillar_rend=True,
-                **defaults,
-            )
+            static_key = self._static_sls_key(fn_)
+            if static_key in _STATIC_SLS_RENDERS:
+                log.debug("Using shared render of static pillar SLS '%s'", sls)
+                state = copy.deepcopy(_STATIC_SLS_RENDERS[static_key])
+            else:
+                state = compile_template(
+                    fn_,
+                    self.rend,
+                    self.opts["renderer"],
+                    self.opts["renderer_blacklist"],
+                    self.opts["renderer_whitelist"],
+                    saltenv,
+                    sls,
+                    _pillar_rend=True,
+                    **defaults,
+                )
+                if static_key is not None and isinstance(state, dict):
+                    if len(_STATIC_SLS_RENDERS) >= _STATIC_SLS_RENDERS_MAX:
+                        _STATIC_SLS_RENDERS.clear()
+                    _STATIC_SLS_RENDERS[static_key] = copy.deepcopy(state)
         except Exception as exc:  # pylint: disable=broad-except
             msg = f"Rendering SLS '{sls}' failed, render error:\n{exc}"
             log.critical(msg, exc_info=True)
@@ -1202,6 +1361,7 @@ class Pillar:
                 self.opts.get("pillar_merge_lists", False),
             )
 
+        concurrent_calls = []
         for run in self.opts["ext_pillar"]:
             if not isinstance(run, dict):
                 errors.append('The "ext_pillar" option is malformed')
@@ -1217,6 +1377,9 @@ class Pillar:
                         key,
                     )
                     continue
+                if self.opts.get("ext_pillar_concurrency", 1) > 1:
+                    concurrent_calls.append((key, val))
+                    continue
                 try:
                     ext = self._external_pillar_data(pillar, val, key)
                 except Exception as exc:  # pylint: disable=broad-except
@@ -1240,8 +1403,104 @@ class Pillar:
                     self.opts.get("pillar_merge_lists", False),
                 )
                 ext = None
+        if concurrent_calls:
+            pillar = self._concurrent_ext_pillar(pillar, concurrent_calls, errors)
         return pillar, errors
 
+    def _concurrent_ext_pillar(self, pillar, calls, errors):
+        """
+        Run the passed ext_pillar sources in threads, up to
+        ``ext_pillar_concurrency`` at a time, and merge their results in the
+        order they are configured in.
+
+        Every source is passed its own copy of the same input pillar, since
+        none of the others have returned yet. A source which raises, or does
+        not return within ``ext_pillar_timeout`` seconds of starting, is
+        skipped and reported in ``errors`` without affecting the others.
+        """
+        timeout = self.opts.get("ext_pillar_timeout")
+        concurrency = self.opts["ext_pillar_concurrency"]
+        # A source which timed out keeps its thread until it returns, so the
+        # pool has a thread for every source, and at most ``concurrency`` of
+        # them are submitted and waited on at a time
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(calls),
+            thread_name_prefix="ext_pillar",
+        )
+        queued = collections.deque(enumerate(calls))
+        # future -> (index, key, deadline) of the running sources
+        running = {}
+        # index -> data or error of each source
+        results = {}
+        failures = {}
+        try:
+            while queued or running:
+                while queued and len(running) < concurrency:
+                    idx, (key, val) = queued.popleft()
+                    future = pool.submit(
+                        contextvars.copy_context().run,
+                        self._external_pillar_data,
+                        copy.deepcopy(pillar),
+                        val,
+                        key,
+                    )
+                    # The clock of a source starts when it starts running
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    running[future] = (idx, key, deadline)
+                wait = None
+                if timeout is not None:
+                    wait = max(
+                        0,
+                        min(deadline for _, _, deadline in running.values())
+                        - time.monotonic(),
+                    )
+                done, _ = concurrent.futures.wait(
+                    running,
+                    timeout=wait,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    idx, key, _ = running.pop(future)
+                    try:
+                        results[idx] = future.result()
+                    except Exception as exc:  # pylint: disable=broad-except
+                        failures[idx] = "Failed to load ext_pillar {}: {}".format(
+                            key,
+                            exc,
+                        )
+                        log.error(
+                            "Exception caught loading ext_pillar '%s':\n%s",
+                            key,
+                            "".join(traceback.format_tb(exc.__traceback__)),
+                        )
+                now = time.monotonic()
+                for future, (idx, key, deadline) in list(running.items()):
+                    if deadline is not None and deadline <= now and not future.done():
+                        del running[future]
+                        failures[idx] = (
+                            "ext_pillar {} timed out after {} seconds".format(
+                                key, timeout
+                            )
+                        )
+                        log.error(failures[idx])
+        finally:
+            # Don't wait on sources which timed out, their results are
+            # discarded when they eventually return
+            pool.shutdown(wait=False)
+        for idx in range(len(calls)):
+            if idx in failures:
+                errors.append(failures[idx])
+                continue
+            if results.get(idx):
+                pillar = merge(
+                    pillar,
+                    results[idx],
+                    self.merge_strategy,
+                    self.opts.get("renderer", "yaml"),
+                    self.opts.get("pillar_merge_lists", False),
+                )
+        return pillar
+
     def compile_pillar(self, ext=True):
         """
         Render the pillar data and return
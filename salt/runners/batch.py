@@ -0,0 +1,316 @@
+"""
+Run batch jobs from the master
+
+.. versionadded:: 3008.0
+
+A batch job run with ``salt --batch`` lives in the ``salt`` command, and stops
+when the command is interrupted. The ``batch.run`` runner runs the same sliding
+window of minions inside the master instead. Started with ``salt-run --async``
+(or with the ``runner_async`` client of the REST API), the batch job keeps
+running after the command which started it exits:
+
+.. code-block:: bash
+
+    salt-run --async batch.run '*' state.apply batch=10% failhard=True
+    salt-run batch.attach 20240101000000000000
+    salt-run batch.status 20240101000000000000
+
+The return of each minion is stored in the :conf_master:`master_job_cache`
+under the job id of the batch job as soon as it arrives, so a batch job which
+was stopped can be resumed with the ``resume`` argument, and a progress event
+tagged ``salt/run/<jid>/progress`` is fired for each return. Detaching from
+``batch.attach`` does not stop the batch job.
+"""
+
+import logging
+
+import salt.cli.batch
+import salt.minion
+import salt.utils.args
+import salt.utils.event
+import salt.utils.master
+
+log = logging.getLogger(__name__)
+
+
+class _ResumedBatch(salt.cli.batch.Batch):
+    """
+    A batch run which skips the minions an earlier run already returned for
+    """
+
+    def __init__(self, opts, done):
+        super().__init__(opts, quiet=True)
+        self._done = set(done)
+
+    def _open_state(self):
+        self._state_fp = None
+        return self._done
+
+
+def _returners():
+    return salt.minion.MasterMinion(__opts__, states=False, rend=False).returners
+
+
+def _job_cache(returners, fun):
+    return returners["{}.{}".format(__opts__["master_job_cache"], fun)]
+
+
+def _minion_returns(returners, jid):
+    """
+    Return the returns of the minions which are stored under the job id of a
+    batch job, leaving out the return of the runner itself
+    """
+    return {
+        minion: data
+        for minion, data in (_job_cache(returners, "get_jid")(jid) or {}).items()
+        if minion != __opts__["id"]
+    }
+
+
+def _running(jid):
+    return any(
+        job.get("jid") == jid for job in salt.utils.master.get_running_jobs(__opts__)
+    )
+
+
+def run(
+    tgt,
+    fun,
+    arg=None,
+    kwarg=None,
+    batch="10%",
+    tgt_type="glob",
+    batch_wait=0,
+    failhard=False,
+    timeout=None,
+    gather_job_timeout=None,
+    ret="",
+    resume=None,
+):
+    """
+    Run a job on the targeted minions in batches, from the master
+
+    tgt
+        The target to run the job on
+
+    fun
+        The execution module function to run
+
+    arg
+        A list of positional arguments to pass to the function
+
+    kwarg
+        A dictionary of keyword arguments to pass to the function
+
+    batch : 10%
+        The number of minions to run the job on at a time, or a percentage of
+        the targeted minions
+
+    tgt_type : glob
+        The type of ``tgt``
+
+    batch_wait : 0
+        The number of seconds to wait after a minion returned before the job
+        is sent to the next minion
+
+    failhard : False
+        Stop the batch job once a minion returns a non-zero retcode
+
+    timeout
+        How long to wait for a minion to return before asking it whether it is
+        still running the job. Defaults to the ``timeout`` master option.
+
+    gather_job_timeout
+        How long to wait for a minion to answer whether it is still running the
+        job. Defaults to the ``gather_job_timeout`` master option.
+
+    ret
+        A returner to send the returns of the minions to
+
+    resume
+        The job id of an earlier ``batch.run`` of the same job, which was
+        stopped before it completed. The minions which already returned are
+        skipped.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run --async batch.run '*' state.apply batch=10%
+        salt-run batch.run 'web*' cmd.run arg='["systemctl restart nginx"]' batch=2
+    """
+    arg = salt.utils.args.condition_input(arg or [], kwarg)
+    returners = _returners()
+    load = {
+        "jid": __jid__,
+        "fun": "runner.batch.run",
+        "tgt": tgt,
+        "tgt_type": tgt_type,
+        "batch_fun": fun,
+        "batch_arg": arg,
+    }
+    done = {}
+    if resume:
+        resumed_load = _job_cache(returners, "get_load")(resume) or {}
+        if any(resumed_load.get(key) != load[key] for key in load if key != "jid"):
+            log.warning(
+                "Batch job %s is not a run of the same job, starting over", resume
+            )
+        else:
+            done = _minion_returns(returners, resume)
+    _job_cache(returners, "prep_jid")(False, passed_jid=__jid__)
+    _job_cache(returners, "save_load")(__jid__, load)
+
+    def _store(minion, data):
+        # The returns stored under the job id of the batch job are its
+        # progress, batch.status, batch.attach and resume read them
+        _job_cache(returners, "returner")(
+            {
+                "jid": __jid__,
+                "id": minion,
+                "fun": fun,
+                "fun_args": arg,
+                "return": data.get("return"),
+                "retcode": data.get("retcode", 0),
+                "success": data.get("retcode", 0) == 0,
+            }
+        )
+
+    opts = dict(__opts__)
+    opts.update(
+        {
+            "tgt": tgt,
+            "tgt_type": tgt_type,
+            "fun": fun,
+            "arg": arg,
+            "batch": batch,
+            "batch_wait": batch_wait,
+            "batch_stream": True,
+            "failhard": failhard,
+            "timeout": timeout or __opts__["timeout"],
+            "gather_job_timeout": gather_job_timeout or __opts__["gather_job_timeout"],
+            "return": ret,
+        }
+    )
+    batch_job = _ResumedBatch(opts, done)
+    returns = {}
+    retcode = 0
+    for minion_ret, minion_retcode in batch_job.run():
+        minion = next(iter(minion_ret))
+        _store(minion, {"return": minion_ret[minion], "retcode": minion_retcode})
+        returns.update(minion_ret)
+        retcode = max(retcode, minion_retcode)
+        returned = len(returns) + len(batch_job.resumed)
+        __jid_event__.fire_event(
+            {
+                "message": "{} returned with retcode {} ({}/{})".format(
+                    minion, minion_retcode, returned, len(batch_job.minions)
+                ),
+                "minion": minion,
+                "retcode": minion_retcode,
+                "returned": returned,
+                "total": len(batch_job.minions),
+            },
+            "progress",
+        )
+    # Carry the returns of the minions which returned before the batch job
+    # was resumed over to this job
+    for minion in batch_job.resumed:
+        _store(minion, done[minion])
+        returns[minion] = done[minion].get("return")
+        retcode = max(retcode, done[minion].get("retcode", 0) or 0)
+    missing = [
+        minion
+        for minion in batch_job.minions
+        if minion not in returns and minion not in batch_job.resumed
+    ]
+    for minion in missing:
+        returns[minion] = "Minion did not return. [No response]"
+    if retcode or missing:
+        __context__["retcode"] = retcode or 1
+    return returns
+
+
+def status(jid):
+    """
+    Return the progress of a batch job started with ``batch.run``
+
+    jid
+        The job id of the ``batch.run`` job
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run batch.status 20240101000000000000
+    """
+    ret = {"jid": jid, "running": _running(jid)}
+    returners = _returners()
+    load = _job_cache(returners, "get_load")(jid) or {}
+    for key in ("tgt", "tgt_type"):
+        if key in load:
+            ret[key] = load[key]
+    if "batch_fun" in load:
+        ret["fun"] = load["batch_fun"]
+        ret["arg"] = load["batch_arg"]
+    returns = _job_cache(returners, "get_jid")(jid) or {}
+    if __opts__.get("runner_returns", True):
+        # The return of the runner itself is stored once the batch job
+        # completed
+        ret["completed"] = __opts__["id"] in returns
+    else:
+        ret["completed"] = not ret["running"]
+    ret["returned"] = sorted(minion for minion in returns if minion != __opts__["id"])
+    return ret
+
+
+def _finished(jid):
+    """
+    Return the result of a batch job which is not running anymore from the
+    job cache
+    """
+    returners = _returners()
+    returns = _job_cache(returners, "get_jid")(jid) or {}
+    if __opts__["id"] in returns:
+        data = returns[__opts__["id"]].get("return")
+        if isinstance(data, dict) and "return" in data:
+            return data["return"]
+    # The batch job was stopped before it completed, or runner returns are
+    # not stored
+    return {
+        minion: data.get("return")
+        for minion, data in _minion_returns(returners, jid).items()
+    }
+
+
+def attach(jid):
+    """
+    Follow the progress of a batch job started with ``batch.run``, and return
+    its result once it completed. Interrupting ``batch.attach`` does not stop
+    the batch job.
+
+    jid
+        The job id of the ``batch.run`` job
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run batch.attach 20240101000000000000
+    """
+    if not _running(jid):
+        return _finished(jid)
+    with salt.utils.event.get_event(
+        "master", __opts__["sock_dir"], opts=__opts__, listen=True
+    ) as event:
+        while True:
+            evt = event.get_event(wait=5, tag=f"salt/run/{jid}/", full=True)
+            if evt is None:
+                if not _running(jid):
+                    return _finished(jid)
+                continue
+            suffix = evt["tag"].rsplit("/", 1)[-1]
+            if suffix == "progress":
+                __jid_event__.fire_event(evt["data"], "progress")
+            elif suffix == "ret":
+                return evt["data"].get("return")
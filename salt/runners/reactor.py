@@ -192,3 +192,37 @@ def set_leader(value=True):
 
         res = sevent.get_event(wait=30, tag="salt/reactors/manage/leader/value")
         return res["result"]
+
+
+def stats():
+    """
+    .. versionadded:: 3008.0
+
+    Return the statistics of the running reactor: the counters of the events
+    and reactions it handled, of the reactions which were queued, coalesced,
+    dropped or blocked on the full queue of its workers, the depth of that
+    queue, and the histograms of the time each reaction waited for a worker
+    and ran, in seconds.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run reactor.stats
+    """
+    if not _reactor_system_available():
+        raise CommandExecutionError("Reactor system is not running.")
+
+    with salt.utils.event.get_event(
+        "master",
+        __opts__["sock_dir"],
+        opts=__opts__,
+        listen=True,
+    ) as sevent:
+
+        master_key = salt.utils.master.get_master_key("root", __opts__)
+
+        __jid_event__.fire_event({"key": master_key}, "salt/reactors/manage/stats")
+
+        res = sevent.get_event(wait=30, tag="salt/reactors/manage/stats-results")
+        return res.get("stats")
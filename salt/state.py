@@ -37,6 +37,7 @@ import salt.minion
 import salt.pillar
 import salt.syspaths as syspaths
 import salt.utils.args
+import salt.utils.atomicfile
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.decorators.state
@@ -45,6 +46,7 @@ import salt.utils.event
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.immutabletypes as immutabletypes
+import salt.utils.json
 import salt.utils.msgpack
 import salt.utils.platform
 import salt.utils.process
@@ -53,6 +55,7 @@ import salt.utils.verify
 
 # Explicit late import to avoid circular import. DO NOT MOVE THIS.
 import salt.utils.yamlloader as yamlloader
+import salt.version
 from salt.exceptions import CommandExecutionError, SaltRenderError, SaltReqTimeoutError
 from salt.serializers.msgpack import deserialize as msgpack_deserialize
 from salt.serializers.msgpack import serialize as msgpack_serialize
@@ -3110,23 +3113,37 @@ class State:
         """
         Process a high data call and ensure the defined states.
         """
+        chunks, errors = self.compile_high(high, orchestration_jid)
+        if errors:
+            return errors
+        return self.call_compiled(chunks)
+
+    def compile_high(
+        self, high: HighData, orchestration_jid: Union[str, int, None] = None
+    ) -> tuple[list[dict], list[str]]:
+        """
+        Verify the high data and compile it into low chunks
+        """
         errors = []
         # If there is extension data reconcile it
         high, ext_errors = self.reconcile_extend(high)
         errors.extend(ext_errors)
         errors.extend(self.verify_high(high))
         if errors:
-            return errors
+            return [], errors
         high, req_in_errors = self.requisite_in(high)
         errors.extend(req_in_errors)
         high = self.apply_exclude(high)
         # Verify that the high data is structurally sound
         if errors:
-            return errors
+            return [], errors
         # Compile and verify the raw chunks
-        chunks, errors = self.compile_high_data(high, orchestration_jid)
-        if errors:
-            return errors
+        return self.compile_high_data(high, orchestration_jid)
+
+    def call_compiled(self, chunks: list[dict]) -> dict:
+        """
+        Execute low chunks which were already compiled from high data
+        """
         # If there are extensions in the highstate, process them and update
         # the low data chunks
 
@@ -3301,6 +3318,16 @@ class LazyAvailStates:
                 self._avail[saltenv] = None
         self._filled = True
 
+    def gathered(self) -> dict[Hashable, list[str]]:
+        """
+        Return the lists of states which were gathered so far
+        """
+        return {
+            saltenv: states
+            for saltenv, states in self._avail.items()
+            if states is not None
+        }
+
     def __contains__(self, saltenv: Hashable) -> bool:
         if saltenv == "base":
             return True
@@ -3339,6 +3366,7 @@ class BaseHighState:
         self.iorder = 10000
         self.avail = self.__gather_avail()
         self.building_highstate = HashableOrderedDict()
+        self._compile_cache_key = None
 
     def __gather_avail(self):
         """
@@ -4259,6 +4287,157 @@ class BaseHighState:
         """
         Gather the state files and render them into a single unified salt
         high data structure.
+
+        If ``state_compile_cache`` is enabled the rendered high data is reused
+        from the previous run as long as none of its inputs changed.
+        """
+        self._compile_cache_key = None
+        if not self.opts.get("state_compile_cache", False) or context is not None:
+            return self._render_highstate(matches, context=context)
+        key = self._gen_compile_cache_key(matches)
+        if key is None:
+            return self._render_highstate(matches)
+        entry = self._load_compile_cache(key)
+        if entry is not None:
+            log.debug("Reusing cached highstate compilation for %s", matches)
+            self._compile_cache_key = key
+            self.building_highstate.update(entry["high"])
+            return self.building_highstate, []
+        with salt.fileclient.track_fetches() as fetched:
+            high, errors = self._render_highstate(matches)
+        if not errors:
+            entry = {
+                "key": key,
+                "files": [
+                    [saltenv, path, hsum] for (saltenv, path), hsum in fetched.items()
+                ],
+                "avail": {
+                    saltenv: self._states_digest(states)
+                    for saltenv, states in self.avail.gathered().items()
+                },
+                "high": high,
+            }
+            if self._write_compile_cache(entry):
+                self._compile_cache_key = key
+        return high, errors
+
+    def _compile_cache_path(self):
+        """
+        Return the location of the highstate compile cache. There is one cache
+        entry per minion ID and environment, so a master compiling for many
+        minions keeps a bounded number of entries.
+        """
+        slot = salt.utils.hashutils.sha256_digest(
+            "|".join(
+                str(self.opts.get(opt))
+                for opt in ("id", "saltenv", "pillarenv", "state_top_saltenv")
+            )
+        )
+        return os.path.join(self.opts["cachedir"], "highstate_compile", f"{slot}.p")
+
+    def _gen_compile_cache_key(self, matches):
+        """
+        Fingerprint the inputs of a highstate render that are known before any
+        SLS file is fetched. Returns ``None`` if they can't be fingerprinted.
+        """
+        try:
+            data = salt.utils.json.dumps(
+                {
+                    "version": salt.version.__version__,
+                    "renderer": self.opts.get("renderer"),
+                    "test": self.opts.get("test"),
+                    "saltenv": self.opts.get("saltenv"),
+                    "pillarenv": self.opts.get("pillarenv"),
+                    "matches": matches,
+                    "grains": self.opts.get("grains", {}),
+                    "pillar": self.state.opts.get("pillar", {}),
+                },
+                sort_keys=True,
+                default=repr,
+            )
+        except (TypeError, ValueError) as exc:
+            log.debug("Unable to fingerprint highstate inputs: %s", exc)
+            return None
+        return salt.utils.hashutils.sha256_digest(data)
+
+    def _read_compile_cache(self, key):
+        """
+        Return the raw highstate compile cache entry if it belongs to ``key``
+        """
+        cfn = self._compile_cache_path()
+        if not os.path.isfile(cfn):
+            return None
+        try:
+            with salt.utils.files.fopen(cfn, "rb") as fp_:
+                entry = salt.payload.load(fp_)
+        except Exception:  # pylint: disable=broad-except
+            log.debug("Unable to read highstate compile cache %s", cfn, exc_info=True)
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return None
+        return entry
+
+    @staticmethod
+    def _states_digest(states):
+        """
+        Fingerprint a list of available states
+        """
+        return salt.utils.hashutils.sha256_digest("\n".join(sorted(states)))
+
+    def _load_compile_cache(self, key):
+        """
+        Return the cached compilation for ``key`` if every file which was
+        requested while rendering it still has the same hash on the master,
+        and the states which globs were matched against did not change.
+        """
+        entry = self._read_compile_cache(key)
+        if entry is None:
+            return None
+        for saltenv, digest in entry.get("avail", {}).items():
+            if self._states_digest(self.avail[saltenv]) != digest:
+                log.debug(
+                    "Highstate compile cache is stale, the states available "
+                    "in saltenv '%s' changed",
+                    saltenv,
+                )
+                return None
+        for saltenv, path, hsum in entry["files"]:
+            hash_server = self.client.hash_file(path, saltenv)
+            if isinstance(hash_server, dict):
+                current = hash_server.get("hsum", "")
+            else:
+                current = ""
+            if current != hsum:
+                log.debug(
+                    "Highstate compile cache is stale, %s changed in saltenv '%s'",
+                    path,
+                    saltenv,
+                )
+                return None
+        return entry
+
+    def _write_compile_cache(self, entry):
+        """
+        Write a highstate compile cache entry, return ``True`` on success
+        """
+        cfn = self._compile_cache_path()
+        with salt.utils.files.set_umask(0o077):
+            try:
+                os.makedirs(os.path.dirname(cfn), exist_ok=True)
+                with salt.utils.atomicfile.atomic_open(cfn, "w+b") as fp_:
+                    salt.payload.dump(entry, fp_)
+            except TypeError:
+                # Can't serialize pydsl
+                log.debug("Highstate is not serializable, not caching it")
+                return False
+            except OSError:
+                log.error("Unable to write highstate compile cache file %s", cfn)
+                return False
+        return True
+
+    def _render_highstate(self, matches, context=None):
+        """
+        Render the matched state files without consulting the compile cache
         """
         highstate = self.building_highstate
         all_errors = []
@@ -4455,6 +4634,24 @@ class BaseHighState:
             except OSError:
                 log.error('Unable to write to "state.highstate" cache file %s', cfn)
 
+        if not exclude and self._compile_cache_key is not None:
+            # The high data came from or went to the compile cache, reuse the
+            # low chunks compiled from it as well
+            chunks = self._cached_chunks()
+            if chunks is None:
+                chunks, errors = self.state.compile_high(high)
+                if errors:
+                    return errors
+                self._cache_chunks(chunks)
+            else:
+                # The requisite graph is not cached, build it from the chunks
+                chunks, errors = self.state.order_chunks(chunks)
+                if errors:
+                    return errors
+            if orchestration_jid is not None:
+                for chunk in chunks:
+                    chunk["__orchestration_jid__"] = orchestration_jid
+            return self.state.call_compiled(chunks)
         return self.state.call_high(high, orchestration_jid)
 
     def compile_highstate(self, context=None):
@@ -4484,6 +4681,10 @@ class BaseHighState:
         matches = self.top_matches(top)
         high, errors = self.render_highstate(matches, context=context)
 
+        chunks = self._cached_chunks()
+        if chunks is not None:
+            return chunks
+
         # If there is extension data reconcile it
         high, ext_errors = self.state.reconcile_extend(high)
         errors += ext_errors
@@ -4501,8 +4702,33 @@ class BaseHighState:
         chunks, errors = self.state.compile_high_data(high)
         if errors:
             return errors
+        self._cache_chunks(chunks)
         return chunks
 
+    def _cached_chunks(self):
+        """
+        Return the low chunks compiled from the high data of the last render,
+        if it was taken from or written to the compile cache
+        """
+        if self._compile_cache_key is None:
+            return None
+        entry = self._read_compile_cache(self._compile_cache_key)
+        if not entry:
+            return None
+        return entry.get("chunks")
+
+    def _cache_chunks(self, chunks):
+        """
+        Store the low chunks compiled from the high data of the last render
+        in the compile cache
+        """
+        if self._compile_cache_key is None:
+            return
+        entry = self._read_compile_cache(self._compile_cache_key)
+        if entry:
+            entry["chunks"] = chunks
+            self._write_compile_cache(entry)
+
     def compile_state_usage(self):
         """
         Return all used and unused states for the minion based on the top match data
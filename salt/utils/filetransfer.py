@@ -0,0 +1,366 @@
+"""
+Side channel used by the master to stream large files to minions.
+
+When a minion asks for the first chunk of a file which does not fit in one
+chunk, the MWorker answers with the chunk and a ticket for the rest of the
+file. The ticket names the file by its saltenv and path, the minion it was
+issued to and a random nonce, and is signed with a secret only the master
+processes know, so the master's file transfer process can check it without
+any shared state. The transfer process looks the file up with the
+fileserver again, so it only serves files from the fileserver backends.
+
+Unless ``ssl`` is configured, in which case the stream is TLS, the file data
+is encrypted with a key derived from the ticket and the master secret. The
+MWorker sends that key to the minion along with the ticket, over the
+encrypted request channel, so the key itself never crosses the side channel.
+Each encrypted frame starts with its sequence number, the offset of its data
+in the file and whether it is the last frame, so the MAC of the frame also
+covers its place in the stream.
+
+Either way the transfer process reads the file and writes it to the socket,
+the data is not sent with ``sendfile``.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import socket
+import struct
+import time
+
+import salt.crypt
+import salt.exceptions
+import salt.payload
+import salt.transport.base
+import salt.utils.files
+import salt.utils.stringutils
+
+log = logging.getLogger(__name__)
+
+# How long a ticket may be used after it was issued
+TICKET_TTL = 300
+
+# The header preceding the file data: a status byte and the number of bytes
+# which follow
+HEADER = struct.Struct(">BQ")
+STATUS_OK = 0
+STATUS_DENIED = 1
+
+# Each encrypted frame is preceded by its size
+FRAME = struct.Struct(">I")
+
+# The start of the plaintext of each frame: its sequence number, the offset of
+# its data in the file and whether it is the last frame
+FRAME_META = struct.Struct(">QQ?")
+
+# The size of the file data sent in one frame, or one write with ssl
+FRAME_DATA_SIZE = 1024 * 1024
+
+# How long the server waits for a client to send its ticket
+REQUEST_TIMEOUT = 60
+
+# Size of the buffer used by the minion to receive the file
+RECV_BUFFER_SIZE = 1024 * 1024
+
+
+def derive_key(secret):
+    """
+    Derive the key used to sign transfer tickets from the master's file
+    transfer secret, which is never sent to the minions
+    """
+    return hashlib.sha256(
+        b"salt-file-transfer:" + salt.utils.stringutils.to_bytes(secret)
+    ).digest()
+
+
+def make_ticket(key, minion_id, saltenv, path, ttl=TICKET_TTL):
+    """
+    Return a ticket allowing ``minion_id`` to fetch ``path`` from ``saltenv``
+    from the file transfer server for ``ttl`` seconds
+    """
+    payload = base64.urlsafe_b64encode(
+        salt.payload.dumps(
+            [minion_id, saltenv, path, os.urandom(16).hex(), time.time() + ttl]
+        )
+    )
+    mac = hmac.new(key, payload, hashlib.sha256).hexdigest()
+    return "{}.{}".format(salt.utils.stringutils.to_str(payload), mac)
+
+
+def read_ticket(key, ticket):
+    """
+    Return a dict with the ``id``, ``saltenv`` and ``path`` a ticket was
+    issued for, or None if the ticket was not signed with ``key`` or has
+    expired
+    """
+    try:
+        payload, mac = salt.utils.stringutils.to_str(ticket).rsplit(".", 1)
+    except ValueError:
+        return None
+    payload = salt.utils.stringutils.to_bytes(payload)
+    expected = hmac.new(key, payload, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(mac, expected):
+        return None
+    minion_id, saltenv, path, _, expires = salt.payload.loads(
+        base64.urlsafe_b64decode(payload)
+    )
+    if expires < time.time():
+        return None
+    return {
+        "id": salt.utils.stringutils.to_str(minion_id),
+        "saltenv": salt.utils.stringutils.to_str(saltenv),
+        "path": salt.utils.stringutils.to_str(path),
+    }
+
+
+def stream_key(key, ticket):
+    """
+    Return the key string of the ``Crypticle`` the file data of a ticket is
+    encrypted with
+    """
+    digest = hmac.new(
+        key,
+        b"stream:" + salt.utils.stringutils.to_bytes(ticket),
+        hashlib.sha512,
+    ).digest()
+    # The AES key of a Crypticle is 192 bits, followed by its HMAC key
+    return salt.utils.stringutils.to_str(
+        base64.b64encode(digest[: 24 + salt.crypt.Crypticle.SIG_SIZE])
+    )
+
+
+class FileTransferServer:
+    """
+    Serve the files tickets were issued for
+
+    opts
+        The master opts, ``interface``, ``fileserver_transfer_port`` and
+        ``ssl`` are used.
+
+    get_key
+        A callable returning the current ticket signing key.
+
+    find_file
+        A callable looking up a path in a saltenv with the fileserver, and
+        returning its ``fnd`` dict.
+    """
+
+    def __init__(self, opts, get_key, find_file):
+        self.opts = opts
+        self.get_key = get_key
+        self.find_file = find_file
+
+    async def handle(self, reader, writer):
+        """
+        Read ``<ticket> <offset>`` from the client and stream the rest of the
+        file from that offset
+        """
+        peer = writer.get_extra_info("peername")
+        try:
+            line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            try:
+                ticket, offset = line.split()
+                offset = int(offset)
+            except ValueError:
+                log.debug("Malformed file transfer request from %s", peer)
+                return
+            key = self.get_key()
+            issued = read_ticket(key, ticket)
+            fnd = {}
+            if issued is not None:
+                # Only serve what the fileserver serves, from the file roots
+                # and the caches of the fileserver backends
+                fnd = await asyncio.get_running_loop().run_in_executor(
+                    None, self.find_file, issued["path"], issued["saltenv"]
+                )
+            if not fnd.get("path") or offset < 0:
+                log.debug("Denied file transfer request from %s", peer)
+                writer.write(HEADER.pack(STATUS_DENIED, 0))
+                await writer.drain()
+                return
+            with salt.utils.files.fopen(fnd["path"], "rb") as fp_:
+                count = max(os.fstat(fp_.fileno()).st_size - offset, 0)
+                writer.write(HEADER.pack(STATUS_OK, count))
+                if self.opts.get("ssl"):
+                    await self._send_plain(writer, fp_, offset, count)
+                else:
+                    await self._send_encrypted(
+                        writer, fp_, offset, count, stream_key(key, ticket)
+                    )
+                await writer.drain()
+            log.debug(
+                "Sent %d bytes of %s to %s at %s",
+                count,
+                fnd["path"],
+                issued["id"],
+                peer,
+            )
+        except (OSError, asyncio.TimeoutError) as exc:
+            log.debug("File transfer to %s failed: %s", peer, exc)
+        finally:
+            writer.close()
+
+    async def _send_plain(self, writer, fp_, offset, count):
+        """
+        Send ``count`` bytes of ``fp_`` from ``offset`` over a TLS stream
+        """
+        fp_.seek(offset)
+        while count:
+            data = fp_.read(min(FRAME_DATA_SIZE, count))
+            if not data:
+                raise OSError("File shrank while it was sent")
+            writer.write(data)
+            await writer.drain()
+            count -= len(data)
+
+    async def _send_encrypted(self, writer, fp_, offset, count, key_string):
+        """
+        Send ``count`` bytes of ``fp_`` from ``offset`` in encrypted frames.
+        The last frame is flagged as such, and is sent even if it is empty.
+        """
+        crypticle = salt.crypt.Crypticle(self.opts, key_string)
+        fp_.seek(offset)
+        sequence = 0
+        while True:
+            size = min(FRAME_DATA_SIZE, count)
+            data = fp_.read(size)
+            if len(data) != size:
+                raise OSError("File shrank while it was sent")
+            count -= size
+            frame = crypticle.encrypt(
+                FRAME_META.pack(sequence, offset, not count) + data
+            )
+            writer.write(FRAME.pack(len(frame)) + frame)
+            await writer.drain()
+            if not count:
+                return
+            sequence += 1
+            offset += size
+
+    async def serve_forever(self):
+        ssl_ctx = None
+        if self.opts.get("ssl"):
+            ssl_ctx = salt.transport.base.ssl_context(
+                self.opts["ssl"], server_side=True
+            )
+        server = await asyncio.start_server(
+            self.handle,
+            host=self.opts["interface"],
+            port=self.opts["fileserver_transfer_port"],
+            ssl=ssl_ctx,
+            reuse_address=True,
+        )
+        log.info(
+            "File transfer server listening on %s:%s",
+            self.opts["interface"],
+            self.opts["fileserver_transfer_port"],
+        )
+        async with server:
+            await server.serve_forever()
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise salt.exceptions.SaltClientError(
+                "File transfer server closed the connection"
+            )
+        data += chunk
+    return data
+
+
+def fetch(
+    address,
+    port,
+    ticket,
+    fp_,
+    key=None,
+    ssl_options=None,
+    server_hostname=None,
+    timeout=60,
+):
+    """
+    Stream the file a ticket was issued for into ``fp_``, starting at the
+    current position of ``fp_``. Received data is written as it arrives, so
+    on error ``fp_`` holds an intact prefix of the file to resume from.
+
+    ``key`` is the key string the master sent along with the ticket, the
+    file data is encrypted with it unless ``ssl_options`` are given.
+
+    Returns the number of bytes received.
+    """
+    offset = fp_.tell()
+    sock = socket.create_connection((address, port), timeout=timeout)
+    try:
+        if ssl_options:
+            ctx = salt.transport.base.ssl_context(ssl_options, server_side=False)
+            sock = ctx.wrap_socket(sock, server_hostname=server_hostname or address)
+        sock.sendall(
+            salt.utils.stringutils.to_bytes(
+                "{} {}\n".format(salt.utils.stringutils.to_str(ticket), offset)
+            )
+        )
+        status, remaining = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+        if status != STATUS_OK:
+            raise salt.exceptions.SaltClientError(
+                "File transfer server denied the ticket"
+            )
+        received = 0
+        if not ssl_options:
+            if key is None:
+                raise salt.exceptions.SaltClientError(
+                    "No key to decrypt the file transfer with"
+                )
+            crypticle = salt.crypt.Crypticle({}, key)
+            sequence = 0
+            while True:
+                (size,) = FRAME.unpack(_recv_exactly(sock, FRAME.size))
+                try:
+                    data = crypticle.decrypt(_recv_exactly(sock, size))
+                except salt.exceptions.AuthenticationError:
+                    raise salt.exceptions.SaltClientError(
+                        "File transfer data failed authentication"
+                    )
+                if len(data) < FRAME_META.size:
+                    raise salt.exceptions.SaltClientError(
+                        "File transfer sent a malformed frame"
+                    )
+                frame_sequence, frame_offset, final = FRAME_META.unpack_from(data)
+                data = data[FRAME_META.size :]
+                if frame_sequence != sequence or frame_offset != offset + received:
+                    raise salt.exceptions.SaltClientError(
+                        "File transfer sent a frame out of order"
+                    )
+                if len(data) > remaining:
+                    raise salt.exceptions.SaltClientError(
+                        "File transfer sent more data than announced"
+                    )
+                fp_.write(data)
+                received += len(data)
+                remaining -= len(data)
+                if final:
+                    break
+                sequence += 1
+            if remaining:
+                raise salt.exceptions.SaltClientError(
+                    "File transfer ended {} bytes early".format(remaining)
+                )
+            return received
+        buf = memoryview(bytearray(min(RECV_BUFFER_SIZE, remaining) or 1))
+        while remaining:
+            nbytes = sock.recv_into(buf, min(len(buf), remaining))
+            if not nbytes:
+                raise salt.exceptions.SaltClientError(
+                    "File transfer ended {} bytes early".format(remaining)
+                )
+            fp_.write(buf[:nbytes])
+            received += nbytes
+            remaining -= nbytes
+        return received
+    finally:
+        sock.close()
@@ -18,6 +18,7 @@ import shlex
 import shutil
 import stat
 import subprocess
+import threading
 import time
 import weakref
 from datetime import datetime
@@ -25,6 +26,8 @@ from datetime import datetime
 import tornado.ioloop
 
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.cache
 import salt.utils.configparser
 import salt.utils.data
@@ -57,6 +60,9 @@ GLOBAL_ONLY = ()
 
 SYMLINK_RECURSE_DEPTH = 100
 
+# The depth libgit2 uses to fetch the rest of the history of a shallow clone
+GIT_FETCH_DEPTH_UNSHALLOW = 2147483647
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ("pygit2",)
 AUTH_PARAMS = ("user", "password", "pubkey", "privkey", "passphrase", "insecure_auth")
@@ -182,6 +188,7 @@ def enforce_types(key, val):
         "refspecs": "stringlist",
         "ref_types": "stringlist",
         "update_interval": int,
+        "fetch_depth": int,
     }
 
     def _find_global(key):
@@ -744,6 +751,12 @@ class GitProvider:
                 )
         return cleaned
 
+    def is_shallow(self):
+        """
+        Return True if the local copy of the repo is a shallow clone
+        """
+        return os.path.exists(os.path.join(self.gitdir, "shallow"))
+
     def clear_lock(self, lock_type="update"):
         """
         Clear update.lk
@@ -817,6 +830,7 @@ class GitProvider:
             # 1. Fetch URL
             # 2. refspecs used in fetch
             # 3. http.sslVerify
+            # 4. The partial clone filter
             conf_changed = False
             remote_section = 'remote "origin"'
 
@@ -898,6 +912,39 @@ class GitProvider:
                 )
                 conf_changed = True
 
+            # 4. Partial clone filter. Once the remote is a promisor remote
+            # it must stay one, because objects left out by an earlier fetch
+            # are fetched from it on demand. Removing the filter only stops
+            # later fetches from leaving objects out.
+            fetch_filter = getattr(self, "fetch_filter", "")
+            try:
+                current_filter = conf.get(remote_section, "partialclonefilter")
+            except salt.utils.configparser.NoOptionError:
+                current_filter = None
+            if fetch_filter and current_filter != fetch_filter:
+                for section in ("core", "extensions"):
+                    if not conf.has_section(section):
+                        conf.add_section(section)
+                conf.set("core", "repositoryformatversion", "1")
+                conf.set("extensions", "partialclone", "origin")
+                conf.set(remote_section, "promisor", "true")
+                conf.set(remote_section, "partialclonefilter", fetch_filter)
+                log.debug(
+                    "Partial clone filter for %s remote '%s' set to %s",
+                    self.role,
+                    self.id,
+                    fetch_filter,
+                )
+                conf_changed = True
+            elif not fetch_filter and current_filter is not None:
+                conf.remove_option(remote_section, "partialclonefilter")
+                log.debug(
+                    "Partial clone filter for %s remote '%s' removed",
+                    self.role,
+                    self.id,
+                )
+                conf_changed = True
+
             # Write changes, if necessary
             if conf_changed:
                 with salt.utils.files.fopen(git_config, "w") as fp_:
@@ -1231,6 +1278,28 @@ class GitProvider:
         """
         raise NotImplementedError()
 
+    def file_manifest(self, tgt_env):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def blob_data(self, hexsha):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def get_tree_id(self, tgt_env):
+        """
+        Return the SHA of the tree for the specified environment, or None if
+        the environment does not map to a tree in this repo
+        """
+        tree = self.get_tree(tgt_env)
+        if tree is None:
+            return None
+        return getattr(tree, "hexsha", None) or str(tree.id)
+
     def get_checkout_target(self):
         """
         Resolve dynamically-set branch
@@ -1567,10 +1636,18 @@ class GitPython(GitProvider):
         local copy was already up-to-date, return False.
         """
         origin = self.repo.remotes[0]
+        fetch_kwargs = {}
+        fetch_depth = getattr(self, "fetch_depth", 0)
+        if fetch_depth > 0:
+            fetch_kwargs["depth"] = fetch_depth
+        elif self.is_shallow():
+            # The depth limit was removed from the config, fetch the rest of
+            # the history so that every commit can be used as a saltenv again
+            fetch_kwargs["unshallow"] = True
         try:
-            fetch_results = origin.fetch()
+            fetch_results = origin.fetch(**fetch_kwargs)
         except AssertionError:
-            fetch_results = origin.fetch()
+            fetch_results = origin.fetch(**fetch_kwargs)
 
         new_objs = False
         for fetchinfo in fetch_results:
@@ -1684,6 +1761,44 @@ class GitPython(GitProvider):
             return blob, blob.hexsha, blob.mode
         return None, None, None
 
+    def file_manifest(self, tgt_env):
+        """
+        Return a dict mapping the path of each file in the target environment
+        to its blob SHA and mode, walking the tree once using GitPython
+        """
+        manifest = {}
+        tree = self.get_tree(tgt_env)
+        if not tree:
+            return manifest
+        if self.root(tgt_env):
+            try:
+                tree = tree / self.root(tgt_env)
+            except KeyError:
+                return manifest
+
+            def relpath(path):
+                return os.path.relpath(path, self.root(tgt_env))
+
+        else:
+
+            def relpath(path):
+                return path
+
+        for file_blob in tree.traverse():
+            if not isinstance(file_blob, git.Blob):
+                continue
+            file_path = salt.utils.path.join(
+                self.mountpoint(tgt_env), relpath(file_blob.path), use_posixpath=True
+            )
+            manifest[file_path] = (file_blob.hexsha, file_blob.mode)
+        return manifest
+
+    def blob_data(self, hexsha):
+        """
+        Return the contents of the blob with the specified SHA
+        """
+        return self.repo.odb.stream(bytes.fromhex(hexsha)).read()
+
     def get_tree_from_branch(self, ref):
         """
         Return a git.Tree object matching a head ref fetched into
@@ -1747,6 +1862,16 @@ class Pygit2(GitProvider):
             cache_root,
             role,
         )
+        if getattr(self, "fetch_filter", ""):
+            # libgit2 can neither fetch with a filter nor open a repo which
+            # uses the partialclone extension
+            log.warning(
+                "Partial clones are not supported by pygit2, fetch_filter "
+                "will be ignored for %s remote '%s'",
+                self.role,
+                self.id,
+            )
+            self.fetch_filter = ""
 
     def peel(self, obj):
         """
@@ -2116,6 +2241,21 @@ class Pygit2(GitProvider):
         except AttributeError:
             # pruning only available in pygit2 >= 0.26.2
             pass
+        fetch_depth = getattr(self, "fetch_depth", 0)
+        if fetch_depth > 0 or self.is_shallow():
+            if PYGIT2_VERSION >= Version("1.14.0"):
+                # A depth of GIT_FETCH_DEPTH_UNSHALLOW fetches the rest of
+                # the history when the depth limit was removed from the config
+                fetch_kwargs["depth"] = fetch_depth or GIT_FETCH_DEPTH_UNSHALLOW
+            elif fetch_depth > 0:
+                log.warning(
+                    "The installed version of pygit2 (%s) does not support "
+                    "shallow fetches, fetch_depth will be ignored for %s "
+                    "remote '%s'",
+                    PYGIT2_VERSION,
+                    self.role,
+                    self.id,
+                )
         try:
             fetch_results = origin.fetch(**fetch_kwargs)
         except GitError as exc:  # pylint: disable=broad-except
@@ -2280,6 +2420,59 @@ class Pygit2(GitProvider):
             return blob, blob.hex, mode
         return None, None, None
 
+    def file_manifest(self, tgt_env):
+        """
+        Return a dict mapping the path of each file in the target environment
+        to its blob SHA and mode, walking the tree once using pygit2
+        """
+
+        def _traverse(tree, prefix):
+            for entry in iter(tree):
+                if entry.oid not in self.repo:
+                    # Entry is a submodule, skip it
+                    continue
+                obj = self.repo[entry.oid]
+                repo_path = salt.utils.path.join(prefix, entry.name, use_posixpath=True)
+                if isinstance(obj, pygit2.Blob):
+                    file_path = salt.utils.path.join(
+                        self.mountpoint(tgt_env),
+                        relpath(repo_path),
+                        use_posixpath=True,
+                    )
+                    manifest[file_path] = (str(entry.oid), int(entry.filemode))
+                elif isinstance(obj, pygit2.Tree):
+                    _traverse(obj, repo_path)
+
+        manifest = {}
+        tree = self.get_tree(tgt_env)
+        if not tree:
+            return manifest
+        if self.root(tgt_env):
+            try:
+                oid = tree[self.root(tgt_env)].oid
+                tree = self.repo[oid]
+            except KeyError:
+                return manifest
+            if not isinstance(tree, pygit2.Tree):
+                return manifest
+
+            def relpath(path):
+                return os.path.relpath(path, self.root(tgt_env))
+
+        else:
+
+            def relpath(path):
+                return path
+
+        _traverse(tree, self.root(tgt_env))
+        return manifest
+
+    def blob_data(self, hexsha):
+        """
+        Return the contents of the blob with the specified SHA
+        """
+        return self.repo[hexsha].data
+
     def get_tree_from_branch(self, ref):
         """
         Return a pygit2.Tree object matching a head ref fetched into
@@ -2705,7 +2898,7 @@ class GitBase:
 
     def _iter_remote_hashes(self):
         for item in os.listdir(self.cache_root):
-            if item in ("hash", "refs", "links", "work"):
+            if item in ("hash", "refs", "links", "work", "manifests"):
                 continue
             if os.path.isdir(salt.utils.path.join(self.cache_root, item)):
                 yield item
@@ -2779,51 +2972,124 @@ class GitBase:
             )
             remotes = []
 
-        changed = False
+        repos = []
         for repo in self.remotes:
             name = getattr(repo, "name", None)
             if not remotes or (repo.id, name) in remotes or name in remotes:
-                try:
-                    # Find and place fetch_request file for all the other branches for this repo
-                    repo_work_hash = os.path.split(repo.get_salt_working_dir())[0]
-                    for branch in os.listdir(repo_work_hash):
-                        # Don't place fetch request in current branch being updated
-                        if branch == repo.get_cache_basename():
-                            continue
-                        branch_salt_dir = salt.utils.path.join(repo_work_hash, branch)
-                        fetch_path = salt.utils.path.join(
-                            branch_salt_dir, "fetch_request"
+                repos.append(repo)
+
+        self.fetch_durations = {}
+        concurrency = self.opts.get(f"{self.role}_fetch_concurrency", 1) or 1
+        timeout = self.opts.get(f"{self.role}_fetch_timeout")
+        if concurrency > 1 and len(repos) > 1:
+            return self._fetch_concurrently(repos, concurrency, timeout)
+
+        changed = False
+        for repo in repos:
+            if self._fetch_remote(repo):
+                # We can't just use the return value from repo.fetch()
+                # because the data could still have changed if old
+                # remotes were cleared above. Additionally, we're
+                # running this in a loop and later remotes without
+                # changes would override this value and make it
+                # incorrect.
+                changed = True
+        return changed
+
+    def _fetch_remote(self, repo):
+        """
+        Fetch a single remote, recording how long the fetch took. Returns
+        True if the local copy was updated.
+        """
+        start = time.monotonic()
+        try:
+            # Find and place fetch_request file for all the other branches for this repo
+            repo_work_hash = os.path.split(repo.get_salt_working_dir())[0]
+            for branch in os.listdir(repo_work_hash):
+                # Don't place fetch request in current branch being updated
+                if branch == repo.get_cache_basename():
+                    continue
+                branch_salt_dir = salt.utils.path.join(repo_work_hash, branch)
+                fetch_path = salt.utils.path.join(branch_salt_dir, "fetch_request")
+                if os.path.isdir(branch_salt_dir):
+                    try:
+                        with salt.utils.files.fopen(fetch_path, "w"):
+                            pass
+                    except OSError as exc:  # pylint: disable=broad-except
+                        log.error(
+                            "Failed to make fetch request: %s %s",
+                            fetch_path,
+                            exc,
+                            exc_info=True,
                         )
-                        if os.path.isdir(branch_salt_dir):
-                            try:
-                                with salt.utils.files.fopen(fetch_path, "w"):
-                                    pass
-                            except OSError as exc:  # pylint: disable=broad-except
-                                log.error(
-                                    "Failed to make fetch request: %s %s",
-                                    fetch_path,
-                                    exc,
-                                    exc_info=True,
-                                )
-                        else:
-                            log.error("Failed to make fetch request: %s", fetch_path)
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
-                        changed = True
-                except Exception as exc:  # pylint: disable=broad-except
+                else:
+                    log.error("Failed to make fetch request: %s", fetch_path)
+            return bool(repo.fetch())
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error(
+                "Exception caught while fetching %s remote '%s': %s",
+                self.role,
+                repo.id,
+                exc,
+                exc_info=True,
+            )
+            return False
+        finally:
+            duration = time.monotonic() - start
+            self.fetch_durations[repo.id] = duration
+            log.profile(
+                "%s fetch remote=%s duration=%s seconds", self.role, repo.id, duration
+            )
+
+    def _fetch_concurrently(self, repos, concurrency, timeout):
+        """
+        Fetch the remotes in threads, at most ``concurrency`` at a time. Each
+        remote is fetched under its own update lock, as when fetching them one
+        after another. A fetch running longer than ``timeout`` seconds is
+        abandoned so it does not hold up the other remotes. Its thread is left
+        to finish in the background, still holding the remote's update lock,
+        so the next update skips that remote until it is done.
+        """
+        results = {}
+        finished = threading.Condition()
+
+        def _fetch(repo):
+            try:
+                results[repo.id] = self._fetch_remote(repo)
+            finally:
+                with finished:
+                    finished.notify()
+
+        pending = list(repos)
+        running = {}
+        while pending or running:
+            while pending and len(running) < concurrency:
+                repo = pending.pop(0)
+                thread = threading.Thread(
+                    target=_fetch,
+                    args=(repo,),
+                    name=f"{self.role}_fetch",
+                    daemon=True,
+                )
+                running[thread] = (repo, time.monotonic())
+                thread.start()
+            with finished:
+                finished.wait(0.5)
+            now = time.monotonic()
+            for thread, (repo, start) in list(running.items()):
+                if not thread.is_alive():
+                    running.pop(thread)
+                elif timeout is not None and now - start > timeout:
+                    running.pop(thread)
+                    self.fetch_durations[repo.id] = now - start
                     log.error(
-                        "Exception caught while fetching %s remote '%s': %s",
+                        "Fetch of %s remote '%s' timed out after %s seconds, "
+                        "continuing with the other remotes",
                         self.role,
                         repo.id,
-                        exc,
-                        exc_info=True,
+                        timeout,
                     )
-        return changed
+        return any(results.values())
 
     def lock(self, remote=None):
         """
@@ -2880,6 +3146,8 @@ class GitBase:
                 fp_.write(salt.payload.dumps(new_envs))
                 log.trace("Wrote env cache data to %s", self.env_cache)
 
+        data["fetch_durations"] = getattr(self, "fetch_durations", {})
+
         # if there is a change, fire an event
         if self.opts.get("fileserver_events", False):
             with salt.utils.event.get_event(
@@ -3146,6 +3414,9 @@ class GitFS(GitBase):
                 cache_root=cache_root,
                 init_remotes=init_remotes,
             )
+            obj.manifest_cachedir = salt.utils.path.join(obj.cache_root, "manifests")
+            # Manifests loaded by this process, keyed by saltenv
+            obj._manifests = {}
             if not init_remotes:
                 log.debug("Created gitfs object with uninitialized remotes")
             else:
@@ -3172,6 +3443,142 @@ class GitFS(GitBase):
 
     # pylint: enable=super-init-not-called
 
+    def update(self, remotes=None):
+        """
+        Execute a git fetch on all of the repos, then write the manifests for
+        any environment whose trees changed
+        """
+        super().update(remotes=remotes)
+        if self.opts.get("gitfs_manifests", False):
+            try:
+                self.write_manifests()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Failed to write the gitfs manifests")
+
+    def _manifest_path(self, tgt_env):
+        return salt.utils.path.join(
+            self.manifest_cachedir,
+            "{}.p".format(tgt_env.replace(os.path.sep, "_|-")),
+        )
+
+    @staticmethod
+    def _read_manifest(path):
+        try:
+            with salt.utils.files.fopen(path, "rb") as fp_:
+                return salt.payload.load(fp_)
+        except (OSError, ValueError):
+            return None
+
+    def write_manifests(self):
+        """
+        Write a manifest for each exposed environment, mapping the path of
+        each file to its blob SHA, mode and hash, along with the symlinks and
+        directories in the environment. A manifest is only rebuilt when the
+        tree the environment maps to in one of the remotes changes, and blobs
+        already hashed for another manifest are not hashed again.
+        """
+        hash_type = self.opts["hash_type"]
+        os.makedirs(self.manifest_cachedir, exist_ok=True)
+        envs = self.envs(ignore_cache=True)
+        blob_hashes = {}
+        stale = {}
+        for tgt_env in envs:
+            key = [
+                [
+                    repo.id,
+                    repo.get_tree_id(tgt_env),
+                    repo.root(tgt_env),
+                    repo.mountpoint(tgt_env),
+                ]
+                for repo in self.remotes
+            ]
+            manifest = self._read_manifest(self._manifest_path(tgt_env)) or {}
+            if manifest.get("hash_type") == hash_type:
+                for hexsha, _, hsum in manifest.get("files", {}).values():
+                    if hsum:
+                        blob_hashes[hexsha] = hsum
+                if manifest.get("key") == key:
+                    continue
+            stale[tgt_env] = key
+
+        for tgt_env, key in stale.items():
+            files = {}
+            symlinks = {}
+            dirs = set()
+            for repo in self.remotes:
+                if repo.mountpoint(tgt_env):
+                    dirs.add(repo.mountpoint(tgt_env))
+                for path, (hexsha, mode) in repo.file_manifest(tgt_env).items():
+                    if path in files:
+                        # The first remote to have the file wins, as with
+                        # find_file
+                        continue
+                    if stat.S_ISLNK(mode):
+                        # The blob holds the link target, lookups of the link
+                        # are left to find_file which follows it
+                        symlinks[path] = salt.utils.stringutils.to_str(
+                            repo.blob_data(hexsha)
+                        )
+                        files[path] = [None, mode, None]
+                        continue
+                    if hexsha not in blob_hashes:
+                        blob_hashes[hexsha] = hashlib.new(
+                            hash_type, repo.blob_data(hexsha)
+                        ).hexdigest()
+                    files[path] = [hexsha, mode, blob_hashes[hexsha]]
+            for path in files:
+                parent = os.path.dirname(path)
+                while parent and parent not in dirs:
+                    dirs.add(parent)
+                    parent = os.path.dirname(parent)
+            manifest = {
+                "key": key,
+                "hash_type": hash_type,
+                "files": files,
+                "symlinks": symlinks,
+                "dirs": sorted(dirs),
+            }
+            with salt.utils.atomicfile.atomic_open(
+                self._manifest_path(tgt_env), "wb"
+            ) as fp_:
+                fp_.write(salt.payload.dumps(manifest))
+            log.debug("Wrote gitfs manifest for saltenv '%s'", tgt_env)
+
+        # Remove the manifests of environments which no longer exist
+        current = {os.path.basename(self._manifest_path(x)) for x in envs}
+        for name in os.listdir(self.manifest_cachedir):
+            if name.endswith(".p") and name not in current:
+                try:
+                    os.remove(salt.utils.path.join(self.manifest_cachedir, name))
+                except OSError:
+                    pass
+
+    def manifest(self, tgt_env):
+        """
+        Return the manifest for the specified environment, or None if there
+        is none for the configured hash_type. Manifests are reloaded when the
+        fileserver update process replaces them.
+        """
+        if not self.opts.get("gitfs_manifests", False):
+            return None
+        path = self._manifest_path(tgt_env)
+        try:
+            st_ = os.stat(path)
+        except OSError:
+            self._manifests.pop(tgt_env, None)
+            return None
+        stamp = (st_.st_ino, st_.st_mtime_ns)
+        cached = self._manifests.get(tgt_env)
+        if cached is None or cached[0] != stamp:
+            manifest = self._read_manifest(path)
+            if (
+                not isinstance(manifest, dict)
+                or manifest.get("hash_type") != self.opts["hash_type"]
+            ):
+                manifest = None
+            cached = self._manifests[tgt_env] = (stamp, manifest)
+        return cached[1]
+
     def dir_list(self, load):
         """
         Return a list of all directories on the master
@@ -3228,6 +3635,26 @@ class GitFS(GitBase):
                 os.remove(hashdir)
                 os.makedirs(hashdir)
 
+        manifest = self.manifest(tgt_env)
+        if manifest is not None:
+            entry = manifest["files"].get(path)
+            if entry is None:
+                return fnd
+            if entry[0] is not None:
+                # Serve the file from the cache without walking the tree if
+                # the cached copy is of the blob in the manifest
+                salt.fileserver.wait_lock(lk_fn, dest)
+                try:
+                    with salt.utils.files.fopen(blobshadest, "r") as fp_:
+                        if salt.utils.stringutils.to_unicode(fp_.read()) == entry[0]:
+                            fnd["rel"] = path
+                            fnd["path"] = dest
+                            fnd["stat"] = [entry[1]]
+                            return fnd
+                except OSError as exc:
+                    if exc.errno != errno.ENOENT:
+                        raise
+
         for repo in self.remotes:
             if repo.mountpoint(tgt_env) and not path.startswith(
                 repo.mountpoint(tgt_env) + os.sep
@@ -3341,6 +3768,12 @@ class GitFS(GitBase):
             return "", None
         ret = {"hash_type": self.opts["hash_type"]}
         relpath = fnd["rel"]
+        manifest = self.manifest(load["saltenv"])
+        if manifest is not None:
+            entry = manifest["files"].get(relpath)
+            if entry is not None and entry[2] is not None:
+                ret["hsum"] = entry[2]
+                return ret
         path = fnd["path"]
         lc_hash_type = self.opts["hash_type"]
         hashdest = salt.utils.path.join(
@@ -3375,6 +3808,12 @@ class GitFS(GitBase):
             # "env" is not supported; Use "saltenv".
             load.pop("env")
 
+        manifest = self.manifest(load["saltenv"])
+        if manifest is not None:
+            if form == "files":
+                return sorted(manifest["files"])
+            return manifest.get(form, {} if form == "symlinks" else [])
+
         if not os.path.isdir(self.file_list_cachedir):
             try:
                 os.makedirs(self.file_list_cachedir)
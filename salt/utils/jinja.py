@@ -2,6 +2,7 @@
 Jinja loading utils to enable a more powerful backend for jinja templates
 """
 
+import hashlib
 import itertools
 import logging
 import os.path
@@ -17,11 +18,12 @@ from xml.dom import minidom
 from xml.etree.ElementTree import Element, SubElement, tostring
 
 import jinja2
-from jinja2 import BaseLoader, TemplateNotFound, nodes
+from jinja2 import BaseLoader, BytecodeCache, TemplateNotFound, nodes
 from jinja2.environment import TemplateModule
 from jinja2.exceptions import TemplateRuntimeError
 from jinja2.ext import Extension
 
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
 import salt.utils.json
@@ -41,7 +43,7 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
-__all__ = ["SaltCacheLoader", "SerializerExtension"]
+__all__ = ["SaltBytecodeCache", "SaltCacheLoader", "SerializerExtension"]
 
 GLOBAL_UUID = uuid.UUID("91633EBF-1C86-5E33-935A-28061F4B480E")
 JINJA_VERSION = Version(jinja2.__version__)
@@ -220,6 +222,149 @@ class SaltCacheLoader(BaseLoader):
         self.destroy()
 
 
+class SaltBytecodeCache(BytecodeCache):
+    """
+    A jinja bytecode cache which keeps compiled templates in memory for the
+    lifetime of the process and on disk under the cachedir.
+
+    Buckets are keyed by a hash of the template source, its name and the
+    options of the environment which compiled it, so an edited template or a
+    change in e.g. ``trim_blocks`` never hits a stale entry.
+    """
+
+    # Upper bound for the number of compiled templates kept in memory
+    max_memory_entries = 1000
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._memory = {}
+
+    def get_bucket(self, environment, name, filename, source):
+        key = hashlib.sha256(
+            "|".join(
+                (
+                    jinja2.__version__,
+                    self._environment_fingerprint(environment),
+                    str(name),
+                    str(filename),
+                    source,
+                )
+            ).encode("utf-8", "surrogateescape")
+        ).hexdigest()
+        bucket = jinja2.bccache.Bucket(
+            environment, key, self.get_source_checksum(source)
+        )
+        self.load_bytecode(bucket)
+        return bucket
+
+    @staticmethod
+    def _environment_fingerprint(environment):
+        """
+        Return the settings of ``environment`` which affect the code generated
+        for a template
+        """
+        return repr(
+            (
+                type(environment).__name__,
+                environment.block_start_string,
+                environment.block_end_string,
+                environment.variable_start_string,
+                environment.variable_end_string,
+                environment.comment_start_string,
+                environment.comment_end_string,
+                environment.line_statement_prefix,
+                environment.line_comment_prefix,
+                environment.trim_blocks,
+                environment.lstrip_blocks,
+                environment.newline_sequence,
+                environment.keep_trailing_newline,
+                environment.optimized,
+                environment.autoescape,
+                sorted(environment.extensions),
+            )
+        )
+
+    def _cache_path(self, bucket):
+        return os.path.join(self.directory, f"{bucket.key}.cache")
+
+    def load_bytecode(self, bucket):
+        data = self._memory.get(bucket.key)
+        if data is None and self.directory:
+            try:
+                with salt.utils.files.fopen(self._cache_path(bucket), "rb") as fp_:
+                    data = fp_.read()
+            except OSError:
+                return
+            self._remember(bucket.key, data)
+        if data is not None:
+            bucket.bytecode_from_string(data)
+
+    def dump_bytecode(self, bucket):
+        data = bucket.bytecode_to_string()
+        self._remember(bucket.key, data)
+        if not self.directory:
+            return
+        with salt.utils.files.set_umask(0o077):
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with salt.utils.atomicfile.atomic_open(
+                    self._cache_path(bucket), "wb"
+                ) as fp_:
+                    fp_.write(data)
+            except OSError as exc:
+                log.debug("Unable to write jinja bytecode cache: %s", exc)
+
+    def _remember(self, key, data):
+        if len(self._memory) >= self.max_memory_entries:
+            self._memory.clear()
+        self._memory[key] = data
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".cache"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+
+_BYTECODE_CACHES = {}
+
+
+def get_bytecode_cache(opts):
+    """
+    Return the process wide :py:class:`SaltBytecodeCache` for ``opts``, or
+    ``None`` if ``jinja_bytecode_cache`` is disabled.
+    """
+    if not opts.get("jinja_bytecode_cache", False):
+        return None
+    directory = None
+    if opts.get("cachedir"):
+        directory = os.path.join(opts["cachedir"], "jinja_bytecode")
+    if directory not in _BYTECODE_CACHES:
+        _BYTECODE_CACHES[directory] = SaltBytecodeCache(directory)
+    return _BYTECODE_CACHES[directory]
+
+
+def template_from_string(environment, source):
+    """
+    Like ``environment.from_string``, but reuse the compiled template from the
+    environment's bytecode cache when it has one.
+    """
+    bcc = environment.bytecode_cache
+    if bcc is None:
+        return environment.from_string(source)
+    bucket = bcc.get_bucket(environment, None, None, source)
+    if bucket.code is None:
+        bucket.code = environment.compile(source)
+        bcc.set_bucket(bucket)
+    return environment.template_class.from_code(
+        environment, bucket.code, environment.make_globals(None), None
+    )
+
+
 class PrintableDict(OrderedDict):
     """
     Ensures that dict str() and repr() are YAML friendly.
@@ -2152,6 +2152,27 @@ class SaltCMDOptionParser(
             dest="batch_safe_size",
             help="Batch size to use for batch jobs created by batch-safe-limit.",
         )
+        self.add_option(
+            "--batch-stream",
+            default=False,
+            dest="batch_stream",
+            action="store_true",
+            help=(
+                "Start the batch run right away on the minions the master "
+                "expects to match the target, instead of pinging them first, "
+                "and refill the batch as returns arrive."
+            ),
+        )
+        self.add_option(
+            "--batch-state-file",
+            default=None,
+            dest="batch_state_file",
+            help=(
+                "With --batch-stream, record the minions which returned in "
+                "this file, and skip them when the same job is run again "
+                "after the batch run was interrupted."
+            ),
+        )
         self.add_option(
             "--return",
             default="",
@@ -3153,6 +3174,17 @@ class SaltSSHOptionParser(
                 "faster communication should be. Default: %default."
             ),
         )
+        self.add_option(
+            "--fanout",
+            dest="ssh_fanout",
+            default="process",
+            choices=("process", "thread"),
+            help=(
+                "Communicate with each minion in a process of its own, or in "
+                "a thread of the salt-ssh process. Threads are lighter, which "
+                "allows a higher --max-procs. Default: %default."
+            ),
+        )
         self.add_option(
             "--extra-filerefs",
             dest="extra_filerefs",
@@ -3184,6 +3216,16 @@ class SaltSSHOptionParser(
             dest="thin_exclude_saltexts",
             help="Exclude Salt extension modules from generated Thin Salt.",
         )
+        self.add_option(
+            "--thin-layers",
+            default=False,
+            action="store_true",
+            dest="thin_layers",
+            help=(
+                "Deploy Thin Salt in layers, only sending the layers which "
+                "changed since the last deployment on the minion."
+            ),
+        )
         self.add_option(
             "-v",
             "--verbose",
@@ -3280,6 +3322,17 @@ class SaltSSHOptionParser(
                 "Can be used multiple times."
             ),
         )
+        ssh_group.add_option(
+            "--control-persist",
+            dest="ssh_control_persist",
+            default=0,
+            type=int,
+            help=(
+                "Keep a master connection to each host open in the background "
+                "for this many seconds, and multiplex the SSH connections of "
+                "this and the later salt-ssh runs over it. Default: %default."
+            ),
+        )
         self.add_option_group(ssh_group)
 
         auth_group = optparse.OptionGroup(
@@ -2,10 +2,21 @@
 Functions which implement running reactor jobs
 """
 
+import bisect
+import copy
 import fnmatch
+import functools
 import glob
 import logging
 import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+import jinja2
+import jinja2.nodes
 
 import salt.client
 import salt.defaults.exitcodes
@@ -16,6 +27,7 @@ import salt.utils.cache
 import salt.utils.data
 import salt.utils.event
 import salt.utils.files
+import salt.utils.jinja
 import salt.utils.master
 import salt.utils.process
 import salt.utils.yaml
@@ -27,6 +39,197 @@ REACTOR_INTERNAL_KEYWORDS = frozenset(
     ["__id__", "__sls__", "name", "order", "fun", "key", "state"]
 )
 
+# The number of tags whose reactors are remembered
+TAG_CACHE_SIZE = 4096
+
+# What to do with a runner or wheel reaction when the queue of the workers is
+# full, see the reactor_worker_overflow option
+OVERFLOW_POLICIES = ("drop", "drop_oldest", "block", "coalesce")
+
+# The upper bounds, in seconds, of the buckets of the reaction latency
+# histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _NotDataOnly(Exception):
+    """
+    Raised when a reactor SLS marked as data only uses the event data in a
+    way which cannot be substituted after rendering
+    """
+
+
+def _check_data_only(opts, source):
+    """
+    Raise _NotDataOnly if a reactor SLS uses the event data in a way which the
+    placeholders can't detect while it is rendered
+
+    Jinja tests such as ``is defined`` or ``is none`` do not call the value
+    they test, so they would always see a placeholder. Templates which are
+    included or imported are not checked, so they are not allowed either.
+    """
+    first_line = source.split("\n", 1)[0]
+    if first_line.startswith("#!"):
+        pipe = first_line[2:]
+    else:
+        pipe = opts.get("renderer", "jinja|yaml")
+    if "jinja" not in pipe:
+        raise _NotDataOnly("it is not rendered with Jinja")
+    env_args = {
+        "extensions": [
+            "jinja2.ext.do",
+            "jinja2.ext.loopcontrols",
+            salt.utils.jinja.SerializerExtension,
+        ]
+    }
+    jinja_env = opts.get("jinja_env", {})
+    if isinstance(jinja_env, dict):
+        for key, val in jinja_env.items():
+            if hasattr(jinja2.defaults, key.upper()):
+                env_args[key.lower()] = val
+    try:
+        ast = jinja2.Environment(**env_args).parse(source)
+    except jinja2.TemplateSyntaxError as exc:
+        raise _NotDataOnly(f"it can't be parsed: {exc}")
+    tests = sorted({node.name for node in ast.find_all(jinja2.nodes.Test)})
+    if tests:
+        raise _NotDataOnly("it uses the {} test".format(", ".join(tests)))
+    if ast.find(
+        (
+            jinja2.nodes.Include,
+            jinja2.nodes.Import,
+            jinja2.nodes.FromImport,
+            jinja2.nodes.Extends,
+        )
+    ):
+        raise _NotDataOnly("it includes, imports or extends other templates")
+
+
+class _Placeholder:
+    """
+    Stands for a value of the event while a data only reactor SLS is rendered.
+    It renders as a token, which is replaced with the value it stands for in
+    the rendered data. Any other use of the value, such as a comparison, makes
+    the rendering depend on the event data, and raises _NotDataOnly.
+    """
+
+    __hash__ = object.__hash__
+
+    def __init__(self, plan, path, default=None):
+        self._plan = plan
+        self._path = path
+        self._default = default
+        self._token = None
+
+    def __getitem__(self, key):
+        return _Placeholder(self._plan, self._path + (key,))
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get(self, key, default=None):
+        return _Placeholder(self._plan, self._path + (key,), default)
+
+    def __str__(self):
+        if self._token is None:
+            self._token = self._plan.add(self._path, self._default)
+        return self._token
+
+    def _not_data_only(self, *args, **kwargs):
+        raise _NotDataOnly(
+            "{} is not only interpolated".format(
+                "".join(f"[{key!r}]" for key in self._path[1:]) or self._path[0]
+            )
+        )
+
+    __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = _not_data_only
+    __bool__ = __len__ = __iter__ = __contains__ = __call__ = _not_data_only
+    __add__ = __radd__ = __mod__ = __int__ = __float__ = _not_data_only
+
+
+class _ReactionPlan:
+    """
+    The rendered data of a data only reactor SLS, with tokens in place of the
+    event values it depends on
+    """
+
+    def __init__(self, mtime):
+        self.mtime = mtime
+        self.high = None
+        self.key = uuid.uuid4().hex
+        self.prefix = f"__reactor_{self.key}_"
+        self.regex = re.compile(re.escape(self.prefix) + r"(\d+)__")
+        self.values = []
+
+    def add(self, path, default):
+        self.values.append((path, default))
+        return f"{self.prefix}{len(self.values) - 1}__"
+
+    def _strings(self, obj):
+        if isinstance(obj, dict):
+            for key, val in obj.items():
+                yield from self._strings(key)
+                yield from self._strings(val)
+        elif isinstance(obj, list):
+            for item in obj:
+                yield from self._strings(item)
+        elif isinstance(obj, str):
+            yield obj
+
+    def verify(self):
+        """
+        Raise _NotDataOnly unless every token is found verbatim in the
+        rendered data. A token which was changed by a filter, such as
+        ``upper``, or dropped, would not be replaced with the event value.
+        """
+        found = set()
+        key = re.compile(re.escape(self.key), re.IGNORECASE)
+        for string in self._strings(self.high):
+            tokens = self.regex.findall(string)
+            if len(tokens) != len(key.findall(string)):
+                raise _NotDataOnly("the event data is changed by a filter")
+            found.update(int(index) for index in tokens)
+        if found != set(range(len(self.values))):
+            raise _NotDataOnly("the event data is changed by a filter or dropped")
+
+    def _resolve(self, event, path, default):
+        value = event
+        try:
+            for key in path:
+                value = value[key]
+        except (KeyError, IndexError, TypeError):
+            if default is None:
+                raise KeyError(path)
+            return default
+        return value
+
+    def _substitute(self, obj, values):
+        if isinstance(obj, dict):
+            return {
+                self._substitute(key, values): self._substitute(val, values)
+                for key, val in obj.items()
+            }
+        if isinstance(obj, list):
+            return [self._substitute(item, values) for item in obj]
+        if isinstance(obj, str) and self.prefix in obj:
+            match = self.regex.fullmatch(obj)
+            if match:
+                # The value keeps its type, instead of being rendered as text
+                # and parsed again
+                return values[int(match.group(1))]
+            return self.regex.sub(lambda m: str(values[int(m.group(1))]), obj)
+        return obj
+
+    def render(self, tag, data):
+        """
+        Return the rendered data with the values of the event. Raises KeyError
+        if the event lacks a value the reactor SLS uses.
+        """
+        event = {"tag": tag, "data": data}
+        values = [self._resolve(event, path, default) for path, default in self.values]
+        return self._substitute(self.high, values)
+
 
 class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
     """
@@ -47,6 +250,10 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         salt.state.Compiler.__init__(self, opts, self.minion.rend)
         self.is_leader = True
+        self._react_map_version_seen = None
+        self._list_reactors = None
+        # path -> _ReactionPlan of the data only reactor SLS
+        self._plans = {}
 
     def render_reaction(self, glob_ref, tag, data):
         """
@@ -54,6 +261,7 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
         the data structure
         """
         react = {}
+        orig_ref = glob_ref
 
         if glob_ref.startswith("salt://"):
             glob_ref = self.minion.functions["cp.cache_file"](glob_ref) or ""
@@ -64,9 +272,18 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                 glob_ref,
                 tag,
             )
+        data_only = any(
+            fnmatch.fnmatch(ref, pattern)
+            for ref in (glob_ref, orig_ref)
+            for pattern in self.opts.get("reactor_data_only", ())
+        )
         for fn_ in globbed_ref:
             try:
-                res = self.render_template(fn_, tag=tag, data=data)
+                res = None
+                if data_only:
+                    res = self.render_data_only(fn_, tag, data)
+                if res is None:
+                    res = self.render_template(fn_, tag=tag, data=data)
 
                 # for #20841, inject the sls name here since verify_high()
                 # assumes it exists in case there are any errors
@@ -78,38 +295,121 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                 log.exception('Failed to render "%s": ', fn_)
         return react
 
-    def list_reactors(self, tag):
+    def render_data_only(self, fn_, tag, data):
         """
-        Take in the tag from an event and return a list of the reactors to
-        process
+        Return the data of a reactor SLS whose rendering only depends on the
+        values of the event it interpolates, or None if it has to be rendered
+        for the event
+
+        The reactor SLS is rendered once, with placeholders in place of the
+        tag and of the event data, and the values of each event are then put
+        in place of the placeholders in the rendered data.
+        """
+        mtime = os.path.getmtime(fn_)
+        plan = self._plans.get(fn_)
+        if plan is None or plan.mtime != mtime:
+            plan = _ReactionPlan(mtime)
+            try:
+                with salt.utils.files.fopen(fn_, "r") as fp_:
+                    _check_data_only(self.opts, fp_.read())
+                plan.high = self.render_template(
+                    fn_,
+                    tag=_Placeholder(plan, ("tag",)),
+                    data=_Placeholder(plan, ("data",)),
+                )
+                plan.verify()
+            except Exception as exc:  # pylint: disable=broad-except
+                # The renderers wrap the exceptions raised while rendering
+                log.warning(
+                    "Reactor SLS %s is rendered for every event, as it does "
+                    "not only interpolate the event data: %s",
+                    fn_,
+                    exc,
+                )
+                plan.high = None
+            self._plans[fn_] = plan
+        if plan.high is None:
+            return None
+        try:
+            return plan.render(tag, data)
+        except KeyError as exc:
+            log.debug("Event %s lacks %s used by %s", tag, exc, fn_)
+            return None
+
+    def _react_map_version(self):
+        """
+        Return what changes with the reactor map: the path and modification
+        time of its file, or a copy of it
         """
-        log.debug("Gathering reactors for tag %s", tag)
-        reactors = []
         if isinstance(self.opts["reactor"], str):
             try:
-                with salt.utils.files.fopen(self.opts["reactor"]) as fp_:
-                    react_map = salt.utils.yaml.safe_load(fp_)
+                return self.opts["reactor"], os.path.getmtime(self.opts["reactor"])
             except OSError:
-                log.error('Failed to read reactor map: "%s"', self.opts["reactor"])
-            except Exception:  # pylint: disable=broad-except
-                log.error(
-                    'Failed to parse YAML in reactor map: "%s"', self.opts["reactor"]
-                )
-        else:
-            react_map = self.opts["reactor"]
-        for ropt in react_map:
+                return None
+        return copy.deepcopy(self.opts["reactor"])
+
+    def _compile_react_map(self, react_map):
+        """
+        Compile the tag globs of the reactor map, and return a function
+        returning the reactors of a tag, which remembers the most recent tags
+        """
+        matchers = []
+        for ropt in react_map or ():
             if not isinstance(ropt, dict):
                 continue
             if len(ropt) != 1:
                 continue
             key = next(iter(ropt.keys()))
             val = ropt[key]
-            if fnmatch.fnmatch(tag, key):
-                if isinstance(val, str):
-                    reactors.append(val)
-                elif isinstance(val, list):
+            if isinstance(val, str):
+                val = [val]
+            elif not isinstance(val, list):
+                continue
+            matchers.append(
+                (re.compile(fnmatch.translate(os.path.normcase(key))).match, val)
+            )
+
+        @functools.lru_cache(maxsize=TAG_CACHE_SIZE)
+        def list_reactors(tag):
+            tag = os.path.normcase(tag)
+            reactors = []
+            for match, val in matchers:
+                if match(tag):
                     reactors.extend(val)
-        return reactors
+            return tuple(reactors)
+
+        return list_reactors
+
+    def list_reactors(self, tag):
+        """
+        Take in the tag from an event and return a list of the reactors to
+        process
+        """
+        log.debug("Gathering reactors for tag %s", tag)
+        version = self._react_map_version()
+        if (
+            self._list_reactors is None
+            or version is None
+            or version != self._react_map_version_seen
+        ):
+            # The globs are only compiled again when the reactor map changed
+            react_map = []
+            if isinstance(self.opts["reactor"], str):
+                try:
+                    with salt.utils.files.fopen(self.opts["reactor"]) as fp_:
+                        react_map = salt.utils.yaml.safe_load(fp_)
+                except OSError:
+                    log.error('Failed to read reactor map: "%s"', self.opts["reactor"])
+                except Exception:  # pylint: disable=broad-except
+                    log.error(
+                        'Failed to parse YAML in reactor map: "%s"',
+                        self.opts["reactor"],
+                    )
+            else:
+                react_map = self.opts["reactor"]
+            self._list_reactors = self._compile_react_map(react_map)
+            self._react_map_version_seen = version
+        return list(self._list_reactors(tag))
 
     def list_all(self):
         """
@@ -204,12 +504,12 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
         self.resolve_aliases(chunks)
         return chunks
 
-    def call_reactions(self, chunks):
+    def call_reactions(self, chunks, tag=None):
         """
         Execute the reaction state
         """
         for chunk in chunks:
-            self.wrap.run(chunk)
+            self.wrap.run(chunk, tag=tag)
 
     def run(self):
         """
@@ -273,6 +573,11 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                         {"reactors": self.list_all()},
                         "salt/reactors/manage/list-results",
                     )
+                elif data["tag"].endswith("salt/reactors/manage/stats"):
+                    event.fire_event(
+                        {"stats": self.wrap.get_stats()},
+                        "salt/reactors/manage/stats-results",
+                    )
                 else:
                     # do not handle any reactions if not leader in cluster
                     if not self.is_leader:
@@ -281,14 +586,271 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                         reactors = self.list_reactors(data["tag"])
                         if not reactors:
                             continue
+                        self.wrap.pool.stats.incr("events")
                         chunks = self.reactions(data["tag"], data["data"], reactors)
                         if chunks:
                             try:
-                                self.call_reactions(chunks)
+                                self.call_reactions(chunks, tag=data["tag"])
                             except SystemExit:
                                 log.warning("Exit ignored by reactor")
 
 
+class _Histogram:
+    """
+    A histogram of latencies, in the LATENCY_BUCKETS
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        """
+        Return the histogram, with the cumulative count of each bucket like
+        Prometheus histograms
+        """
+        buckets = {}
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.counts):
+            total += count
+            buckets[str(bound)] = total
+        return {
+            "count": total,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "buckets": buckets,
+        }
+
+
+class ReactorStats:
+    """
+    The counters and the latency histograms of the reactions, which are
+    updated by the reactor and by its workers
+    """
+
+    COUNTERS = (
+        "events",
+        "reactions",
+        "queued",
+        "coalesced",
+        "dropped",
+        "dropped_oldest",
+        "blocked",
+        "failed",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.blocked_seconds = 0.0
+        self.queue_depth_max = 0
+        # reaction -> {"wait": _Histogram, "run": _Histogram}
+        self.latencies = {}
+
+    def incr(self, counter, count=1):
+        with self._lock:
+            self.counters[counter] += count
+
+    def blocked(self, seconds):
+        with self._lock:
+            self.counters["blocked"] += 1
+            self.blocked_seconds += seconds
+
+    def queue_depth(self, depth):
+        with self._lock:
+            self.queue_depth_max = max(self.queue_depth_max, depth)
+
+    def observe(self, reaction, run, wait=None):
+        """
+        Record how long a reaction waited in the queue of the workers, and how
+        long it ran
+        """
+        with self._lock:
+            histograms = self.latencies.setdefault(reaction, {})
+            if wait is not None:
+                histograms.setdefault("wait", _Histogram()).observe(wait)
+            histograms.setdefault("run", _Histogram()).observe(run)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "uptime": round(time.time() - self.started, 3),
+                "counters": dict(self.counters),
+                "blocked_seconds": round(self.blocked_seconds, 6),
+                "queue_depth_max": self.queue_depth_max,
+                "reactions": {
+                    reaction: {
+                        kind: histogram.to_dict()
+                        for kind, histogram in histograms.items()
+                    }
+                    for reaction, histograms in self.latencies.items()
+                },
+            }
+
+
+class _Job:
+    """
+    A reaction waiting in the queue of the workers
+    """
+
+    __slots__ = ("func", "args", "kwargs", "name", "key", "queued")
+
+    def __init__(self, func, args, kwargs, name, key):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.name = name
+        self.key = key
+        self.queued = time.monotonic()
+
+
+class ReactorPool(salt.utils.process.ThreadPool):
+    """
+    The workers running the runner and wheel reactions, which apply an
+    overflow policy when their queue is full, and record the latencies of the
+    reactions in a ReactorStats
+
+    The overflow policies are:
+
+    drop
+        The new reaction is dropped
+
+    drop_oldest
+        The reaction which waited the longest in the queue is dropped to make
+        room for the new reaction
+
+    block
+        The reactor waits for room in the queue, and stops reading events
+        meanwhile
+
+    coalesce
+        A reaction fired with a key replaces the arguments of the reaction of
+        the same key which is still waiting in the queue, instead of being
+        queued. Reactions which cannot be coalesced are dropped when the queue
+        is full.
+    """
+
+    def __init__(self, num_threads=None, queue_size=0, overflow="drop", stats=None):
+        if overflow not in OVERFLOW_POLICIES:
+            log.warning(
+                "Unknown reactor overflow policy '%s', reactions are dropped "
+                "when the queue is full",
+                overflow,
+            )
+            overflow = "drop"
+        self.overflow = overflow
+        self.stats = stats or ReactorStats()
+        self._lock = threading.Lock()
+        # key -> _Job waiting in the queue, for the coalesce policy
+        self._pending = {}
+        super().__init__(num_threads, queue_size=queue_size)
+
+    def fire_async(self, func, args=None, kwargs=None, name=None, key=None):
+        """
+        Queue a reaction, return False if it was dropped
+        """
+        if args is None:
+            args = []
+        if kwargs is None:
+            kwargs = {}
+        if self.overflow != "coalesce":
+            key = None
+        job = _Job(func, args, kwargs, name, key)
+        if key is not None:
+            with self._lock:
+                pending = self._pending.get(key)
+                if pending is not None:
+                    pending.args = args
+                    pending.kwargs = kwargs
+                    self.stats.incr("coalesced")
+                    return True
+                self._pending[key] = job
+        try:
+            self._job_queue.put_nowait(job)
+        except queue.Full:
+            if not self._overflow(job):
+                self._forget(job)
+                self.stats.incr("dropped")
+                return False
+        self.stats.incr("queued")
+        self.stats.queue_depth(self._job_queue.qsize())
+        return True
+
+    def _overflow(self, job):
+        """
+        Apply the overflow policy to a job which did not fit in the full queue,
+        return whether it was queued
+        """
+        if self.overflow == "block":
+            start = time.monotonic()
+            self._job_queue.put(job)
+            self.stats.blocked(time.monotonic() - start)
+            return True
+        if self.overflow == "drop_oldest":
+            while True:
+                try:
+                    oldest = self._job_queue.get_nowait()
+                    self._job_queue.task_done()
+                except queue.Empty:
+                    pass
+                else:
+                    self._forget(oldest)
+                    self.stats.incr("dropped_oldest")
+                    log.warning(
+                        "Reactor queue is full, dropped the oldest reaction %s",
+                        oldest.name,
+                    )
+                try:
+                    self._job_queue.put_nowait(job)
+                    return True
+                except queue.Full:
+                    # A reaction was queued by the workers meanwhile
+                    continue
+        return False
+
+    def _forget(self, job):
+        if job.key is not None:
+            with self._lock:
+                if self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+
+    def _thread_target(self):
+        while True:
+            # 1s timeout so that if the parent dies this thread will die within 1s
+            try:
+                try:
+                    job = self._job_queue.get(timeout=1)
+                    self._job_queue.task_done()  # Mark the task as done once we get it
+                except queue.Empty:
+                    continue
+            except AttributeError:
+                # During shutdown, `queue` may not have an `Empty` atttribute
+                continue
+            # The job cannot be coalesced anymore once it is out of the queue,
+            # so its arguments are final
+            self._forget(job)
+            start = time.monotonic()
+            try:
+                log.debug(
+                    "ReactorPool executing func: %s with args=%s kwargs=%s",
+                    job.func,
+                    job.args,
+                    job.kwargs,
+                )
+                job.func(*job.args, **job.kwargs)
+            except Exception as err:  # pylint: disable=broad-except
+                self.stats.incr("failed")
+                log.debug(err, exc_info=True)
+            self.stats.observe(job.name, time.monotonic() - start, start - job.queued)
+
+
 class ReactWrap:
     """
     Wrapper that executes low data for the Reactor System
@@ -312,11 +874,27 @@ class ReactWrap:
                 opts["reactor_refresh_interval"]
             )
 
-        self.pool = salt.utils.process.ThreadPool(
+        self.pool = ReactorPool(
             self.opts["reactor_worker_threads"],  # number of workers for runner/wheel
             queue_size=self.opts["reactor_worker_hwm"],  # queue size for those workers
+            overflow=self.opts.get("reactor_worker_overflow", "drop"),
         )
 
+    def get_stats(self):
+        """
+        Return the statistics of the reactions and of the queue of the workers
+        """
+        ret = self.pool.stats.to_dict()
+        ret.update(
+            {
+                "overflow": self.pool.overflow,
+                "workers": self.pool.num_threads,
+                "queue_size": self.pool._job_queue.maxsize,
+                "queue_depth": self.pool._job_queue.qsize(),
+            }
+        )
+        return ret
+
     def populate_client_cache(self, low):
         """
         Populate the client cache with an instance of the specified type
@@ -346,11 +924,16 @@ class ReactWrap:
                 )
         # pylint: enable=unsupported-membership-test,unsupported-assignment-operation
 
-    def run(self, low):
+    def run(self, low, tag=None):
         """
         Execute a reaction by invoking the proper wrapper func
         """
         self.populate_client_cache(low)
+        self.pool.stats.incr("reactions")
+        # The latencies are recorded by reaction function and reactor SLS
+        name = "{}.{}".format(low["state"], low["fun"])
+        if low.get("__sls__"):
+            name = "{}:{}".format(low["__sls__"], name)
         try:
             l_fun = getattr(self, low["state"])
         except AttributeError:
@@ -370,6 +953,12 @@ class ReactWrap:
                 kwargs["__state__"] = kwargs.pop("state")
                 # NOTE: if any additional keys are added here, they will also
                 # need to be added to filter_kwargs()
+                # The same reaction to the same tag can be coalesced while it
+                # waits for a worker
+                kwargs["__reaction__"] = {
+                    "name": name,
+                    "key": (tag, low["__id__"], name) if tag is not None else None,
+                }
 
             if "args" in kwargs:
                 # New configuration
@@ -445,14 +1034,18 @@ class ReactWrap:
             # and kwargs['kwarg'] contain the positional and keyword arguments
             # that will be passed to the client interface to execute the
             # desired runner/wheel/remote-exec/etc. function.
+            start = time.monotonic()
             ret = l_fun(*args, **kwargs)
+            if low["state"] not in ("runner", "wheel"):
+                # The other reactions run in the reactor, and are not queued
+                self.pool.stats.observe(name, time.monotonic() - start)
 
             if ret is False:
                 log.error(
                     "Reactor '%s' failed  to execute %s '%s': "
-                    "TaskPool queue is full!"
-                    "Consider tuning reactor_worker_threads and/or"
-                    " reactor_worker_hwm",
+                    "TaskPool queue is full! "
+                    "Consider tuning reactor_worker_threads, "
+                    "reactor_worker_hwm and/or reactor_worker_overflow",
                     low["__id__"],
                     low["state"],
                     low["fun"],
@@ -469,17 +1062,21 @@ class ReactWrap:
                 exc_info=True,
             )
 
-    def runner(self, fun, **kwargs):
+    def runner(self, fun, __reaction__=None, **kwargs):
         """
         Wrap RunnerClient for executing :ref:`runner modules <all-salt.runners>`
         """
-        return self.pool.fire_async(self.client_cache["runner"].low, args=(fun, kwargs))
+        return self.pool.fire_async(
+            self.client_cache["runner"].low, args=(fun, kwargs), **(__reaction__ or {})
+        )
 
-    def wheel(self, fun, **kwargs):
+    def wheel(self, fun, __reaction__=None, **kwargs):
         """
         Wrap Wheel to enable executing :ref:`wheel modules <all-salt.wheel>`
         """
-        return self.pool.fire_async(self.client_cache["wheel"].low, args=(fun, kwargs))
+        return self.pool.fire_async(
+            self.client_cache["wheel"].low, args=(fun, kwargs), **(__reaction__ or {})
+        )
 
     def local(self, fun, tgt, **kwargs):
         """
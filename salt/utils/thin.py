@@ -5,6 +5,7 @@ Generate the salt thin tarball from the installed python files
 import contextlib
 import contextvars as py_contextvars
 import copy
+import gzip
 import importlib.util
 import inspect
 import io
@@ -942,6 +943,97 @@ def thin_sum(cachedir, form="sha1"):
     return code_checksum, salt.utils.hashutils.get_hash(thintar, form)
 
 
+def _thin_layer(name):
+    """
+    Return the layer of the thin a member of the thin tarball belongs to
+    """
+    parts = name.split("/")
+    if len(parts) == 1:
+        # The version files, salt-call and code-checksum
+        return "meta"
+    if parts[0] not in ("pyall", f"py{sys.version_info.major}"):
+        # The alternative Python versions of ssh_ext_alternatives
+        return "deps"
+    if parts[1] == "salt":
+        return "salt"
+    if parts[1] == "saltext" or parts[1].endswith(".dist-info"):
+        return "saltexts"
+    return "deps"
+
+
+def gen_thin_layers(cachedir, thin_checksum=None, form="sha1"):
+    """
+    Split the thin tarball in layers: the Python dependencies, Salt, the Salt
+    extensions and the metadata of the thin. Each layer is a tarball named
+    after its checksum, and only changes when the files in it change, so the
+    layers a target already has do not need to be deployed again.
+
+    The layers are cached until the thin tarball changes.
+
+    :return: A list of ``(layer, checksum, path)`` tuples
+    """
+    thintar = gen_thin(cachedir)
+    if thin_checksum is None:
+        thin_checksum = salt.utils.hashutils.get_hash(thintar, form)
+    layersdir = os.path.join(cachedir, "thin", "layers")
+    manifest = os.path.join(layersdir, "manifest.json")
+    try:
+        with salt.utils.files.fopen(manifest, "r") as fp_:
+            cached = salt.utils.json.load(fp_)
+        if cached["thin"] == thin_checksum and all(
+            os.path.isfile(path) for _, _, path in cached["layers"]
+        ):
+            return [tuple(layer) for layer in cached["layers"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    os.makedirs(layersdir, exist_ok=True)
+    tmp_paths = {}
+    writers = {}
+    try:
+        with tarfile.open(thintar, "r:gz") as src:
+            for member in src:
+                layer = _thin_layer(member.name)
+                if layer not in writers:
+                    tmp_paths[layer] = _get_thintar_prefix(
+                        os.path.join(layersdir, f"{layer}.tgz")
+                    )
+                    # No file name nor timestamp in the gzip header, so that
+                    # the checksum of the layer only depends on its files
+                    fp_ = salt.utils.files.fopen(tmp_paths[layer], "wb")
+                    gzf = gzip.GzipFile("", "wb", fileobj=fp_, mtime=0)
+                    writers[layer] = (fp_, gzf, tarfile.open(fileobj=gzf, mode="w"))
+                fileobj = src.extractfile(member) if member.isfile() else None
+                writers[layer][2].addfile(member, fileobj)
+    finally:
+        for fp_, gzf, tfp in writers.values():
+            tfp.close()
+            gzf.close()
+            fp_.close()
+
+    layers = []
+    for layer in sorted(tmp_paths):
+        checksum = salt.utils.hashutils.get_hash(tmp_paths[layer], form)
+        path = os.path.join(layersdir, f"{checksum}.tgz")
+        os.replace(tmp_paths[layer], path)
+        layers.append((layer, checksum, path))
+
+    # Drop the layers of the previous thin tarballs
+    keep = {os.path.basename(path) for _, _, path in layers}
+    for fname in os.listdir(layersdir):
+        if fname.endswith(".tgz") and fname not in keep:
+            try:
+                os.remove(os.path.join(layersdir, fname))
+            except OSError:
+                pass
+
+    tmp_manifest = _get_thintar_prefix(manifest)
+    with salt.utils.files.fopen(tmp_manifest, "w") as fp_:
+        salt.utils.json.dump({"thin": thin_checksum, "layers": layers}, fp_)
+    os.replace(tmp_manifest, manifest)
+    return layers
+
+
 def gen_min(
     cachedir,
     extra_mods="",
@@ -10,34 +10,37 @@ import salt.utils.stringutils
 
 # prefer C bindings over python when available
 BaseLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+HAS_LIBYAML = BaseLoader is not yaml.SafeLoader
 
 
-__all__ = ["SaltYamlSafeLoader", "load", "safe_load"]
+__all__ = ["SaltYamlSafeLoader", "SaltYamlPySafeLoader", "load", "safe_load"]
 
 
 # with code integrated from https://gist.github.com/844388
-class SaltYamlSafeLoader(BaseLoader):
+class _SaltYamlLoaderMixin:
     """
-    Create a custom YAML loader that uses the custom constructor. This allows
-    for the YAML loading defaults to be manipulated based on needs within salt
-    to make things like sls file more intuitive.
+    The Salt specific constructors, shared by the libyaml and the pure Python
+    flavours of the loader.
     """
 
     def __init__(self, stream, dictclass=dict):
         super().__init__(stream)
         if dictclass is not dict:
-            # then assume ordered dict and use it for both !map and !omap
-            self.add_constructor("tag:yaml.org,2002:map", type(self).construct_yaml_map)
-            self.add_constructor(
-                "tag:yaml.org,2002:omap", type(self).construct_yaml_map
-            )
-        self.add_constructor("tag:yaml.org,2002:str", type(self).construct_yaml_str)
-        self.add_constructor(
-            "tag:yaml.org,2002:python/unicode", type(self).construct_unicode
-        )
-        self.add_constructor("tag:yaml.org,2002:timestamp", type(self).construct_scalar)
+            # then assume ordered dict and use it for both !map and !omap.
+            # This is set on the instance, registering the constructors on the
+            # class would leak into loaders created later with dictclass=dict.
+            self.yaml_constructors = type(self)._ordered_constructors()
         self.dictclass = dictclass
 
+    @classmethod
+    def _ordered_constructors(cls):
+        if "_ordered_yaml_constructors" not in cls.__dict__:
+            constructors = cls.yaml_constructors.copy()
+            constructors["tag:yaml.org,2002:map"] = cls.construct_yaml_map
+            constructors["tag:yaml.org,2002:omap"] = cls.construct_yaml_map
+            cls._ordered_yaml_constructors = constructors
+        return cls._ordered_yaml_constructors
+
     def construct_yaml_map(self, node):
         data = self.dictclass()
         yield data
@@ -154,6 +157,33 @@ class SaltYamlSafeLoader(BaseLoader):
             node.value = mergeable_items + node.value
 
 
+class SaltYamlSafeLoader(_SaltYamlLoaderMixin, BaseLoader):
+    """
+    Create a custom YAML loader that uses the custom constructor. This allows
+    for the YAML loading defaults to be manipulated based on needs within salt
+    to make things like sls file more intuitive.
+
+    The scanner and parser come from libyaml when PyYAML was built against
+    it, see :py:data:`HAS_LIBYAML`.
+    """
+
+
+class SaltYamlPySafeLoader(_SaltYamlLoaderMixin, yaml.SafeLoader):
+    """
+    The same as :py:class:`SaltYamlSafeLoader` but always built on the pure
+    Python PyYAML parser.
+    """
+
+
+for _loader in (SaltYamlSafeLoader, SaltYamlPySafeLoader):
+    _loader.add_constructor("tag:yaml.org,2002:str", _loader.construct_yaml_str)
+    _loader.add_constructor(
+        "tag:yaml.org,2002:python/unicode", _loader.construct_unicode
+    )
+    _loader.add_constructor("tag:yaml.org,2002:timestamp", _loader.construct_scalar)
+del _loader
+
+
 def load(stream, Loader=SaltYamlSafeLoader):
     return yaml.load(stream, Loader=Loader)
 
@@ -2,6 +2,8 @@
 Unit Tests for the salt.cli.batch module
 """
 
+import time
+
 import pytest
 
 from salt.cli.batch import Batch
@@ -135,3 +137,85 @@ def test_return_value_in_run_for_return(batch):
         verbose=False,
         gather_job_timeout=5,
     )
+
+
+class StreamMaster:
+    """
+    Answer the jobs of a streaming batch run with return events, the way the
+    master and the minions would
+    """
+
+    def __init__(self, minions, silent=(), retcodes=None):
+        self.minions = minions
+        self.silent = silent
+        self.retcodes = retcodes or {}
+        self.jobs = []
+        self.events = []
+
+    def gather_minions(self, tgt, tgt_type):
+        return list(self.minions)
+
+    def run_job(self, tgt, fun, arg, tgt_type, timeout, listen, **kwargs):
+        jid = str(len(self.jobs))
+        self.jobs.append((list(tgt), fun, arg))
+        for minion in tgt:
+            if minion in self.silent:
+                continue
+            self.events.append(
+                {
+                    "tag": f"salt/job/{jid}/ret/{minion}",
+                    "data": {
+                        "id": minion,
+                        "jid": jid,
+                        "return": True,
+                        "retcode": self.retcodes.get(minion, 0),
+                    },
+                }
+            )
+        return {"jid": jid, "minions": list(tgt)}
+
+    def get_event(self, wait, **kwargs):
+        if self.events:
+            return self.events.pop(0)
+        time.sleep(wait)
+        return None
+
+
+def _stream_batch(batch, master, **opts):
+    batch.opts = {
+        "batch": "2",
+        "batch_stream": True,
+        "tgt": "*",
+        "fun": "state.apply",
+        "arg": [],
+        "timeout": 0.1,
+        "gather_job_timeout": 0.1,
+    }
+    batch.opts.update(opts)
+    batch.local.gather_minions = master.gather_minions
+    batch.local.run_job = master.run_job
+    batch.local.event.get_event = master.get_event
+    return list(batch.run())
+
+
+def test_run_stream(batch):
+    master = StreamMaster(["a", "b", "c", "d", "e"], silent=["c"])
+    ret = _stream_batch(batch, master)
+    assert ret == [({minion: True}, 0) for minion in ("a", "b", "d", "e")]
+    assert all(fun != "test.ping" for _, fun, _ in master.jobs)
+    assert all(len(minions) <= 2 for minions, _, _ in master.jobs)
+    # The minion which did not return was asked whether it still runs the job
+    assert (["c"], "saltutil.find_job", ["1"]) in master.jobs
+
+
+def test_run_stream_resume(batch, tmp_path):
+    state_file = tmp_path / "batch.state"
+    master = StreamMaster(["a", "b", "c", "d"], retcodes={"b": 1})
+    ret = _stream_batch(batch, master, failhard=True, batch_state_file=str(state_file))
+    assert ret == [({"a": True}, 0), ({"b": True}, 1)]
+    assert state_file.read_text().splitlines()[1:] == ["a", "b"]
+
+    master = StreamMaster(["a", "b", "c", "d"])
+    ret = _stream_batch(batch, master, batch_state_file=str(state_file))
+    assert ret == [({"c": True}, 0), ({"d": True}, 0)]
+    assert not state_file.exists()
@@ -175,3 +175,32 @@ def test_scp_command_execution_uses_custom_path():
         args, _ = mock_run_cmd.call_args
         assert "/custom/scp" in args[0]
         assert "source_file.txt example.com:/path/dest_file.txt" in args[0]
+
+
+@pytest.mark.parametrize(
+    "ssh_version,control_name", [((8, 9), "%C"), ((6, 6), "%r@%h:%p")]
+)
+def test_ssh_command_control_persist(tmp_path, ssh_version, control_name):
+    options = {
+        "_ssh_version": ssh_version,
+        "cachedir": str(tmp_path),
+        "ssh_control_persist": 600,
+    }
+    _shell = shell.Shell(opts=options, host="example.com", priv="/tmp/key")
+    cmd_string = _shell._cmd_str("ls -la")
+    control_path = tmp_path / "ssh_control" / control_name
+    assert "-o ControlMaster=auto" in cmd_string
+    assert f"-o ControlPath={control_path}" in cmd_string
+    assert "-o ControlPersist=600" in cmd_string
+    assert cmd_string.endswith(" ls -la")
+    assert (tmp_path / "ssh_control").is_dir()
+
+    # scp shares the master connection
+    with patch.object(
+        _shell, "_run_cmd", return_value=(None, None, None)
+    ) as mock_run_cmd:
+        _shell.send("source_file.txt", "/path/dest_file.txt")
+        assert f"-o ControlPath={control_path}" in mock_run_cmd.call_args[0][0]
+
+    options["ssh_control_persist"] = 0
+    assert "Control" not in _shell._cmd_str("ls -la")
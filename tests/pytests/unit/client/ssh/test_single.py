@@ -1,3 +1,4 @@
+import base64
 import importlib
 import logging
 import re
@@ -728,6 +729,27 @@ def test_ssh_single__cmd_str(opts):
     assert expected in cmd
 
 
+@pytest.mark.skip_on_windows(reason="Windows does not support salt-ssh")
+def test_ssh_single__cmd_str_options(opts):
+    """
+    The options of the target are injected in the python shim
+    """
+    opts["thin_layers"] = True
+    layers = [("salt", "abc", "/cache/thin/layers/abc.tgz")]
+    single = ssh.Single(opts, ["test.ping"], "minion", "minion", sudo=False)
+    with patch(
+        "salt.utils.thin.thin_sum", MagicMock(return_value=("digest", "thinsum"))
+    ), patch("salt.utils.thin.gen_thin_layers", MagicMock(return_value=layers)):
+        cmd = single._cmd_str()
+    py_code = base64.b64decode(
+        re.search(r'b64decode\("""(.+?)"""\)', cmd, re.S).group(1)
+    ).decode("utf-8")
+    assert "OPTIONS.checksum = 'thinsum'" in py_code
+    assert "OPTIONS.layers = [('salt', 'abc')]" in py_code
+    assert "ARGS = ['test.ping']" in py_code
+    assert single.layers == {"abc": "/cache/thin/layers/abc.tgz"}
+
+
 @pytest.mark.slow_test
 @pytest.mark.skip_on_windows(reason="Windows does not support salt-ssh")
 @pytest.mark.skip_if_binaries_missing("ssh", check_all=True)
@@ -1,3 +1,5 @@
+import time
+
 import pytest
 
 import salt.client.ssh.client
@@ -512,3 +514,41 @@ def test_handle_routine_single_run_invalid_retcode(opts, target, caplog):
         )
     )
     assert "Got an invalid retcode for host 'localhost': 'None'" in caplog.text
+
+
+def test_handle_ssh_thread_fanout(opts, target):
+    """
+    With ssh_fanout set to thread, the targets are run in threads and their
+    returns are yielded as they complete.
+    """
+    delays = {"slow": 0.5, "fast": 0, "broken": 0.1}
+    single_class = ssh.Single
+
+    def _single(opts, argv, id_, **kwargs):
+        host = id_
+        single = MagicMock(spec=single_class)
+        single.id = host
+
+        def _run():
+            time.sleep(delays[host])
+            if host == "broken":
+                raise OSError("Too many open files")
+            return f'{{"local": {{"retcode": 0, "return": "{host}"}}}}', "", 0
+
+        single.run.side_effect = _run
+        return single
+
+    opts["tgt"] = "*"
+    opts["ssh_fanout"] = "thread"
+    with patch("salt.roster.get_roster_file", MagicMock(return_value="")), patch(
+        "salt.client.ssh.Single", side_effect=_single
+    ), patch("salt.client.ssh.Process") as process:
+        client = ssh.SSH(opts)
+        client.targets = {host: dict(target) for host in delays}
+        rets = list(client.handle_ssh())
+    process.assert_not_called()
+    assert rets[0] == ({"fast": {"retcode": 0, "return": "fast"}}, 0)
+    assert rets[2] == ({"slow": {"retcode": 0, "return": "slow"}}, 0)
+    (broken,), retcode = rets[1][0].items(), rets[1][1]
+    assert broken[0] == "broken"
+    assert retcode == 1
@@ -2,7 +2,14 @@
     :codeauthor: :email:`saltybob <bbaker@saltstack.com`
 """
 
+import os
+import time
+
+import pytest
+
+import salt.client.ssh.state
 from salt.client.ssh.wrapper import state
+from tests.support.mock import MagicMock
 
 
 def test_parse_mods():
@@ -14,3 +21,122 @@ def test_parse_mods():
 
     actual = state._parse_mods(mods)
     assert expected == actual
+
+
+@pytest.fixture
+def cache_opts(tmp_path):
+    return {
+        "cachedir": str(tmp_path),
+        "thin_dir": "/tmp/.salt",
+        "ssh_state_cache": 60,
+        "ssh_state_cache_grains": ["os"],
+        "id": "web1",
+        "grains": {"id": "web1", "os": "Debian"},
+    }
+
+
+@pytest.fixture
+def file_client():
+    files = {"top.sls": "1", "web.sls": "2"}
+    file_client = MagicMock()
+    file_client.envs.return_value = ["base"]
+    file_client.file_list.side_effect = lambda saltenv: sorted(files)
+    file_client.hash_file.side_effect = lambda path, saltenv: {
+        "hsum": files[path[len("salt://") :]]
+    }
+    file_client.files = files
+    return file_client
+
+
+def test_state_cache_key(cache_opts, file_client):
+    key = salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "highstate"
+    )
+    sls_key = salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "sls", ["web"]
+    )
+    # Hosts which only differ by the grains the states do not depend on share
+    # the cache, except for the highstate which depends on the top file
+    # matches of the host
+    cache_opts["id"] = "web2"
+    cache_opts["grains"] = {"id": "web2", "os": "Debian"}
+    assert sls_key == salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "sls", ["web"]
+    )
+    assert key != salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "highstate"
+    )
+    cache_opts["id"] = "web1"
+    cache_opts["grains"]["os"] = "RedHat"
+    assert key != salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "highstate"
+    )
+    cache_opts["grains"]["os"] = "Debian"
+    assert key != salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "db"}, {}, "highstate"
+    )
+    file_client.files["web.sls"] = "3"
+    assert key != salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "highstate"
+    )
+
+    cache_opts["ssh_state_cache"] = 0
+    assert (
+        salt.client.ssh.state.state_cache_key(
+            cache_opts, file_client, {"role": "web"}, {}, "highstate"
+        )
+        is None
+    )
+
+
+def test_state_cache_key_fileserver(cache_opts, file_client):
+    key = salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "highstate"
+    )
+    # The fingerprint computed once per run is used instead of hashing the
+    # files again for each target
+    cache_opts["_ssh_state_cache_fileserver"] = salt.client.ssh.fileserver_fingerprint(
+        file_client
+    )
+    file_client.reset_mock()
+    assert key == salt.client.ssh.state.state_cache_key(
+        cache_opts, file_client, {"role": "web"}, {}, "highstate"
+    )
+    file_client.file_list.assert_not_called()
+    file_client.hash_file.assert_not_called()
+
+
+def test_cache_trans_tar(cache_opts, tmp_path):
+    trans_tar = tmp_path / "trans.tgz"
+    trans_tar.write_bytes(b"state")
+    assert salt.client.ssh.state.cached_trans_tar(cache_opts, "key") is None
+    path = salt.client.ssh.state.cache_trans_tar(cache_opts, "key", str(trans_tar))
+    assert not trans_tar.exists()
+    assert salt.client.ssh.state.cached_trans_tar(cache_opts, "key") == path
+
+    # Expired
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    assert salt.client.ssh.state.cached_trans_tar(cache_opts, "key") is None
+
+
+@pytest.mark.parametrize("held", [True, False])
+def test_send_trans_tar(cache_opts, held):
+    single = MagicMock(opts=cache_opts, winrm=False)
+    single.shell.exec_cmd.return_value = ("", "", 0 if held else 1)
+    path = salt.client.ssh.state.trans_tar_path(cache_opts, "abc")
+    assert path == "/tmp/.salt/salt_state_abc.tgz"
+    salt.client.ssh.state.send_trans_tar(single, "/cache/abc.tgz", path)
+    if held:
+        single.shell.send.assert_not_called()
+    else:
+        single.shell.send.assert_called_once_with("/cache/abc.tgz", path)
+
+    # Without the cache, the tarball is always sent
+    cache_opts["ssh_state_cache"] = 0
+    single = MagicMock(opts=cache_opts, winrm=False)
+    path = salt.client.ssh.state.trans_tar_path(cache_opts, "abc")
+    salt.client.ssh.state.send_trans_tar(single, "/tmp/trans.tgz", path)
+    single.shell.exec_cmd.assert_not_called()
+    single.shell.send.assert_called_once_with(
+        "/tmp/trans.tgz", "/tmp/.salt/salt_state.tgz"
+    )
@@ -0,0 +1,102 @@
+"""
+Tests for salt.client.asynchronous
+"""
+
+import asyncio
+
+import pytest
+
+import salt.client.asynchronous
+import salt.utils.event
+from tests.support.mock import MagicMock, patch
+
+
+class FakeMaster:
+    """
+    Publish jobs to fake minions, which return on the master event bus after
+    a delay. A minion with a delay of None never returns.
+    """
+
+    def __init__(self, delays, running=()):
+        self.delays = delays
+        self.running = set(running)
+        self.client = None
+        self.published = []
+
+    def fire(self, tag, data):
+        asyncio.ensure_future(
+            self.client._handle_event(salt.utils.event.SaltEvent.pack(tag, data))
+        )
+
+    async def run_job_async(self, tgt, fun, arg, jid="", **kwargs):
+        minions = list(tgt) if isinstance(tgt, list) else sorted(self.delays)
+        self.published.append((fun, minions))
+        loop = asyncio.get_running_loop()
+        for minion in minions:
+            if fun == "saltutil.find_job":
+                ret = {"jid": arg[0]} if minion in self.running else {}
+                delay = 0
+            else:
+                ret = f"{minion}-{arg[0]}"
+                delay = self.delays[minion]
+            if delay is not None:
+                loop.call_later(
+                    delay,
+                    self.fire,
+                    f"salt/job/{jid}/ret/{minion}",
+                    {"id": minion, "jid": jid, "return": ret, "retcode": 0},
+                )
+        return {"jid": jid, "minions": minions}
+
+
+@pytest.fixture
+def fake_master(master_opts):
+    master_opts.update(timeout=0.2, gather_job_timeout=0.1)
+    local = MagicMock(opts=master_opts)
+    master = FakeMaster({"a": 0, "b": 0.05, "down": None, "slow": 0.35}, ["slow"])
+    local.run_job_async.side_effect = master.run_job_async
+    with patch("salt.client.LocalClient", MagicMock(return_value=local)), patch(
+        "salt.transport.ipc_publish_client"
+    ) as subscriber:
+        subscriber.return_value.connect.side_effect = lambda **kwargs: asyncio.sleep(0)
+        yield master
+
+
+async def test_cmd_concurrent(fake_master):
+    async with salt.client.asynchronous.AsyncLocalClient() as client:
+        fake_master.client = client
+        first, second = await asyncio.gather(
+            client.cmd("*", "test.echo", ["one"]),
+            client.cmd("*", "test.echo", ["two"]),
+        )
+        assert first == {"a": "a-one", "b": "b-one", "slow": "slow-one"}
+        assert second == {"a": "a-two", "b": "b-two", "slow": "slow-two"}
+        # Only the minions which did not return in time were asked about
+        # the jobs, once per job
+        find_jobs = [
+            minions for fun, minions in fake_master.published if fun != "test.echo"
+        ]
+        assert find_jobs == [["down", "slow"], ["down", "slow"]]
+        assert client._jobs == {}
+
+
+async def test_cmd_iter_expect_minions(fake_master):
+    async with salt.client.asynchronous.AsyncLocalClient() as client:
+        fake_master.client = client
+        rets = [
+            ret
+            async for ret in client.cmd_iter(
+                "*", "test.echo", ["one"], expect_minions=True
+            )
+        ]
+        assert [next(iter(ret)) for ret in rets] == ["a", "b", "slow", "down"]
+        assert rets[-1] == {"down": {"failed": True}}
+        assert rets[0]["a"]["retcode"] == 0
+
+
+async def test_cmd_cancelled(fake_master):
+    async with salt.client.asynchronous.AsyncLocalClient() as client:
+        fake_master.client = client
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.cmd("*", "test.echo", ["one"]), 0.1)
+        assert client._jobs == {}
@@ -2,12 +2,16 @@
 Tests for the salt fileclient
 """
 
+import contextlib
 import errno
+import hashlib
 import logging
 import os
+import threading
 
 import pytest
 
+import salt.fileserver
 import salt.utils.files
 from salt import fileclient
 from tests.support.mock import AsyncMock, MagicMock, Mock, patch
@@ -239,3 +243,259 @@ def test_get_url_with_hash(client_opts):
                 result = client.get_url(url, dest)
 
                 assert result == "/path/to/file#with#hash"
+
+
+class ChunkServingChannel:
+    """
+    Serve a single file in chunks the way the master file server does
+    """
+
+    def __init__(self, server, content, chunk_size, report_size=True):
+        self.server = server
+        self.content = content
+        self.chunk_size = chunk_size
+        self.report_size = report_size
+
+    def send(self, load, raw=False):
+        if load["cmd"] == "_file_hash":
+            return {
+                "hsum": hashlib.sha256(self.content).hexdigest(),
+                "hash_type": "sha256",
+            }
+        assert load["cmd"] == "_serve_file"
+        with self.server["lock"]:
+            self.server["locs"].append(load["loc"])
+            self.server["channels"].add(id(self))
+        ret = {
+            "data": self.content[load["loc"] : load["loc"] + self.chunk_size],
+            "dest": load["path"],
+        }
+        if self.report_size and ret["data"]:
+            ret["size"] = len(self.content)
+            if load.get("transfer") and len(self.content) > len(ret["data"]):
+                ret["transfer"] = "ticket"
+                ret["transfer_port"] = 4507
+        return ret
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def chunk_server():
+    return {"lock": threading.Lock(), "locs": [], "channels": set()}
+
+
+@pytest.fixture
+def dest_dir(tmp_path):
+    path = tmp_path / "dest"
+    path.mkdir()
+    return path
+
+
+@contextlib.contextmanager
+def _remote_client(minion_opts, server, content, chunk_size=4, report_size=True):
+    def factory(opts):
+        return ChunkServingChannel(server, content, chunk_size, report_size)
+
+    with patch("salt.channel.client.ReqChannel.factory", side_effect=factory):
+        with fileclient.RemoteClient(minion_opts) as client:
+            yield client
+
+
+@pytest.mark.parametrize("report_size", [True, False])
+def test_get_file_windowed(minion_opts, dest_dir, chunk_server, report_size):
+    minion_opts.update({"file_client_window": 4, "hash_type": "sha256"})
+    content = bytes(range(256)) * 3 + b"tail"
+    dest = str(dest_dir / "file")
+    with _remote_client(
+        minion_opts, chunk_server, content, report_size=report_size
+    ) as client:
+        assert client.get_file("salt://file", dest=dest) == dest
+        if report_size:
+            # The remaining chunks were requested over several channels
+            assert len(client._window_channels) == 3
+            assert len(chunk_server["channels"]) > 1
+        else:
+            # Older masters are asked for one chunk after the other, once they
+            # did not report the size of the file
+            assert chunk_server["locs"] == [0] + list(range(0, len(content) + 1, 4))
+    with salt.utils.files.fopen(dest, "rb") as fp_:
+        assert fp_.read() == content
+    assert os.listdir(dest_dir) == ["file"]
+
+
+@pytest.mark.parametrize("window", [1, 4])
+@pytest.mark.parametrize("streamed", [None, 6])
+def test_get_file_transfer(minion_opts, dest_dir, chunk_server, window, streamed):
+    """
+    The rest of a file is streamed from the file transfer server using the
+    ticket sent with the first chunk, and fetched chunk by chunk from wherever
+    the stream stopped if it fails
+    """
+    minion_opts.update(
+        {
+            "file_client_window": window,
+            "file_client_transfer": True,
+            "hash_type": "sha256",
+            "master_ip": "127.0.0.1",
+        }
+    )
+    content = b"0123456789abcdefghij"
+    dest = dest_dir / "file"
+
+    def fetch(address, port, ticket, fp_, **kwargs):
+        assert (address, port, ticket) == ("127.0.0.1", 4507, "ticket")
+        offset = fp_.tell()
+        if streamed is None:
+            fp_.write(content[offset:])
+            return len(content) - offset
+        fp_.write(content[offset : offset + streamed])
+        raise OSError("Connection reset by peer")
+
+    with patch("salt.utils.filetransfer.fetch", side_effect=fetch):
+        with _remote_client(minion_opts, chunk_server, content) as client:
+            assert client.get_file("salt://file", dest=str(dest)) == str(dest)
+    assert dest.read_bytes() == content
+    assert os.listdir(dest_dir) == ["file"]
+    if streamed is None:
+        requested = [0]
+    else:
+        requested = [0] + list(range(4 + streamed, len(content), 4))
+    if window == 1:
+        # Asking for the end of the file prompts the hash verification
+        requested.append(len(content))
+    assert sorted(chunk_server["locs"]) == requested
+
+
+@pytest.mark.parametrize("window", [1, 4])
+def test_get_file_transfer_bad_data(minion_opts, dest_dir, chunk_server, window):
+    """
+    A streamed file which does not match its hash on the master is fetched
+    again chunk by chunk
+    """
+    minion_opts.update(
+        {
+            "file_client_window": window,
+            "file_client_transfer": True,
+            "hash_type": "sha256",
+            "master_ip": "127.0.0.1",
+        }
+    )
+    content = b"0123456789abcdefghij"
+    dest = dest_dir / "file"
+
+    def fetch(address, port, ticket, fp_, **kwargs):
+        fp_.write(b"x" * (len(content) - fp_.tell()))
+        return len(content)
+
+    with patch("salt.utils.filetransfer.fetch", side_effect=fetch):
+        with _remote_client(minion_opts, chunk_server, content) as client:
+            assert client.get_file("salt://file", dest=str(dest)) == str(dest)
+    assert dest.read_bytes() == content
+    assert os.listdir(dest_dir) == ["file"]
+    assert chunk_server["locs"].count(0) == 2
+
+
+def test_get_file_windowed_resume(minion_opts, dest_dir, chunk_server):
+    minion_opts.update({"file_client_window": 4, "hash_type": "sha256"})
+    content = b"0123456789abcdefghij"
+    hsum = hashlib.sha256(content).hexdigest()
+    dest = dest_dir / "file"
+    (dest_dir / f"file.{hsum[:16]}.partial").write_bytes(content[:12])
+    with _remote_client(minion_opts, chunk_server, content) as client:
+        assert client.get_file("salt://file", dest=str(dest)) == str(dest)
+    assert sorted(chunk_server["locs"]) == [12, 16]
+    assert dest.read_bytes() == content
+    assert os.listdir(dest_dir) == ["file"]
+
+
+def test_get_file_windowed_bad_partial(minion_opts, dest_dir, chunk_server):
+    minion_opts.update({"file_client_window": 4, "hash_type": "sha256"})
+    content = b"0123456789abcdefghij"
+    hsum = hashlib.sha256(content).hexdigest()
+    dest = dest_dir / "file"
+    (dest_dir / f"file.{hsum[:16]}.partial").write_bytes(b"corrupted!!!")
+    with _remote_client(minion_opts, chunk_server, content) as client:
+        assert client.get_file("salt://file", dest=str(dest)) == str(dest)
+    # The corrupt partial file failed the hash check, and the file was fetched
+    # again from the start
+    assert 0 in chunk_server["locs"]
+    assert dest.read_bytes() == content
+    assert os.listdir(dest_dir) == ["file"]
+
+
+class FileListChannel:
+    """
+    Answer file list requests with a master fileserver, recording the replies
+    """
+
+    def __init__(self, fileserver, replies):
+        self.fileserver = fileserver
+        self.replies = replies
+
+    def send(self, load, raw=False):
+        assert load["cmd"] == "_file_list"
+        ret = self.fileserver.file_list(dict(load))
+        self.replies.append(ret)
+        return ret
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("delta", [True, False])
+def test_file_list_delta(minion_opts, tmp_path, delta):
+    """
+    Once the minion has a file list, the master only sends the changes to it,
+    unless the master does not know the generation the minion has any more
+    """
+    files = {f"file{idx}" for idx in range(100)}
+    fileserver = salt.fileserver.Fileserver(
+        {"fileserver_backend": ["roots"], "extension_modules": ""}
+    )
+    fileserver.servers = {
+        "roots.envs": lambda: ["base"],
+        "roots.file_list": lambda load: set(files),
+    }
+    replies = []
+
+    def factory(opts):
+        return FileListChannel(fileserver, replies)
+
+    with patch("salt.channel.client.ReqChannel.factory", side_effect=factory):
+        with fileclient.RemoteClient(minion_opts) as client:
+            assert client.file_list("base") == sorted(files)
+            assert len(replies[-1]["files"]) == 100
+
+            assert client.file_list("base") == sorted(files)
+            assert replies[-1] == {
+                "generation": replies[0]["generation"],
+                "added": [],
+                "removed": [],
+            }
+
+            files.discard("file0")
+            files.add("new")
+            if not delta:
+                fileserver._file_list_generations.clear()
+            assert client.file_list("base") == sorted(files)
+            if delta:
+                assert replies[-1]["added"] == ["new"]
+                assert replies[-1]["removed"] == ["file0"]
+                assert "files" not in replies[-1]
+            else:
+                assert len(replies[-1]["files"]) == 100
+
+        # A new client uses the list cached by the previous one
+        with fileclient.RemoteClient(minion_opts) as client:
+            assert client.file_list("base") == sorted(files)
+            assert "files" not in replies[-1]
+
+
+def test_file_list_old_master(minion_opts):
+    channel = MagicMock()
+    channel.send.return_value = ["top.sls"]
+    with patch("salt.channel.client.ReqChannel.factory", return_value=channel):
+        with fileclient.RemoteClient(minion_opts) as client:
+            assert client.file_list("base") == ["top.sls"]
@@ -1,4 +1,5 @@
 import errno
+import hashlib
 import logging
 import os
 import shutil
@@ -336,3 +337,167 @@ def test_cache_dest(mocked_opts, minion_opts):
         _check(client.cache_dest(f"salt://{relpath}?saltenv=dev"), _salt("dev"))
 
         _check("/foo/bar", "/foo/bar")
+
+
+def test_cache_dir_serve_files(mocked_opts, minion_opts, fs_root):
+    """
+    Ensure a directory is cached with a single request, and that only
+    changed files are sent when it is cached again
+    """
+    patched_opts = minion_opts.copy()
+    patched_opts.update(mocked_opts)
+
+    with patch.dict(fileclient.__opts__, patched_opts):
+        client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+        send = client.channel.send
+        sent = []
+
+        def _send(load, **kwargs):
+            ret = send(load, **kwargs)
+            sent.append((load["cmd"], ret))
+            return ret
+
+        with patch.object(client.channel, "send", side_effect=_send):
+            assert len(client.cache_dir(f"salt://{SUBDIR}", "base")) == 3
+            assert [cmd for cmd, _ in sent] == ["_file_list", "_serve_files"]
+
+            with salt.utils.files.fopen(
+                os.path.join(fs_root, "base", SUBDIR, "bar.txt"), "w"
+            ) as fp_:
+                fp_.write("changed")
+            sent.clear()
+            assert len(client.cache_dir(f"salt://{SUBDIR}", "base")) == 3
+
+        assert [cmd for cmd, _ in sent] == ["_file_list", "_serve_files"]
+        served = sent[-1][1]["files"]
+        assert sorted(served) == [
+            f"{SUBDIR}/{name}" for name in sorted(_subdir_files())
+        ]
+        assert [path for path, entry in served.items() if "data" in entry] == [
+            f"{SUBDIR}/bar.txt"
+        ]
+        cache_loc = os.path.join(
+            fileclient.__opts__["cachedir"], "files", "base", SUBDIR, "bar.txt"
+        )
+        with salt.utils.files.fopen(cache_loc) as fp_:
+            assert fp_.read() == "changed"
+
+
+def test_cache_files_old_master(mocked_opts, minion_opts):
+    """
+    Ensure files are cached one at a time from masters which do not know
+    the _serve_files request
+    """
+    patched_opts = minion_opts.copy()
+    patched_opts.update(mocked_opts)
+
+    with patch.dict(fileclient.__opts__, patched_opts):
+        client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+        send = client.channel.send
+
+        def _send(load, **kwargs):
+            if load["cmd"] == "_serve_files":
+                return False
+            return send(load, **kwargs)
+
+        urls = [f"salt://{SUBDIR}/{name}" for name in _subdir_files()]
+        with patch.object(client.channel, "send", side_effect=_send):
+            ret = client.cache_files(urls + ["salt://missing.txt"], "dev")
+        assert not client._serve_files_supported
+        assert ret[-1] is False
+        for url, cache_loc in zip(urls, ret):
+            assert cache_loc.endswith(url[len("salt://") :])
+            with salt.utils.files.fopen(cache_loc) as fp_:
+                assert "dev" in fp_.read()
+
+
+def test_cache_file_object_store(mocked_opts, minion_opts, fs_root):
+    """
+    Ensure a file cached under another saltenv or path is linked from the
+    object store instead of being fetched again
+    """
+    patched_opts = minion_opts.copy()
+    patched_opts.update(mocked_opts)
+    patched_opts["file_client_object_store"] = True
+    for saltenv, name in (("base", "same.txt"), ("dev", "other.txt")):
+        with salt.utils.files.fopen(os.path.join(fs_root, saltenv, name), "w") as fp_:
+            fp_.write("identical content")
+
+    with patch.dict(fileclient.__opts__, patched_opts):
+        client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+        send = client.channel.send
+        sent = []
+
+        def _send(load, **kwargs):
+            sent.append(load["cmd"])
+            return send(load, **kwargs)
+
+        with patch.object(client.channel, "send", side_effect=_send):
+            base = client.cache_file("salt://same.txt", "base")
+            assert "_serve_file" in sent
+            sent.clear()
+            dev = client.cache_file("salt://other.txt", "dev")
+            assert "_serve_file" not in sent
+
+        with salt.utils.files.fopen(dev) as fp_:
+            assert fp_.read() == "identical content"
+        assert os.path.samefile(base, dev)
+        assert os.stat(base).st_nlink == 3
+
+        # Once neither path refers to the object any more, it is removed
+        for saltenv, name in (("base", "same.txt"), ("dev", "other.txt")):
+            with salt.utils.files.fopen(
+                os.path.join(fs_root, saltenv, name), "w"
+            ) as fp_:
+                fp_.write(f"changed in {saltenv}")
+        hsum = hashlib.sha256(b"identical content").hexdigest()
+        obj = os.path.join(
+            fileclient.__opts__["cachedir"], "objects", "sha256", hsum[:2], hsum
+        )
+        assert os.path.isfile(obj)
+        client.cache_file("salt://same.txt", "base")
+        assert os.stat(dev).st_nlink == 2
+        client.cache_file("salt://other.txt", "dev")
+        assert not os.path.exists(obj)
+        with salt.utils.files.fopen(base) as fp_:
+            assert fp_.read() == "changed in base"
+
+
+def test_cache_files_object_store(mocked_opts, minion_opts, fs_root):
+    """
+    Ensure files cached together are linked from the object store before
+    the master is asked for their contents
+    """
+    patched_opts = minion_opts.copy()
+    patched_opts.update(mocked_opts)
+    patched_opts["file_client_object_store"] = True
+    names = ("one.txt", "two.txt")
+    for saltenv in _saltenvs():
+        for name in names:
+            with salt.utils.files.fopen(
+                os.path.join(fs_root, saltenv, name), "w"
+            ) as fp_:
+                fp_.write(f"content of {name}")
+
+    with patch.dict(fileclient.__opts__, patched_opts):
+        client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+        send = client.channel.send
+        sent = []
+
+        def _send(load, **kwargs):
+            ret = send(load, **kwargs)
+            sent.append((load, ret))
+            return ret
+
+        urls = [f"salt://{name}" for name in names]
+        with patch.object(client.channel, "send", side_effect=_send):
+            base = client.cache_files(urls, "base")
+            sent.clear()
+            dev = client.cache_files(urls + ["salt://missing.txt"], "dev")
+
+        # Only the hashes were requested, the contents came from the store
+        assert [load.get("hash_only") for load, _ in sent] == [True]
+        assert not any("data" in entry for entry in sent[0][1]["files"].values())
+        assert dev[-1] is False
+        for base_loc, dev_loc in zip(base, dev):
+            assert os.path.samefile(base_loc, dev_loc)
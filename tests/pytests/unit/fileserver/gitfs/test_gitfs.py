@@ -29,6 +29,7 @@ import tornado.ioloop
 import salt.fileserver.gitfs as gitfs
 import salt.utils.files
 import salt.utils.gitfs
+import salt.utils.hashutils
 import salt.utils.platform
 import salt.utils.win_functions
 import salt.utils.yaml
@@ -211,6 +212,8 @@ def configure_loader_modules(provider, sock_dir, repo_dir, cache_dir):
         "gitfs_disable_saltenv_mapping": False,
         "gitfs_ref_types": ["branch", "tag", "sha"],
         "gitfs_update_interval": 60,
+        "gitfs_fetch_depth": 0,
+        "gitfs_fetch_filter": "",
         "__role": "master",
         "gitfs_provider": provider,
     }
@@ -316,6 +319,54 @@ def test_find_and_serve_file_fallback(repo_dir):
         assert ret == {"data": data, "dest": "testfile"}
 
 
+def test_manifests(repo_dir, unicode_filename, unicode_dirname):
+    """
+    Lookups are served from the manifests written by update() without walking
+    the git trees, and manifests are only rebuilt when a tree changes
+    """
+    with patch.dict(gitfs.__opts__, {"gitfs_manifests": True, "hash_type": "sha256"}):
+        gitfs.update()
+        manifest_dir = os.path.join(gitfs.__opts__["cachedir"], "gitfs", "manifests")
+        assert "base.p" in os.listdir(manifest_dir)
+
+        provider = salt.utils.gitfs.GIT_PROVIDERS[gitfs.__opts__["gitfs_provider"]]
+        with patch.object(provider, "find_file") as find_file, patch.object(
+            provider, "file_list"
+        ) as file_list:
+            assert gitfs.file_list({"saltenv": "base"}) == sorted(
+                [
+                    "grail/random_file",
+                    "testfile",
+                    unicode_filename,
+                    "/".join((unicode_dirname, "foo.txt")),
+                ]
+            )
+            assert gitfs.dir_list({"saltenv": "base"}) == sorted(
+                ["grail", unicode_dirname]
+            )
+            assert gitfs.find_file("missing") == {"path": "", "rel": ""}
+            file_list.assert_not_called()
+            find_file.assert_not_called()
+
+        # The first lookup writes the file to the cache
+        fnd = gitfs.find_file("testfile")
+        assert fnd["rel"] == "testfile"
+        with patch.object(provider, "find_file") as find_file:
+            assert gitfs.find_file("testfile") == fnd
+            ret = gitfs.file_hash({"saltenv": "base", "path": "testfile"}, fnd)
+            find_file.assert_not_called()
+        with salt.utils.files.fopen(os.path.join(repo_dir, "testfile"), "rb") as fp_:
+            assert ret == {
+                "hash_type": "sha256",
+                "hsum": salt.utils.hashutils.sha256_digest(fp_.read()),
+            }
+
+        # Nothing changed, so nothing is rebuilt
+        with patch.object(provider, "file_manifest") as file_manifest:
+            gitfs.update()
+        file_manifest.assert_not_called()
+
+
 @pytest.mark.slow_test
 def test_envs(unicode_dirname, tag_name):
     gitfs.update()
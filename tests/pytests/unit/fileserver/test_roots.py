@@ -8,6 +8,7 @@ import pathlib
 import shutil
 import sys
 import textwrap
+import threading
 
 import pytest
 
@@ -122,6 +123,67 @@ def test_file_hash(testfile):
     assert ret == {"hsum": hsum, "hash_type": "sha256"}
 
 
+def test_file_hash_index(testfilepath):
+    """
+    Test that hashes are served from the index written by update() without
+    hashing the files, and that changed files are rehashed
+    """
+    load = {"saltenv": "base", "path": "testfile"}
+    fnd = {"path": str(testfilepath), "rel": "testfile"}
+    old_hsum = salt.utils.hashutils.get_hash(str(testfilepath), "sha256")
+
+    with patch.dict(roots.__opts__, {"roots_hash_index": True}), patch.dict(
+        roots._HASH_INDEX, {"mtime": None, "files": {}}
+    ):
+        roots.update()
+        with patch("os.path.isfile") as isfile, patch(
+            "salt.utils.hashutils.get_hash"
+        ) as get_hash:
+            ret = roots.file_hash(load, fnd)
+        isfile.assert_not_called()
+        get_hash.assert_not_called()
+        assert ret == {"hsum": old_hsum, "hash_type": "sha256"}
+
+        testfilepath.write_text("This is a changed testfile")
+        os.utime(str(testfilepath), (1000000000, 1000000000))
+        new_hsum = salt.utils.hashutils.get_hash(str(testfilepath), "sha256")
+        # The stale entry is not served before the index is updated
+        assert roots.file_hash(load, fnd)["hsum"] == new_hsum
+        with patch(
+            "salt.utils.hashutils.get_hash", side_effect=salt.utils.hashutils.get_hash
+        ) as get_hash:
+            assert roots.update_index(paths=[str(testfilepath)]) is True
+            assert roots.update_index(paths=[str(testfilepath)]) is False
+        assert get_hash.call_count == 1
+        assert roots.file_hash(load, fnd)["hsum"] == new_hsum
+
+        testfilepath.unlink()
+        roots.update()
+        assert str(testfilepath) not in roots._read_hash_index()
+
+
+def test_update_index_concurrent(tmp_path):
+    """
+    Test that concurrent updates of the hash index are not lost
+    """
+    paths = []
+    for idx in range(40):
+        path = tmp_path / f"file{idx}"
+        path.write_text(str(idx))
+        paths.append(str(path))
+
+    with patch.dict(roots.__opts__, {"cachedir": str(tmp_path / "cache")}):
+        threads = [
+            threading.Thread(target=roots.update_index, kwargs={"paths": [path]})
+            for path in paths
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(roots._read_hash_index()) == sorted(paths)
+
+
 def test_file_list_emptydirs(tmp_state_tree):
     empty_dir = tmp_state_tree / "empty_dir"
     empty_dir.mkdir(parents=True, exist_ok=True)
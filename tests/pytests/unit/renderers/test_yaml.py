@@ -4,6 +4,7 @@ import textwrap
 import pytest
 
 import salt.renderers.yaml as yaml
+from salt.exceptions import SaltRenderError
 from tests.support.mock import patch
 
 
@@ -61,3 +62,17 @@ def test_yaml_render_old_unicode():
             ),
             {"foo": {"a": "\u0414", "b": {"a": "\u0414"}}},
         )
+
+
+def test_yaml_render_scanner_error_context():
+    data = textwrap.dedent(
+        """\
+        foo:
+          bar: baz
+        \tqux: quux
+        """
+    )
+    with pytest.raises(SaltRenderError) as exc:
+        yaml.render(data)
+    assert exc.value.line_num == 3
+    assert "bar: baz" in exc.value.context
@@ -0,0 +1,186 @@
+"""
+Unit tests for the batch runner
+"""
+
+import pytest
+
+from salt.runners import batch as batch_runner
+from tests.support.mock import MagicMock, patch
+
+
+@pytest.fixture
+def jid_event():
+    return MagicMock()
+
+
+@pytest.fixture
+def configure_loader_modules(tmp_path, jid_event):
+    opts = {
+        "id": "master_master",
+        "master_job_cache": "local_cache",
+        "cachedir": str(tmp_path),
+        "conf_file": "",
+        "timeout": 0.1,
+        "gather_job_timeout": 0.1,
+    }
+    return {
+        batch_runner: {
+            "__opts__": opts,
+            "__jid_event__": jid_event,
+            "__context__": {},
+        }
+    }
+
+
+@pytest.fixture
+def job_cache():
+    """
+    An in memory job cache
+    """
+    loads = {}
+    returns = {}
+
+    def returner(load):
+        returns.setdefault(load["jid"], {})[load["id"]] = {
+            "return": load["return"],
+            "retcode": load.get("retcode", 0),
+        }
+
+    returners = {
+        "local_cache.prep_jid": MagicMock(),
+        "local_cache.save_load": loads.__setitem__,
+        "local_cache.get_load": lambda jid: loads.get(jid, {}),
+        "local_cache.returner": returner,
+        "local_cache.get_jid": lambda jid: returns.get(jid, {}),
+    }
+    with patch(
+        "salt.minion.MasterMinion",
+        MagicMock(return_value=MagicMock(returners=returners)),
+    ):
+        yield loads, returns
+
+
+@pytest.fixture
+def local(job_cache):
+    """
+    A LocalClient whose minions return right away, except for the minion
+    named "down"
+    """
+    local = MagicMock()
+    local.gather_minions.return_value = ["a", "b", "down"]
+    jobs = []
+    events = []
+
+    def run_job(tgt, fun, arg, **kwargs):
+        jid = str(len(jobs))
+        jobs.append((list(tgt), fun, arg))
+        for minion in tgt:
+            if minion != "down":
+                events.append(
+                    {
+                        "tag": f"salt/job/{jid}/ret/{minion}",
+                        "data": {"id": minion, "jid": jid, "return": arg},
+                    }
+                )
+        return {"jid": jid, "minions": list(tgt)}
+
+    local.run_job.side_effect = run_job
+    local.event.get_event.side_effect = lambda **kwargs: (
+        events.pop(0) if events else None
+    )
+    local.jobs = jobs
+    with patch(
+        "salt.client.get_local_client", MagicMock(return_value=local)
+    ), patch.object(batch_runner, "__jid__", "20240101000000000002", create=True):
+        yield local
+
+
+def test_run(local, jid_event, job_cache):
+    ret = batch_runner.run("*", "test.arg", arg=["foo"], batch="1")
+    assert ret == {
+        "a": ["foo"],
+        "b": ["foo"],
+        "down": "Minion did not return. [No response]",
+    }
+    assert batch_runner.__context__["retcode"] == 1
+    assert [minions for minions, fun, _ in local.jobs if fun == "test.arg"] == [
+        ["a"],
+        ["b"],
+        ["down"],
+    ]
+    progress = [call.args[0] for call in jid_event.fire_event.call_args_list]
+    assert [(evt["minion"], evt["returned"], evt["total"]) for evt in progress] == [
+        ("a", 1, 3),
+        ("b", 2, 3),
+    ]
+    # The returns are stored in the job cache under the job id of the batch job
+    _, returns = job_cache
+    assert returns["20240101000000000002"] == {
+        "a": {"return": ["foo"], "retcode": 0},
+        "b": {"return": ["foo"], "retcode": 0},
+    }
+    status = batch_runner.status("20240101000000000002")
+    assert status["fun"] == "test.arg"
+    assert status["returned"] == ["a", "b"]
+    assert status["completed"] is False
+
+
+def test_resume(local, job_cache):
+    loads, returns = job_cache
+    loads["20240101000000000001"] = {
+        "jid": "20240101000000000001",
+        "fun": "runner.batch.run",
+        "tgt": "*",
+        "tgt_type": "glob",
+        "batch_fun": "test.arg",
+        "batch_arg": ["foo"],
+    }
+    returns["20240101000000000001"] = {"a": {"return": ["foo"], "retcode": 0}}
+    status = batch_runner.status("20240101000000000001")
+    assert status["completed"] is False
+    assert status["returned"] == ["a"]
+
+    local.gather_minions.return_value = ["a", "b"]
+    ret = batch_runner.run(
+        "*", "test.arg", arg=["foo"], batch="1", resume="20240101000000000001"
+    )
+    # The returns of the resumed job are carried over
+    assert ret == {"a": ["foo"], "b": ["foo"]}
+    assert [minions for minions, _, _ in local.jobs] == [["b"]]
+    assert sorted(returns["20240101000000000002"]) == ["a", "b"]
+
+
+def test_resume_other_job(local, job_cache):
+    loads, returns = job_cache
+    loads["20240101000000000001"] = {
+        "jid": "20240101000000000001",
+        "fun": "runner.batch.run",
+        "tgt": "*",
+        "tgt_type": "glob",
+        "batch_fun": "test.ping",
+        "batch_arg": [],
+    }
+    returns["20240101000000000001"] = {"a": {"return": True, "retcode": 0}}
+    local.gather_minions.return_value = ["a", "b"]
+    ret = batch_runner.run(
+        "*", "test.arg", arg=["foo"], batch="1", resume="20240101000000000001"
+    )
+    assert ret == {"a": ["foo"], "b": ["foo"]}
+
+
+def test_attach_finished(job_cache):
+    _, returns = job_cache
+    returns["20240101000000000002"] = {
+        "a": {"return": ["foo"], "retcode": 0},
+        "master_master": {
+            "return": {"fun": "runner.batch.run", "return": {"a": ["foo"]}},
+            "retcode": 0,
+        },
+    }
+    with patch("salt.utils.master.get_running_jobs", MagicMock(return_value=[])):
+        assert batch_runner.attach("20240101000000000002") == {"a": ["foo"]}
+        assert batch_runner.status("20240101000000000002")["completed"] is True
+        # A batch job which was stopped before it completed
+        del returns["20240101000000000002"]["master_master"]
+        assert batch_runner.attach("20240101000000000002") == {"a": ["foo"]}
+        assert batch_runner.status("20240101000000000002")["completed"] is False
@@ -314,3 +314,30 @@ def test_set_leader():
                     get_master_key.retun_value = MagicMock(retun_value="master_key")
                     ret = reactor.set_leader()
                     assert ret
+
+
+def test_stats():
+    """
+    test reactor.stats runner
+    """
+    with pytest.raises(CommandExecutionError) as excinfo:
+        reactor.stats()
+    assert excinfo.value.error == "Reactor system is not running."
+
+    mock_opts = {"reactor": [{"test_event/*": ["/srv/reactors/reactor.sls"]}]}
+    event_returns = {
+        "stats": {"counters": {"events": 1, "dropped": 0}, "queue_depth": 0},
+        "_stamp": "2020-09-04T18:32:10.004490",
+    }
+
+    with patch.dict(reactor.__opts__, mock_opts):
+        with patch.object(SaltEvent, "connect_pub", return_value=True):
+            with patch.object(
+                SaltEvent, "get_event", return_value=event_returns
+            ) as get_event:
+                with patch("salt.utils.master.get_master_key"):
+                    ret = reactor.stats()
+                    assert ret == event_returns["stats"]
+                    get_event.assert_called_with(
+                        wait=30, tag="salt/reactors/manage/stats-results"
+                    )
@@ -9,6 +9,7 @@ import pytest  # pylint: disable=unused-import
 
 import salt.state
 from salt.utils.odict import DefaultOrderedDict, OrderedDict
+from tests.support.mock import patch
 
 log = logging.getLogger(__name__)
 
@@ -418,3 +419,119 @@ def test_verify_tops_match_none(highstate):
     tops["base"] = OrderedDict([("*", [OrderedDict([("match", "")]), "test", "test2"])])
     matches = highstate.verify_tops(tops)
     assert "Improperly formatted top file matcher in saltenv" in matches[0]
+
+
+def test_compile_cache(highstate, state_tree_dir):
+    """
+    The rendered highstate is reused until one of the files it was rendered
+    from changes, including files imported through Jinja
+    """
+    highstate.opts["state_compile_cache"] = True
+    top_sls = "base: {'*': [foo]}"
+    map_jinja = "{% set name = 'one' %}"
+    foo_sls = textwrap.dedent(
+        """\
+        {% from 'map.jinja' import name %}
+        foo:
+          test.succeed_without_changes:
+            - name: {{ name }}
+        """
+    )
+    sls_dir = str(state_tree_dir)
+    render = salt.state.BaseHighState._render_highstate
+    with pytest.helpers.temp_file(
+        "top.sls", top_sls, sls_dir
+    ), pytest.helpers.temp_file("foo.sls", foo_sls, sls_dir), pytest.helpers.temp_file(
+        "map.jinja", map_jinja, sls_dir
+    ) as map_path, patch.object(
+        salt.state.BaseHighState, "_render_highstate", autospec=True, side_effect=render
+    ) as render_mock:
+        high = salt.state.HighState(highstate.opts).compile_highstate()
+        assert render_mock.call_count == 1
+        assert high["foo"]["test"][0] == {"name": "one"}
+
+        assert salt.state.HighState(highstate.opts).compile_highstate() == high
+        assert render_mock.call_count == 1
+
+        map_path.write_text("{% set name = 'two' %}")
+        high = salt.state.HighState(highstate.opts).compile_highstate()
+        assert render_mock.call_count == 2
+        assert high["foo"]["test"][0] == {"name": "two"}
+
+
+def test_compile_cache_pillar_change(highstate, state_tree_dir):
+    """
+    A pillar change invalidates the cached highstate and low chunks
+    """
+    highstate.opts["state_compile_cache"] = True
+    sls_dir = str(state_tree_dir)
+    render = salt.state.BaseHighState._render_highstate
+    with pytest.helpers.temp_file(
+        "top.sls", "base: {'*': [foo]}", sls_dir
+    ), pytest.helpers.temp_file("foo.sls", "foo: test.nop", sls_dir), patch.object(
+        salt.state.BaseHighState, "_render_highstate", autospec=True, side_effect=render
+    ) as render_mock:
+        chunks = salt.state.HighState(highstate.opts).compile_low_chunks()
+        assert salt.state.HighState(highstate.opts).compile_low_chunks() == chunks
+        assert render_mock.call_count == 1
+        assert chunks[0]["__id__"] == "foo"
+
+        state = salt.state.HighState(highstate.opts)
+        state.state.opts["pillar"] = {"changed": True}
+        assert state.compile_low_chunks() == chunks
+        assert render_mock.call_count == 2
+
+
+def test_compile_cache_glob_include(highstate, state_tree_dir):
+    """
+    A new SLS file matching a glob include invalidates the cached highstate
+    """
+    highstate.opts["state_compile_cache"] = True
+    highstate.opts["fileserver_list_cache_time"] = 0
+    sls_dir = str(state_tree_dir)
+    with pytest.helpers.temp_file(
+        "top.sls", "base: {'*': [foo]}", sls_dir
+    ), pytest.helpers.temp_file(
+        "foo.sls", "include: ['bar.*']", sls_dir
+    ), pytest.helpers.temp_file(
+        "bar/one.sls", "one: test.nop", sls_dir
+    ):
+        high = salt.state.HighState(highstate.opts).compile_highstate()
+        assert "one" in high
+        assert "two" not in high
+        with pytest.helpers.temp_file("bar/two.sls", "two: test.nop", sls_dir):
+            high = salt.state.HighState(highstate.opts).compile_highstate()
+            assert "one" in high
+            assert "two" in high
+
+
+def test_compile_cache_call_highstate(highstate, state_tree_dir):
+    """
+    Applying the highstate reuses the cached low chunks
+    """
+    highstate.opts["state_compile_cache"] = True
+    sls_dir = str(state_tree_dir)
+    with pytest.helpers.temp_file(
+        "top.sls", "base: {'*': [foo]}", sls_dir
+    ), pytest.helpers.temp_file("foo.sls", "foo: test.nop", sls_dir):
+        ret = salt.state.HighState(highstate.opts).call_highstate()
+        assert ret["test_|-foo_|-foo_|-nop"]["result"] is True
+        with patch.object(
+            salt.state.State, "compile_high", autospec=True
+        ) as compile_mock:
+            ret = salt.state.HighState(highstate.opts).call_highstate()
+        compile_mock.assert_not_called()
+        assert ret["test_|-foo_|-foo_|-nop"]["result"] is True
+
+
+@pytest.mark.parametrize(
+    "opt,value", [("test", True), ("saltenv", "base"), ("pillarenv", "dev")]
+)
+def test_compile_cache_key_opts(highstate, opt, value):
+    """
+    Templates may depend on test mode and the environments, so they are part
+    of the compile cache key
+    """
+    key = highstate._gen_compile_cache_key({"base": ["foo"]})
+    highstate.opts[opt] = value
+    assert highstate._gen_compile_cache_key({"base": ["foo"]}) != key
@@ -4,6 +4,7 @@
 
 import copy
 import logging
+import time
 
 import pytest
 
@@ -288,3 +289,47 @@ def test_invalid_event_tag_65727(master_opts, caplog):
             for ret in local_client.get_iter_returns(jid, {"fake-id"}):
                 assert ret == {"fake-id": {"ret": "fpp"}}
             assert "Skipping non return event: salt/job/0815/return/" in caplog.text
+
+
+def test_get_iter_returns_heartbeat(master_opts):
+    """
+    LocalClient.get_iter_returns only asks the minions which did not send a
+    heartbeat whether they still run the job.
+    """
+    jid = "0815"
+    start = time.time()
+
+    def returns_iter():
+        yield {
+            "tag": f"salt/job/{jid}/heartbeat/alive",
+            "data": {"id": "alive", "data": {"jid": jid, "interval": 10}},
+        }
+        while time.time() < start + 0.5:
+            yield None
+        yield {
+            "tag": f"salt/job/{jid}/ret/alive",
+            "data": {"id": "alive", "jid": jid, "return": True},
+        }
+        while True:
+            yield None
+
+    with client.LocalClient(mopts=master_opts) as local_client:
+        local_client.returns_for_job = MagicMock(return_value=True)
+        local_client.get_returns_no_block = MagicMock(return_value=returns_iter())
+        local_client.gather_job_info = MagicMock(return_value={})
+        rets = list(
+            local_client.get_iter_returns(
+                jid,
+                {"alive", "silent"},
+                timeout=0.1,
+                gather_job_timeout=0.1,
+                expect_minions=True,
+            )
+        )
+        assert rets == [
+            {"alive": {"ret": True, "jid": jid}},
+            {"silent": {"failed": True}},
+        ]
+        local_client.gather_job_info.assert_called_once_with(
+            jid, ["silent"], "list", gather_job_timeout=0.1
+        )
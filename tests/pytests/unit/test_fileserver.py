@@ -4,6 +4,7 @@ import time
 
 import salt.fileserver
 import salt.utils.files
+import salt.utils.filetransfer
 
 
 def test_diff_with_diffent_keys():
@@ -121,3 +122,160 @@ def test_file_server_serve_url_escape(tmp_path):
         }
     )
     assert ret == {"data": "", "dest": ""}
+
+
+def test_serve_file_transfer_ticket(tmp_path):
+    (tmp_path / "file").write_bytes(b"0123456789")
+    opts = {
+        "fileserver_backend": ["roots"],
+        "extension_modules": "",
+        "optimization_order": [
+            0,
+        ],
+        "file_roots": {
+            "base": [str(tmp_path)],
+        },
+        "file_ignore_regex": "",
+        "file_ignore_glob": "",
+        "file_buffer_size": 4,
+        "fileserver_followsymlinks": True,
+        "fileserver_transfer_port": 4507,
+    }
+    key = salt.utils.filetransfer.derive_key("secret")
+    fs = salt.fileserver.Fileserver(opts)
+    fs.transfer_key = lambda: key
+    ret = fs.serve_file(
+        {
+            "path": "file",
+            "saltenv": "base",
+            "loc": 0,
+            "transfer": True,
+            "id": "web1",
+        }
+    )
+    assert ret["data"] == b"0123"
+    # The ticket names the file as requested, not its path on the master
+    assert salt.utils.filetransfer.read_ticket(key, ret["transfer"]) == {
+        "id": "web1",
+        "saltenv": "base",
+        "path": "file",
+    }
+    assert ret["transfer_key"] == salt.utils.filetransfer.stream_key(
+        key, ret["transfer"]
+    )
+
+
+def test_serve_files_malformed(tmp_path):
+    opts = {
+        "fileserver_backend": ["roots"],
+        "extension_modules": "",
+        "optimization_order": [
+            0,
+        ],
+        "file_roots": {
+            "base": [str(tmp_path)],
+        },
+        "file_ignore_regex": "",
+        "file_ignore_glob": "",
+        "file_buffer_size": 2048,
+    }
+    fs = salt.fileserver.Fileserver(opts)
+    for paths in (["top.sls"], "top.sls", {"top.sls": None}, {1: ""}):
+        ret = fs.serve_files({"paths": paths, "saltenv": "base"})
+        assert "error" in ret
+        assert "files" not in ret
+
+
+def test_routing_index(tmp_path):
+    opts = {
+        "fileserver_backend": ["roots", "gitfs"],
+        "extension_modules": "",
+        "cachedir": str(tmp_path),
+        "fileserver_routing_index": True,
+    }
+    backends = {
+        "roots": {"base": {"top.sls", "shared.sls"}},
+        "gitfs": {"base": {"shared.sls", "git.sls"}, "dev": {"dev.sls"}},
+    }
+    probes = []
+
+    def _find_file(fsb):
+        def find_file(path, saltenv, **kwargs):
+            probes.append(fsb)
+            if path in backends[fsb].get(saltenv, ()):
+                return {"path": f"/{fsb}/{saltenv}/{path}", "rel": path}
+            return {"path": "", "rel": ""}
+
+        return find_file
+
+    fs = salt.fileserver.Fileserver(opts)
+    fs.servers = {}
+    for fsb in backends:
+        fs.servers[f"{fsb}.envs"] = lambda fsb=fsb: list(backends[fsb])
+        fs.servers[f"{fsb}.find_file"] = _find_file(fsb)
+        fs.servers[f"{fsb}.file_list"] = lambda load, fsb=fsb: sorted(
+            backends[fsb].get(load["saltenv"], ())
+        )
+
+    assert fs.update_routes() is True
+    assert fs.update_routes() is False
+    assert fs.route("shared.sls", "base") == "roots"
+    assert fs.route("git.sls", "base") == "gitfs"
+    assert fs.route("missing.sls", "base") is None
+
+    assert fs.find_file("git.sls", "base")["back"] == "gitfs"
+    assert fs.find_file("dev.sls", "dev")["back"] == "gitfs"
+    assert fs.find_file("shared.sls", "base")["back"] == "roots"
+    assert probes == ["gitfs", "gitfs", "roots"]
+
+    # A file which moved since the index was built is still found
+    backends["gitfs"]["base"].discard("git.sls")
+    backends["roots"]["base"].add("git.sls")
+    del probes[:]
+    assert fs.find_file("git.sls", "base")["back"] == "roots"
+    assert probes == ["gitfs", "roots"]
+
+    # The current index is authoritative for the files which are not in it
+    backends["roots"]["base"].add("new.sls")
+    del probes[:]
+    assert fs.find_file("new.sls", "base") == {"path": "", "rel": ""}
+    assert probes == []
+
+    # Once the index is stale, each backend is asked in turn
+    assert fs.update_routes(ttl=60) is True
+    routes_path = os.path.join(str(tmp_path), "file_lists", "routes.p")
+    os.utime(routes_path, (time.time() - 120, time.time() - 120))
+    assert fs.route("top.sls", "base") is None
+    assert fs.find_file("new.sls", "base")["back"] == "roots"
+    assert probes == ["roots"]
+    # Rebuilding the index unchanged makes it current again
+    assert fs.update_routes(ttl=60) is False
+    assert fs.route("new.sls", "base") == "roots"
+
+    # An index built for other backends is not used
+    other = salt.fileserver.Fileserver(
+        dict(opts, fileserver_backend=["gitfs", "roots"])
+    )
+    other.servers = fs.servers
+    assert other.route("shared.sls", "base") is None
+
+
+def test_file_list_generations_bounded():
+    """
+    The file list generations kept for the prefixes the clients ask for are
+    bounded in total, dropping the least recently requested lists
+    """
+    fs = salt.fileserver.Fileserver(
+        {"fileserver_backend": ["roots"], "extension_modules": ""}
+    )
+    first = fs._file_list_delta(("base", "", None), ["top.sls"], None)
+    for index in range(salt.fileserver.FILE_LIST_GENERATIONS_TOTAL * 2):
+        fs._file_list_delta(("base", f"dir{index}", None), [f"dir{index}/a"], None)
+        # The list requested all along is kept
+        fs._file_list_delta(("base", "", None), ["top.sls"], None)
+    total = sum(len(gens) for gens in fs._file_list_generations.values())
+    assert total == salt.fileserver.FILE_LIST_GENERATIONS_TOTAL
+    assert ("base", "dir0", None) not in fs._file_list_generations
+    assert fs._file_list_delta(
+        ("base", "", None), ["top.sls"], first["generation"]
+    ) == {"generation": first["generation"], "added": [], "removed": []}
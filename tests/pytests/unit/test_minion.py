@@ -2,6 +2,7 @@ import asyncio
 import copy
 import logging
 import os
+import time
 
 import pytest
 import tornado
@@ -1167,3 +1168,24 @@ async def test_connect_master_general_exception_error(minion_opts, connect_maste
     # The first call raised an error which caused minion.destroy to get called,
     # the second call is a success.
     assert minion.connect_master.calls == 2
+
+
+def test_job_heartbeat(minion_opts):
+    minion_opts["id"] = "minion"
+    minion_opts["job_heartbeat_interval"] = 0.05
+    io_loop = tornado.ioloop.IOLoop()
+    minion = salt.minion.Minion(minion_opts, io_loop=io_loop)
+    try:
+        minion._fire_master = MagicMock()
+        with minion._job_heartbeat({"jid": "0815"}):
+            time.sleep(0.3)
+        count = minion._fire_master.call_count
+        assert count >= 2
+        data, tag = minion._fire_master.call_args[0]
+        assert data == {"jid": "0815", "interval": 0.05}
+        assert tag == "salt/job/0815/heartbeat/minion"
+        # The heartbeats stop with the job
+        time.sleep(0.2)
+        assert minion._fire_master.call_count == count
+    finally:
+        minion.destroy()
@@ -11,6 +11,8 @@ import os
 import shutil
 import tempfile
 import textwrap
+import threading
+import time
 
 import pytest
 
@@ -1259,3 +1261,213 @@ def test_compile_pillar_disk_cache(master_opts, grains):
                 "mocked_minion": {"base": {"foo": "bar"}, "dev": {"foo": "baz"}}
             }
             assert pillar.cache._dict == expected_cache
+
+
+@pytest.fixture
+def dependency_cache_opts(master_opts, tmp_path):
+    pillar_root = tmp_path / "pillar"
+    pillar_root.mkdir()
+    (pillar_root / "top.sls").write_text(
+        textwrap.dedent(
+            """\
+            base:
+              '*':
+                - common
+              'minion1':
+                - minion1
+            """
+        )
+    )
+    (pillar_root / "common.sls").write_text("common: 1\n")
+    (pillar_root / "minion1.sls").write_text("minion: {{ grains['role'] }}\nvalue: 1\n")
+    master_opts.update(
+        {
+            "pillar_roots": {"base": [str(pillar_root)]},
+            "pillar_cache": True,
+            "pillar_cache_backend": "memory",
+            "pillar_cache_dependencies": True,
+            "file_roots": {"base": []},
+            "ext_pillar": [],
+        }
+    )
+    return master_opts
+
+
+def test_compile_pillar_cache_dependencies(dependency_cache_opts, tmp_path):
+    pillar_root = tmp_path / "pillar"
+    pillars = {
+        minion_id: salt.pillar.PillarCache(
+            dependency_cache_opts, {"role": "web"}, minion_id, "base", functions={}
+        )
+        for minion_id in ("minion1", "minion2")
+    }
+
+    with patch(
+        "salt.pillar.PillarCache.fetch_pillar",
+        autospec=True,
+        side_effect=salt.pillar.PillarCache.fetch_pillar,
+    ) as fetch:
+        assert pillars["minion1"].compile_pillar() == {
+            "common": 1,
+            "minion": "web",
+            "value": 1,
+        }
+        assert pillars["minion2"].compile_pillar() == {"common": 1}
+        assert fetch.call_count == 2
+
+        # Nothing changed, both pillars are served from the cache
+        for pillar in pillars.values():
+            pillar.compile_pillar()
+        assert fetch.call_count == 2
+
+        # Only the minion which includes the changed file is recompiled
+        (pillar_root / "minion1.sls").write_text(
+            "minion: {{ grains['role'] }}\nvalue: 2\n"
+        )
+        assert pillars["minion1"].compile_pillar()["value"] == 2
+        pillars["minion2"].compile_pillar()
+        assert fetch.call_count == 3
+
+        # So is a minion whose grains changed
+        pillars["minion1"].grains = {"role": "db"}
+        assert pillars["minion1"].compile_pillar()["minion"] == "db"
+        assert fetch.call_count == 4
+
+        # A file appearing where a missing one was requested invalidates too
+        (pillar_root / "minion2.sls").write_text("minion: two\n")
+        (pillar_root / "top.sls").write_text(
+            "base:\n  '*':\n    - common\n  'minion2':\n    - minion2\n"
+        )
+        assert pillars["minion2"].compile_pillar() == {"common": 1, "minion": "two"}
+        assert fetch.call_count == 5
+
+
+def test_render_pstate_shares_static_sls(dependency_cache_opts):
+    salt.pillar._STATIC_SLS_RENDERS.clear()
+    with patch(
+        "salt.pillar.compile_template", side_effect=salt.pillar.compile_template
+    ) as compile_template:
+        for minion_id in ("minion1", "minion2", "minion3"):
+            pillar = salt.pillar.Pillar(
+                dependency_cache_opts,
+                {"role": "web"},
+                minion_id,
+                "base",
+                functions={},
+            )
+            ret = pillar.compile_pillar()
+            assert ret["common"] == 1
+            ret["common"] = "modified"
+
+    rendered = [
+        call.args[6] for call in compile_template.call_args_list if len(call.args) > 6
+    ]
+    # The top file and templated SLS are rendered every time, the static
+    # common.sls only once
+    assert rendered.count("common") == 1
+    assert rendered.count("minion1") == 1
+
+
+def test_ext_pillar_concurrency(master_opts, tmp_path):
+    release = threading.Event()
+
+    def slow(minion_id, pillar, value):
+        time.sleep(0.5)
+        return {"slow": value, "shared": "slow"}
+
+    def fast(minion_id, pillar, value):
+        assert "slow" not in pillar
+        return {"fast": value, "shared": "fast"}
+
+    def failing(minion_id, pillar, value):
+        raise RuntimeError("broken source")
+
+    def hanging(minion_id, pillar, value):
+        release.wait(10)
+        return {"hanging": value}
+
+    master_opts.update(
+        {
+            "pillar_roots": {"base": [str(tmp_path)]},
+            "file_roots": {"base": []},
+            "ext_pillar": [
+                {"slow": "one"},
+                {"hanging": "two"},
+                {"fast": "three"},
+                {"failing": "four"},
+            ],
+            "ext_pillar_concurrency": 4,
+            "ext_pillar_timeout": 2,
+        }
+    )
+    pillar = salt.pillar.Pillar(
+        master_opts, {}, "minion", "base", pillar_override={"cli": True}, functions={}
+    )
+    pillar.ext_pillars = {
+        "slow": slow,
+        "fast": fast,
+        "failing": failing,
+        "hanging": hanging,
+    }
+    try:
+        start = time.monotonic()
+        ret, errors = pillar.ext_pillar({"existing": True})
+        assert time.monotonic() - start < 5
+    finally:
+        release.set()
+
+    # Results are merged in configuration order, not completion order
+    assert ret == {
+        "existing": True,
+        "cli": True,
+        "slow": "one",
+        "fast": "three",
+        "shared": "fast",
+    }
+    assert errors == [
+        "ext_pillar hanging timed out after 2 seconds",
+        "Failed to load ext_pillar failing: broken source",
+    ]
+
+
+def test_ext_pillar_timeout_per_source(master_opts, tmp_path):
+    """
+    The timeout of a source only runs once it started, so the sources which
+    wait for a thread are not timed out, even behind a source which hangs
+    """
+    release = threading.Event()
+
+    def slow(minion_id, pillar, value):
+        time.sleep(0.6)
+        return {value: True}
+
+    def hanging(minion_id, pillar, value):
+        release.wait(10)
+        return {value: True}
+
+    master_opts.update(
+        {
+            "pillar_roots": {"base": [str(tmp_path)]},
+            "file_roots": {"base": []},
+            "ext_pillar": [
+                {"slow": "one"},
+                {"hanging": "two"},
+                {"slow": "three"},
+                {"slow": "four"},
+                {"slow": "five"},
+            ],
+            "ext_pillar_concurrency": 2,
+            "ext_pillar_timeout": 1,
+        }
+    )
+    pillar = salt.pillar.Pillar(
+        master_opts, {}, "minion", "base", pillar_override={}, functions={}
+    )
+    pillar.ext_pillars = {"slow": slow, "hanging": hanging}
+    try:
+        ret, errors = pillar.ext_pillar({})
+    finally:
+        release.set()
+
+    assert ret == {"one": True, "three": True, "four": True, "five": True}
+    assert errors == ["ext_pillar hanging timed out after 1 seconds"]
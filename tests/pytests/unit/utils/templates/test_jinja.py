@@ -3,12 +3,14 @@ Tests for salt.utils.templates
 """
 
 import re
-
 from collections import OrderedDict
+
+import jinja2.sandbox
 import pytest
+
+import salt.utils.jinja
 from salt.exceptions import SaltRenderError
 from salt.utils.templates import render_jinja_tmpl
-
 from tests.support.mock import patch
 
 
@@ -101,3 +103,57 @@ def test_render_cve_2021_25283(render_context):
     render_context["var"] = "OK"
     with pytest.raises(SaltRenderError):
         res = render_jinja_tmpl(tmpl, render_context)
+
+
+def test_render_bytecode_cache(render_context, tmp_path):
+    render_context["opts"] = {
+        "cachedir": str(tmp_path),
+        "jinja_bytecode_cache": True,
+    }
+    compile_ = jinja2.sandbox.SandboxedEnvironment.compile
+    with patch.dict(salt.utils.jinja._BYTECODE_CACHES, clear=True), patch.object(
+        jinja2.sandbox.SandboxedEnvironment,
+        "compile",
+        autospec=True,
+        side_effect=compile_,
+    ) as compile_mock:
+        assert render_jinja_tmpl("{{ 'OK' }}", render_context) == "OK"
+        assert render_jinja_tmpl("{{ 'OK' }}", render_context) == "OK"
+        assert compile_mock.call_count == 1
+
+        # A changed template is compiled again
+        assert render_jinja_tmpl("{{ 'OK2' }}", render_context) == "OK2"
+        assert compile_mock.call_count == 2
+
+        # A new process finds the compiled template on disk
+        salt.utils.jinja._BYTECODE_CACHES.clear()
+        assert render_jinja_tmpl("{{ 'OK' }}", render_context) == "OK"
+        assert compile_mock.call_count == 2
+    assert list((tmp_path / "jinja_bytecode").glob("*.cache"))
+
+
+def test_render_bytecode_cache_imports(render_context, tmp_path):
+    macros = tmp_path / "macros.jinja"
+    macros.write_text("{% macro greet(name) %}Hello {{ name }}{% endmacro %}")
+    tmplpath = tmp_path / "template.jinja"
+    tmpl = "{% from 'macros.jinja' import greet %}{{ greet('World') }}"
+    render_context["opts"] = {
+        "cachedir": str(tmp_path / "cache"),
+        "jinja_bytecode_cache": True,
+    }
+    compile_ = jinja2.sandbox.SandboxedEnvironment.compile
+    with patch.dict(salt.utils.jinja._BYTECODE_CACHES, clear=True), patch.object(
+        jinja2.sandbox.SandboxedEnvironment,
+        "compile",
+        autospec=True,
+        side_effect=compile_,
+    ) as compile_mock:
+        for _ in range(2):
+            res = render_jinja_tmpl(tmpl, render_context, tmplpath=str(tmplpath))
+            assert res == "Hello World"
+        assert compile_mock.call_count == 2
+
+        macros.write_text("{% macro greet(name) %}Bye {{ name }}{% endmacro %}")
+        res = render_jinja_tmpl(tmpl, render_context, tmplpath=str(tmplpath))
+        assert res == "Bye World"
+        assert compile_mock.call_count == 3
@@ -0,0 +1,196 @@
+"""
+Tests for salt.utils.filetransfer
+"""
+
+import asyncio
+import io
+import socket
+import threading
+
+import pytest
+
+import salt.crypt
+import salt.exceptions
+import salt.utils.filetransfer as filetransfer
+
+KEY = filetransfer.derive_key("secret")
+
+
+@pytest.fixture
+def content():
+    return bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def served_file(tmp_path, content):
+    path = tmp_path / "served"
+    path.write_bytes(content)
+    return str(path)
+
+
+@pytest.fixture
+def transfer_server(served_file):
+    """
+    Run a file transfer server on an ephemeral port in a background thread,
+    whose fileserver serves ``served_file`` as salt://file
+    """
+    files = {("base", "file"): {"path": served_file, "rel": "file"}}
+    loop = asyncio.new_event_loop()
+    server = filetransfer.FileTransferServer(
+        {}, lambda: KEY, lambda path, saltenv: files.get((saltenv, path), {})
+    )
+    started = threading.Event()
+    ret = {}
+
+    async def _serve():
+        srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        ret["port"] = srv.sockets[0].getsockname()[1]
+        ret["server"] = srv
+        started.set()
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(_serve(), loop)
+    started.wait(10)
+    try:
+        yield ret["port"]
+    finally:
+        ret["server"].close()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
+
+
+def test_ticket():
+    ticket = filetransfer.make_ticket(KEY, "minion", "base", "file")
+    assert filetransfer.read_ticket(KEY, ticket) == {
+        "id": "minion",
+        "saltenv": "base",
+        "path": "file",
+    }
+    assert filetransfer.read_ticket(filetransfer.derive_key("other"), ticket) is None
+    mac = ticket.rsplit(".", 1)[1]
+    forged = filetransfer.make_ticket(KEY, "minion", "base", "top.sls")
+    assert (
+        filetransfer.read_ticket(KEY, "{}.{}".format(forged.rsplit(".", 1)[0], mac))
+        is None
+    )
+    assert filetransfer.read_ticket(KEY, "garbage") is None
+
+    # Each ticket has its own nonce, and so its own stream key
+    other = filetransfer.make_ticket(KEY, "minion", "base", "file")
+    assert other != ticket
+    assert filetransfer.stream_key(KEY, other) != filetransfer.stream_key(KEY, ticket)
+
+    ticket = filetransfer.make_ticket(KEY, "minion", "base", "file", ttl=-1)
+    assert filetransfer.read_ticket(KEY, ticket) is None
+
+
+@pytest.mark.parametrize("offset", [0, 1000, 256 * 1024])
+def test_fetch(transfer_server, content, offset):
+    ticket = filetransfer.make_ticket(KEY, "minion", "base", "file")
+    buf = io.BytesIO()
+    buf.write(content[:offset])
+    received = filetransfer.fetch(
+        "127.0.0.1",
+        transfer_server,
+        ticket,
+        buf,
+        key=filetransfer.stream_key(KEY, ticket),
+    )
+    assert received == len(content) - offset
+    assert buf.getvalue() == content
+
+
+def test_fetch_wrong_key(transfer_server):
+    ticket = filetransfer.make_ticket(KEY, "minion", "base", "file")
+    other = filetransfer.make_ticket(KEY, "minion", "base", "file")
+    with pytest.raises(salt.exceptions.SaltClientError, match="authentication"):
+        filetransfer.fetch(
+            "127.0.0.1",
+            transfer_server,
+            ticket,
+            io.BytesIO(),
+            key=filetransfer.stream_key(KEY, other),
+        )
+
+
+@pytest.mark.parametrize(
+    "key,path",
+    [
+        # Not signed with the master secret
+        (filetransfer.derive_key("other"), "file"),
+        # Not served by the fileserver
+        (KEY, "/etc/shadow"),
+    ],
+)
+def test_fetch_denied(transfer_server, key, path):
+    ticket = filetransfer.make_ticket(key, "minion", "base", path)
+    with pytest.raises(salt.exceptions.SaltClientError, match="denied"):
+        filetransfer.fetch(
+            "127.0.0.1",
+            transfer_server,
+            ticket,
+            io.BytesIO(),
+            key=filetransfer.stream_key(key, ticket),
+        )
+
+
+@pytest.fixture
+def raw_server():
+    """
+    Run a server which answers one connection with the bytes put in the
+    returned dict, and closes it
+    """
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1)
+    ret = {"port": sock.getsockname()[1], "reply": b""}
+
+    def _serve():
+        conn, _ = sock.accept()
+        with conn:
+            conn.makefile("rb").readline()
+            conn.sendall(ret["reply"])
+
+    thread = threading.Thread(target=_serve, daemon=True)
+    thread.start()
+    try:
+        yield ret
+    finally:
+        sock.close()
+        thread.join(10)
+
+
+def _frame(key_string, sequence, offset, final, data):
+    frame = salt.crypt.Crypticle({}, key_string).encrypt(
+        filetransfer.FRAME_META.pack(sequence, offset, final) + data
+    )
+    return filetransfer.FRAME.pack(len(frame)) + frame
+
+
+@pytest.mark.parametrize(
+    "frames,match",
+    [
+        # Reordered
+        ([(1, 4, False, b"4567"), (0, 0, True, b"0123")], "out of order"),
+        # Replayed
+        ([(0, 0, False, b"0123"), (0, 0, True, b"0123")], "out of order"),
+        # Replayed from a transfer at another offset
+        ([(0, 4, False, b"4567"), (1, 4, True, b"4567")], "out of order"),
+        # Truncated after a frame which is not the last one
+        ([(0, 0, False, b"0123")], "closed the connection"),
+        # The last frame comes early
+        ([(0, 0, True, b"0123")], "4 bytes early"),
+    ],
+)
+def test_fetch_bad_frames(raw_server, frames, match):
+    ticket = filetransfer.make_ticket(KEY, "minion", "base", "file")
+    key_string = filetransfer.stream_key(KEY, ticket)
+    raw_server["reply"] = filetransfer.HEADER.pack(
+        filetransfer.STATUS_OK, 8
+    ) + b"".join(_frame(key_string, *frame) for frame in frames)
+    with pytest.raises(salt.exceptions.SaltClientError, match=match):
+        filetransfer.fetch(
+            "127.0.0.1", raw_server["port"], ticket, io.BytesIO(), key=key_string
+        )
@@ -1,4 +1,5 @@
 import os
+import subprocess
 import time
 
 import pytest
@@ -249,3 +250,136 @@ def test_checkout_pygit2(_prepare_provider):
 )
 def test_get_cachedir_basename_pygit2(_prepare_provider):
     assert "_" == _prepare_provider.get_cache_basename()
+
+
+def _fetch_remotes(tmp_path, opts, fetch_times):
+    """
+    Fetch fake remotes which take the given number of seconds to fetch,
+    returning the GitFS object and the time fetch_remotes() took
+    """
+    gitfs = object.__new__(salt.utils.gitfs.GitFS)
+    gitfs.opts = opts
+    gitfs.remotes = []
+    for idx, fetch_time in enumerate(fetch_times):
+        work_dir = tmp_path / f"work{idx}" / "_"
+        work_dir.mkdir(parents=True)
+        repo = MagicMock(id=f"repo{idx}")
+        repo.name = None
+        repo.get_salt_working_dir.return_value = str(work_dir)
+        repo.get_cache_basename.return_value = "_"
+        repo.fetch.side_effect = lambda fetch_time=fetch_time: (
+            time.sleep(fetch_time) or fetch_time < 1
+        )
+        gitfs.remotes.append(repo)
+    start = time.monotonic()
+    changed = gitfs.fetch_remotes()
+    return gitfs, changed, time.monotonic() - start
+
+
+def test_fetch_remotes_concurrency(tmp_path):
+    opts = {"gitfs_fetch_concurrency": 4, "gitfs_fetch_timeout": None}
+    gitfs, changed, duration = _fetch_remotes(tmp_path, opts, [0.5] * 4)
+    assert changed is True
+    assert duration < 1.5
+    assert sorted(gitfs.fetch_durations) == ["repo0", "repo1", "repo2", "repo3"]
+    for repo in gitfs.remotes:
+        repo.fetch.assert_called_once()
+
+
+def test_fetch_remotes_timeout(tmp_path):
+    """
+    A hanging remote is abandoned after the timeout, without holding up the
+    remotes queued behind it
+    """
+    opts = {"gitfs_fetch_concurrency": 2, "gitfs_fetch_timeout": 0.5}
+    gitfs, changed, duration = _fetch_remotes(tmp_path, opts, [5, 0, 0, 0])
+    assert changed is True
+    assert duration < 3
+    for repo in gitfs.remotes:
+        repo.fetch.assert_called_once()
+    assert gitfs.fetch_durations["repo0"] >= 0.5
+
+
+@pytest.fixture
+def _prepare_remote_repository_gitpython(tmp_path):
+    """
+    A repo with a few commits and tags, which allows partial clones
+    """
+    remote = tmp_path / "gitpython-repo"
+    remote.mkdir()
+
+    def _git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=Dummy", "-c", "user.email=dummy@dummy.com"]
+            + list(args),
+            cwd=str(remote),
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    _git("init", "-b", "master")
+    _git("config", "uploadpack.allowFilter", "true")
+    for idx in range(3):
+        (remote / "README").write_text(f"revision {idx}\n")
+        _git("add", "README")
+        _git("commit", "-m", f"revision {idx}")
+        _git("tag", "-a", f"v{idx}", "-m", f"release {idx}")
+    return remote.as_uri()
+
+
+@pytest.mark.skipif(
+    not salt.utils.gitfs.GITPYTHON_VERSION, reason="GitPython is not installed"
+)
+@pytest.mark.skip_if_binaries_missing("git")
+def test_shallow_partial_clone_gitpython(
+    tmp_path, minion_opts, _prepare_remote_repository_gitpython
+):
+    per_remote_defaults = {
+        "base": "master",
+        "disable_saltenv_mapping": False,
+        "ref_types": ["branch", "tag", "sha"],
+        "mountpoint": "",
+        "refspecs": [
+            "+refs/heads/*:refs/remotes/origin/*",
+            "+refs/tags/*:refs/tags/*",
+        ],
+        "root": "",
+        "saltenv_blacklist": [],
+        "saltenv_whitelist": [],
+        "ssl_verify": True,
+        "update_interval": 60,
+        "fetch_depth": 0,
+        "fetch_filter": "",
+    }
+    remote = {
+        _prepare_remote_repository_gitpython: [
+            {"fetch_depth": 1},
+            {"fetch_filter": "blob:none"},
+        ]
+    }
+    provider = salt.utils.gitfs.GitPython(
+        minion_opts,
+        remote,
+        per_remote_defaults,
+        ("all_saltenvs", "name", "saltenv"),
+        tuple(per_remote_defaults),
+        str(tmp_path / "cache" / "gitfs"),
+        "gitfs",
+    )
+    assert provider.fetch_depth == 1
+    provider.saltenv_revmap = {}
+    provider.init_remote()
+    provider.fetch()
+    assert provider.is_shallow()
+    assert provider.repo.git.config("remote.origin.partialclonefilter") == "blob:none"
+    # Every tag is still a saltenv, and its files can be read even though
+    # neither the history nor the blobs were fetched up front
+    assert {"base", "v0", "v1", "v2"} <= set(provider.envs())
+    for idx in range(3):
+        blob = provider.get_tree(f"v{idx}") / "README"
+        assert blob.data_stream.read() == f"revision {idx}\n".encode()
+
+    provider.fetch_depth = 0
+    provider.fetch()
+    assert not provider.is_shallow()
+    assert len(list(provider.repo.iter_commits("origin/master"))) == 3
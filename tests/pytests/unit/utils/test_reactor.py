@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 
 import salt.utils.data
@@ -55,3 +57,194 @@ def test_run_master_reactor(master_opts, master_reactor):
                 master_reactor.run()
                 calls = [call(9)]
                 os_nice_mock.assert_has_calls(calls)
+
+
+def test_list_reactors_cached(master_opts, master_reactor):
+    master_opts["reactor"] = [
+        {"salt/minion/*/start": ["/srv/reactor/start.sls"]},
+        {"salt/minion/web*/start": "/srv/reactor/web.sls"},
+    ]
+    with patch.object(
+        master_reactor, "_compile_react_map", wraps=master_reactor._compile_react_map
+    ) as compile_mock:
+        assert master_reactor.list_reactors("salt/minion/web1/start") == [
+            "/srv/reactor/start.sls",
+            "/srv/reactor/web.sls",
+        ]
+        assert master_reactor.list_reactors("salt/minion/db1/start") == [
+            "/srv/reactor/start.sls"
+        ]
+        assert master_reactor.list_reactors("salt/auth") == []
+        assert compile_mock.call_count == 1
+
+        # The globs are compiled again once the reactor map changed
+        master_opts["reactor"].append({"salt/auth": ["/srv/reactor/auth.sls"]})
+        assert master_reactor.list_reactors("salt/auth") == ["/srv/reactor/auth.sls"]
+        assert compile_mock.call_count == 2
+
+
+def test_render_data_only(master_opts, master_reactor, tmp_path):
+    sls = tmp_path / "start.sls"
+    sls.write_text(
+        "highstate_{{ data['id'] }}:\n"
+        "  local.state.apply:\n"
+        "    - tgt: {{ data['id'] }}\n"
+        "    - arg:\n"
+        "      - {{ data.get('sls', 'base') }}\n"
+        "    - kwarg:\n"
+        "        pillar:\n"
+        "          count: {{ data['data']['count'] }}\n"
+        "          tag: {{ tag }}\n"
+    )
+    master_opts["reactor_data_only"] = [str(tmp_path / "*")]
+    with patch.object(
+        master_reactor, "render_template", wraps=master_reactor.render_template
+    ) as render_mock:
+        for minion, count in (("web1", 1), ("web2", 2)):
+            tag = f"salt/minion/{minion}/start"
+            data = {"id": minion, "data": {"count": count}}
+            assert master_reactor.render_reaction(str(sls), tag, data) == {
+                f"highstate_{minion}": {
+                    "local": [
+                        {"tgt": minion},
+                        {"arg": ["base"]},
+                        {"kwarg": {"pillar": {"count": count, "tag": tag}}},
+                        "state.apply",
+                    ],
+                    "__sls__": str(sls),
+                }
+            }
+        assert render_mock.call_count == 1
+
+        # An event lacking a value is rendered as usual
+        render_mock.reset_mock()
+        assert (
+            master_reactor.render_reaction(
+                str(sls), "salt/minion/web3/start", {"id": "web3"}
+            )
+            == {}
+        )
+        assert render_mock.call_count == 1
+
+
+def test_render_data_only_fallback(master_opts, master_reactor, tmp_path):
+    sls = tmp_path / "start.sls"
+    sls.write_text(
+        "{% if data['id'] == 'web1' %}\n"
+        "highstate:\n"
+        "  local.state.apply:\n"
+        "    - tgt: {{ data['id'] }}\n"
+        "{% endif %}\n"
+    )
+    master_opts["reactor_data_only"] = [str(sls)]
+    tag = "salt/minion/web1/start"
+    assert master_reactor.render_reaction(str(sls), tag, {"id": "web1"}) == {
+        "highstate": {"local": [{"tgt": "web1"}, "state.apply"], "__sls__": str(sls)}
+    }
+    assert master_reactor.render_reaction(str(sls), tag, {"id": "web2"}) == {}
+
+
+@pytest.mark.parametrize(
+    "template,expected",
+    [
+        ("{{ data['id'] | upper }}", "WEB1"),
+        ("{% set id = data['id'] %}{{ id }}-{{ id | upper }}", "web1-WEB1"),
+        (
+            "{% if data['foo'] is defined %}foo{% else %}{{ data['id'] }}{% endif %}",
+            "foo",
+        ),
+        (
+            "{% if data['foo'] is not none %}foo{% else %}{{ data['id'] }}{% endif %}",
+            "web1",
+        ),
+    ],
+)
+def test_render_data_only_not_interpolated(
+    master_opts, master_reactor, tmp_path, template, expected
+):
+    """
+    A reactor SLS which transforms or tests the event data is rendered for
+    every event
+    """
+    sls = tmp_path / "start.sls"
+    sls.write_text(f"highstate:\n  local.state.apply:\n    - tgt: {template}\n")
+    master_opts["reactor_data_only"] = [str(sls)]
+    for _ in range(2):
+        assert master_reactor.render_reaction(
+            str(sls), "salt/minion/web1/start", {"id": "web1", "foo": None}
+        ) == {
+            "highstate": {
+                "local": [{"tgt": expected}, "state.apply"],
+                "__sls__": str(sls),
+            }
+        }
+    assert master_reactor._plans[str(sls)].high is None
+
+
+@pytest.mark.parametrize(
+    "overflow,queued,counters",
+    [
+        ("drop", [1, 2], {"queued": 2, "dropped": 1}),
+        ("drop_oldest", [2, 3], {"queued": 3, "dropped_oldest": 1}),
+        ("coalesce", [1, 2], {"queued": 2, "dropped": 1}),
+    ],
+)
+def test_reactor_pool_overflow(overflow, queued, counters):
+    # A pool without workers keeps the reactions in its queue
+    pool = reactor.ReactorPool(0, queue_size=2, overflow=overflow)
+    for value in (1, 2, 3):
+        pool.fire_async(print, args=(value,), name="runner.test.arg")
+    assert [job.args[0] for job in list(pool._job_queue.queue)] == queued
+    stats = pool.stats.to_dict()
+    assert {key: val for key, val in stats["counters"].items() if val} == counters
+    assert stats["queue_depth_max"] == 2
+
+
+def test_reactor_pool_coalesce():
+    pool = reactor.ReactorPool(0, queue_size=2, overflow="coalesce")
+    assert pool.fire_async(print, args=("a1",), key="a")
+    assert pool.fire_async(print, args=("b1",), key="b")
+    # The reactions waiting in the queue get the arguments of the new ones
+    assert pool.fire_async(print, args=("a2",), key="a")
+    assert not pool.fire_async(print, args=("c1",), key="c")
+    assert [job.args[0] for job in list(pool._job_queue.queue)] == ["a2", "b1"]
+    assert pool.stats.counters["coalesced"] == 1
+    assert pool.stats.counters["dropped"] == 1
+
+
+def test_reactor_pool_block():
+    started = threading.Event()
+    release = threading.Event()
+
+    def reaction():
+        started.set()
+        release.wait(5)
+
+    pool = reactor.ReactorPool(1, queue_size=1, overflow="block")
+    assert pool.fire_async(reaction, name="runner.test.sleep")
+    assert started.wait(5)
+    assert pool.fire_async(reaction, name="runner.test.sleep")
+    threading.Timer(0.1, release.set).start()
+    # The queue is full until the running reaction completes
+    assert pool.fire_async(reaction, name="runner.test.sleep")
+    stats = pool.stats.to_dict()
+    assert stats["counters"]["blocked"] == 1
+    assert stats["blocked_seconds"] > 0
+    assert stats["counters"]["dropped"] == 0
+
+
+def test_reactor_stats():
+    stats = reactor.ReactorStats()
+    stats.observe("runner.test.arg", 0.02, 0.3)
+    stats.observe("runner.test.arg", 120, 0.001)
+    stats.observe("local.test.ping", 0.001)
+    ret = stats.to_dict()["reactions"]
+    assert set(ret["local.test.ping"]) == {"run"}
+    run = ret["runner.test.arg"]["run"]
+    assert run["count"] == 2
+    assert run["max"] == 120
+    assert run["buckets"]["0.01"] == 0
+    assert run["buckets"]["0.025"] == 1
+    assert run["buckets"]["60"] == 1
+    assert run["buckets"]["+Inf"] == 2
+    assert ret["runner.test.arg"]["wait"]["buckets"]["0.005"] == 1
@@ -1,10 +1,14 @@
 import importlib
+import io
 import os
+import shutil
 import sys
+import tarfile
 
 import pytest
 import saltfactories.utils.saltext
 
+import salt.client.ssh.ssh_py_shim as shim
 import salt.exceptions
 import salt.utils.stringutils
 import salt.utils.thin
@@ -125,3 +129,77 @@ def test_discover_saltexts():
     assert "name" in dists[dist]
     assert dists[dist]["name"].startswith("pytest_salt_factories")
     assert dists[dist]["name"].endswith(".dist-info")
+
+
+def _write_thin(path, files):
+    with tarfile.open(path, "w:gz") as tfp:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1700000000
+            tfp.addfile(info, io.BytesIO(data))
+
+
+def test_gen_thin_layers(tmp_path, monkeypatch):
+    """
+    Only the layers of the thin whose files changed are deployed again
+    """
+    thintar = tmp_path / "thin.tgz"
+    files = {
+        "version": b"3008.0",
+        "code-checksum": b"1",
+        "pyall/salt/__init__.py": b"",
+        "pyall/salt/modules/old.py": b"",
+        "py3/saltext/wut/__init__.py": b"",
+        "py3/saltext_wut-1.0.dist-info/entry_points.txt": b"",
+        "pyall/jinja2/__init__.py": b"",
+    }
+    _write_thin(str(thintar), files)
+    saltdir = tmp_path / "saltdir"
+    saltdir.mkdir()
+    monkeypatch.setattr(shim.OPTIONS, "saltdir", str(saltdir), raising=False)
+    monkeypatch.setattr(shim.OPTIONS, "hashfunc", "sha1", raising=False)
+
+    def deploy(layers, missing):
+        for _, checksum, path in layers:
+            if checksum in missing:
+                shutil.copy(path, str(saltdir / f"salt-layer-{checksum}.tgz"))
+
+    with patch("salt.utils.thin.gen_thin", return_value=str(thintar)):
+        layers = salt.utils.thin.gen_thin_layers(str(tmp_path))
+        assert [layer for layer, _, _ in layers] == ["deps", "meta", "salt", "saltexts"]
+        # The layers are cached until the thin changes
+        assert salt.utils.thin.gen_thin_layers(str(tmp_path)) == layers
+
+        monkeypatch.setattr(
+            shim.OPTIONS, "layers", [layer[:2] for layer in layers], raising=False
+        )
+        missing = shim.check_layers()
+        assert missing == [checksum for _, checksum, _ in layers]
+        deploy(layers, missing)
+        assert shim.check_layers() == []
+        assert (saltdir / "pyall" / "salt" / "modules" / "old.py").is_file()
+        assert (saltdir / "pyall" / "jinja2" / "__init__.py").is_file()
+
+        # Upgrade Salt
+        del files["pyall/salt/modules/old.py"]
+        files["pyall/salt/modules/new.py"] = b""
+        files["code-checksum"] = b"2"
+        _write_thin(str(thintar), files)
+        upgraded = salt.utils.thin.gen_thin_layers(str(tmp_path))
+        assert sorted(os.listdir(str(tmp_path / "thin" / "layers"))) == sorted(
+            [os.path.basename(path) for _, _, path in upgraded] + ["manifest.json"]
+        )
+
+        monkeypatch.setattr(
+            shim.OPTIONS, "layers", [layer[:2] for layer in upgraded], raising=False
+        )
+        missing = shim.check_layers()
+        assert missing == [
+            checksum for layer, checksum, _ in upgraded if layer in ("meta", "salt")
+        ]
+        deploy(upgraded, missing)
+        assert shim.check_layers() == []
+        assert not (saltdir / "pyall" / "salt" / "modules" / "old.py").exists()
+        assert (saltdir / "pyall" / "salt" / "modules" / "new.py").is_file()
+        assert (saltdir / "code-checksum").read_text() == "2"
@@ -0,0 +1,143 @@
+"""
+Conformance tests for the libyaml based ``SaltYamlSafeLoader`` against the pure
+Python ``SaltYamlPySafeLoader``
+"""
+
+import textwrap
+
+import pytest
+from yaml.constructor import ConstructorError
+
+import salt.utils.yamlloader as yamlloader
+from salt.utils.odict import OrderedDict
+
+pytestmark = [
+    pytest.mark.skipif(
+        not yamlloader.HAS_LIBYAML, reason="PyYAML was built without libyaml"
+    ),
+]
+
+DOCUMENTS = {
+    "scalars": """\
+        string: foo
+        quoted: 'foo'
+        int: 42
+        negative: -42
+        float: 4.2
+        octal: 0755
+        leading_zeros: 0009
+        zero: 0
+        zeros: 000
+        hex: 0x1f
+        bool: true
+        yes: yes
+        null_value: null
+        tilde: ~
+        empty:
+        """,
+    "timestamps": """\
+        date: 2024-01-02
+        datetime: 2024-01-02 03:04:05
+        """,
+    "unicode": """\
+        cyrillic: Д
+        escaped: "\\u0414"
+        tagged: !!python/unicode python unicode string
+        """,
+    "collections": """\
+        flow: {foo: bar, one: 1, list: [1, two, 3]}
+        block:
+          - alpha
+          - beta:
+              gamma: delta
+        """,
+    "merge": """\
+        p1: &p1
+          v1: alpha
+        p2:
+          <<: *p1
+          v1: new_alpha
+          v2: beta
+        p3:
+          <<: [*p1, {v3: gamma}]
+        """,
+    "multiline": """\
+        literal: |
+          line one
+          line two
+        folded: >
+          folded
+          text
+        """,
+    "state": """\
+        install_nginx:
+          pkg.installed:
+            - name: nginx
+            - version: 1.2.3
+        nginx_service:
+          service.running:
+            - name: nginx
+            - watch:
+              - pkg: install_nginx
+        """,
+    "ordering": """\
+        zulu: 1
+        alpha: 2
+        mike:
+          yankee: 3
+          bravo: 4
+        """,
+}
+
+
+def _load(loader, document, dictclass=dict):
+    return yamlloader.load(
+        textwrap.dedent(document), Loader=lambda stream: loader(stream, dictclass)
+    )
+
+
+@pytest.mark.parametrize("dictclass", [dict, OrderedDict])
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_loaders_conform(name, dictclass):
+    document = DOCUMENTS[name]
+    expected = _load(yamlloader.SaltYamlPySafeLoader, document, dictclass)
+    result = _load(yamlloader.SaltYamlSafeLoader, document, dictclass)
+    assert result == expected
+    assert type(result) is type(expected)
+    assert list(result) == list(expected)
+
+
+@pytest.mark.parametrize(
+    "loader", [yamlloader.SaltYamlSafeLoader, yamlloader.SaltYamlPySafeLoader]
+)
+@pytest.mark.parametrize("dictclass", [dict, OrderedDict])
+def test_duplicate_keys(loader, dictclass):
+    document = """\
+        foo:
+          bar: 1
+        foo:
+          baz: 2
+        """
+    with pytest.raises(ConstructorError, match="found conflicting ID 'foo'"):
+        _load(loader, document, dictclass)
+
+
+def test_ordered_maps_are_nested():
+    result = _load(
+        yamlloader.SaltYamlSafeLoader, DOCUMENTS["ordering"], dictclass=OrderedDict
+    )
+    assert isinstance(result["mike"], OrderedDict)
+    assert list(result) == ["zulu", "alpha", "mike"]
+    assert list(result["mike"]) == ["yankee", "bravo"]
+
+
+def test_dictclass_does_not_leak_between_loaders():
+    """
+    Creating an ordered loader must not change how loaders created afterwards
+    construct ``!!omap`` nodes
+    """
+    document = "foo: !!omap [{a: 1}, {b: 2}]"
+    _load(yamlloader.SaltYamlSafeLoader, "bar: baz", dictclass=OrderedDict)
+    assert _load(yamlloader.SaltYamlSafeLoader, document) == _load(
+        yamlloader.SaltYamlPySafeLoader, document
+    )
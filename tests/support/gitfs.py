@@ -64,6 +64,8 @@ _OPTS = freeze(
             "+refs/heads/*:refs/remotes/origin/*",
             "+refs/tags/*:refs/tags/*",
         ],
+        "git_pillar_fetch_depth": 0,
+        "git_pillar_fetch_filter": "",
         "git_pillar_includes": True,
         "fileserver_backend": "roots",
         "cachedir": "",
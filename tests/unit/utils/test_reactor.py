@@ -486,7 +486,10 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
             with patch.object(self.wrap, "pool", thread_pool):
                 self.wrap.run(chunk)
             thread_pool.fire_async.assert_called_with(
-                self.wrap.client_cache["runner"].low, args=WRAPPER_CALLS[tag]
+                self.wrap.client_cache["runner"].low,
+                args=WRAPPER_CALLS[tag],
+                name="{}:runner.{}".format(chunk["__sls__"], chunk["fun"]),
+                key=None,
             )
 
     def test_wheel(self):
@@ -501,7 +504,10 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
             with patch.object(self.wrap, "pool", thread_pool):
                 self.wrap.run(chunk)
             thread_pool.fire_async.assert_called_with(
-                self.wrap.client_cache["wheel"].low, args=WRAPPER_CALLS[tag]
+                self.wrap.client_cache["wheel"].low,
+                args=WRAPPER_CALLS[tag],
+                name="{}:wheel.{}".format(chunk["__sls__"], chunk["fun"]),
+                key=None,
             )
 
     def test_local(self):